@@ -1,6 +1,12 @@
-from . import utils
-from .core import BaseConverter, BrightnessConverter, DistanceConverter
-from .test import test
+"""
+The candiamazing package.
+
+Submodules and classes are imported lazily (PEP 562): ``import candiamazing`` is
+nearly free, and NumPy is only imported once something that needs it, such as
+``candiamazing.BrightnessConverter``, is first used.
+"""
+
+import importlib
 
 try:
     from ._version import version as __version__  # noqa
@@ -11,11 +17,67 @@ __author__ = "Connor Stone, Erik Osinga"
 
 # List packages here to explicitly define the public API. Now candiamazing.<package> works.
 __all__ = (
+    "AbsoluteMagnitudeConverter",
     "BaseConverter",
     "BrightnessConverter",
     "DistanceConverter",
+    "FlatLambdaCDM",
+    "MultiBandConverter",
+    "PhotometricSystem",
+    "Pipeline",
+    "SortedIndex",
     "utils",
     "test",
     "__version__",
     "__author__",
 )
+
+# Lazily imported names, and the submodule each one lives in
+_LAZY_ATTRIBUTES = {
+    "AbsoluteMagnitudeConverter": "core",
+    "BaseConverter": "core",
+    "BrightnessConverter": "core",
+    "DistanceConverter": "core",
+    "FlatLambdaCDM": "cosmology",
+    "MultiBandConverter": "core",
+    "PhotometricSystem": "photometry",
+    "Pipeline": "pipeline",
+    "SortedIndex": "query",
+    "test": "test",
+}
+_LAZY_SUBMODULES = (
+    "utils",
+    "core",
+    "catalog",
+    "parallel",
+    "bench",
+    "scalar",
+    "constants",
+    "server",
+    "cosmology",
+    "photometry",
+    "montecarlo",
+    "pipeline",
+    "aggregate",
+    "aio",
+    "sharding",
+    "profiling",
+    "query",
+)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        value = getattr(module, name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache it, so __getattr__ is only called once per name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,289 @@
+"""
+aggregate.py
+============
+
+**Description:**
+This module summarises converted values without keeping them. Chunks from any
+iterator (a text catalog read by `catalog.iter_column_chunks`, blocks of a memory
+map, a generator) are converted one at a time and folded into a `StreamingSummary`:
+running count, min, max, mean and variance, plus a fixed-bin histogram such as a
+number-count or luminosity-function histogram, from which approximate quantiles are
+read. Memory stays proportional to the number of bins, not to the catalog.
+
+**Development Notes (Instructional):**
+1. **Mergeable partial results:**
+   Every summary can absorb another with `StreamingSummary.merge`. Means and
+   variances combine with the pairwise formula of Chan, Golub & LeVeque (1979),
+   which stays accurate where summing ``x`` and ``x**2`` would cancel catastrophically,
+   and histograms simply add. Workers can therefore each summarise their own chunks
+   and the partial results are merged at the end, in any grouping.
+
+2. **Quantiles from the histogram:**
+   Exact quantiles need all the data. Interpolating the cumulative histogram instead
+   gives each quantile to within one bin width, in O(bins) memory, and merges for
+   free. Quantiles that fall outside the histogram range are reported as nan.
+
+3. **Invalid values:**
+   Non-finite results, such as the magnitudes of zero or negative fluxes, are counted
+   in ``n_invalid`` and otherwise ignored. So are the elements flagged by the
+   ``"mask"`` and ``"bitmask"`` invalid policies of a converter.
+"""
+
+import os
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .parallel import BACKENDS
+
+
+class RunningStats:
+    """Count, min, max, mean and variance of a stream of values, updated chunk by chunk."""
+
+    def __init__(self):
+        self.count = 0
+        self.n_invalid = 0
+        self.mean = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._m2 = 0.0  # Sum of squared deviations from the mean
+
+    def __repr__(self) -> str:
+        return (
+            f"RunningStats(count={self.count}, mean={self.mean:g}, std={self.std():g}, "
+            f"min={self.min:g}, max={self.max:g}, n_invalid={self.n_invalid})"
+        )
+
+    def update(self, values: np.ndarray) -> "RunningStats":
+        """Fold a chunk of values into the statistics; non-finite values are only counted."""
+        values = np.asarray(values).reshape(-1)
+        finite = np.isfinite(values)
+        n = int(np.count_nonzero(finite))
+        self.n_invalid += values.size - n
+        if n < values.size:
+            values = values[finite]
+        if n == 0:
+            return self
+        mean = values.mean(dtype=np.float64)
+        m2 = values.var(dtype=np.float64) * n
+        self._combine(n, mean, m2, float(values.min()), float(values.max()))
+        return self
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Fold the statistics of another stream into these ones."""
+        self.n_invalid += other.n_invalid
+        if other.count:
+            self._combine(other.count, other.mean, other._m2, other.min, other.max)
+        return self
+
+    def _combine(self, n: int, mean: float, m2: float, low: float, high: float) -> None:
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta**2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def variance(self, ddof: int = 1) -> float:
+        """The variance of the values, nan if there are not more than ``ddof`` of them."""
+        return self._m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def std(self, ddof: int = 1) -> float:
+        """The standard deviation of the values."""
+        return float(np.sqrt(self.variance(ddof)))
+
+
+class Histogram:
+    """A fixed-bin histogram of a stream of values.
+
+    Parameters
+    ----------
+    bins : int
+        The number of equal-width bins.
+    range : tuple of float
+        The lower and upper edge of the histogram. Values outside it are counted
+        in ``underflow`` and ``overflow``; like `np.histogram`, the upper edge
+        belongs to the last bin.
+    """
+
+    def __init__(self, bins: int, range: tuple[float, float]):
+        if bins < 1:
+            raise ValueError(f"bins must be positive, got {bins}")
+        if not range[0] < range[1]:
+            raise ValueError(f"range must be increasing, got {range}")
+        self.range = (float(range[0]), float(range[1]))
+        self.edges = np.linspace(*self.range, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def __repr__(self) -> str:
+        return f"Histogram(bins={self.counts.size}, range={self.range}, total={self.total})"
+
+    @property
+    def total(self) -> int:
+        """The number of values seen, inside the range or not."""
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    def update(self, values: np.ndarray) -> "Histogram":
+        """Count a chunk of finite values."""
+        values = np.asarray(values).reshape(-1)
+        low, high = self.range
+        self.underflow += int(np.count_nonzero(values < low))
+        self.overflow += int(np.count_nonzero(values > high))
+        # Uniform bins take NumPy's bincount fast path; out-of-range values are dropped
+        self.counts += np.histogram(values, bins=self.counts.size, range=self.range)[0]
+        return self
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """Add the counts of another histogram with the same bins."""
+        if other.counts.size != self.counts.size or other.range != self.range:
+            raise ValueError("can only merge histograms with the same bins and range")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def quantile(self, q: float | np.ndarray) -> float | np.ndarray:
+        """Approximate quantiles, accurate to one bin width.
+
+        Parameters
+        ----------
+        q : float or np.ndarray
+            The quantile level(s), between 0 and 1.
+
+        Returns
+        -------
+        float or np.ndarray
+            The value below which a fraction ``q`` of all values lie, interpolated
+            linearly within its bin. nan if it lies outside the histogram range.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if np.any((q < 0) | (q > 1)):
+            raise ValueError("quantile levels must be between 0 and 1")
+        total = self.total
+        if total == 0:
+            return np.full(q.shape, np.nan)[()]
+        cumulative = self.underflow + np.concatenate(([0], np.cumsum(self.counts)))
+        rank = q * total
+        value = np.interp(rank, cumulative, self.edges)
+        outside = (rank < self.underflow) | (rank > cumulative[-1])
+        return np.where(outside, np.nan, value)[()]
+
+
+class StreamingSummary:
+    """Running statistics and an optional histogram of a stream of converted values.
+
+    Parameters
+    ----------
+    bins : int, optional
+        The number of histogram bins. No histogram is kept if omitted.
+    range : tuple of float, optional
+        The histogram range, required with ``bins``.
+    """
+
+    def __init__(self, bins: int | None = None, range: tuple[float, float] | None = None):
+        if (bins is None) != (range is None):
+            raise ValueError("bins and range must be given together")
+        self.stats = RunningStats()
+        self.histogram = Histogram(bins, range) if bins is not None else None
+
+    def __repr__(self) -> str:
+        return f"StreamingSummary({self.stats!r}, {self.histogram!r})"
+
+    def update(self, values: np.ndarray) -> "StreamingSummary":
+        """Fold a chunk of values into the summary.
+
+        ``values`` may also be a converter's result under any invalid policy: of a
+        tuple such as the ``"bitmask"`` policy's ``(result, bits)`` or the
+        ``(value, error)`` of an ``_with_error`` method the first value is
+        summarised, and masked elements count as invalid.
+        """
+        while isinstance(values, tuple):
+            values = values[0]
+        if np.ma.isMaskedArray(values):
+            dtype = np.promote_types(values.dtype, np.float16)
+            values = np.ma.filled(values.astype(dtype, copy=False), np.nan)
+        values = np.asarray(values).reshape(-1)
+        self.stats.update(values)
+        if self.histogram is not None:
+            self.histogram.update(values[np.isfinite(values)])
+        return self
+
+    def merge(self, other: "StreamingSummary") -> "StreamingSummary":
+        """Fold a partial summary, e.g. from another worker, into this one."""
+        self.stats.merge(other.stats)
+        if self.histogram is not None:
+            self.histogram.merge(other.histogram)
+        return self
+
+    def quantile(self, q: float | np.ndarray) -> float | np.ndarray:
+        """Approximate quantiles from the histogram, see `Histogram.quantile`."""
+        if self.histogram is None:
+            raise ValueError("quantiles need a histogram; pass bins and range")
+        return self.histogram.quantile(q)
+
+
+def _summarise_chunk(func, chunk, bins, range) -> StreamingSummary:
+    """Convert one chunk and summarise it, in a worker."""
+    return StreamingSummary(bins, range).update(func(chunk))
+
+
+def summarise(
+    func: Callable,
+    chunks: Iterable[np.ndarray],
+    bins: int | None = None,
+    range: tuple[float, float] | None = None,
+    backend: str = "serial",
+    n_workers: int | None = None,
+) -> StreamingSummary:
+    """Convert a stream of chunks and summarise the results in a single pass.
+
+    Parameters
+    ----------
+    func : callable
+        The conversion, called once per chunk; any converter method such as
+        ``BrightnessConverter.flux_to_mag`` works. For the ``"processes"``
+        backend it must be picklable.
+    chunks : iterable of np.ndarray
+        The input values, e.g. from `catalog.iter_column_chunks`. Consumed once.
+    bins : int, optional
+        The number of histogram bins.
+    range : tuple of float, optional
+        The histogram range, required with ``bins``.
+    backend : str
+        ``"serial"`` (default), ``"threads"`` or ``"processes"``. Parallel
+        backends summarise chunks in workers and merge the partial summaries;
+        only ``2 * n_workers`` chunks are in flight at a time.
+    n_workers : int, optional
+        The number of worker threads or processes.
+
+    Returns
+    -------
+    StreamingSummary
+        The statistics and histogram of all converted values.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    summary = StreamingSummary(bins, range)
+    if backend == "serial":
+        for chunk in chunks:
+            summary.update(func(chunk))
+        return summary
+
+    n_workers = n_workers or os.cpu_count() or 1
+    pool_class = ThreadPoolExecutor if backend == "threads" else ProcessPoolExecutor
+    with pool_class(max_workers=n_workers) as pool:
+        pending = deque()
+        limit = 2 * n_workers
+        for chunk in chunks:
+            pending.append(pool.submit(_summarise_chunk, func, chunk, bins, range))
+            # Bound the chunks held in memory by waiting for the oldest
+            while len(pending) >= limit:
+                summary.merge(pending.popleft().result())
+        while pending:
+            summary.merge(pending.popleft().result())
+    return summary
@@ -0,0 +1,163 @@
+"""
+aio.py
+======
+
+**Description:**
+This module lets asyncio services convert streams of arrays without blocking their
+event loop. `convert_packets` reads packets (arrays of any size) from an async
+iterable, batches them, converts each batch off the loop, and yields the results
+per packet, in the order the packets arrived. It powers `BaseConverter.aconvert`.
+
+**Development Notes (Instructional):**
+1. **Batching without waiting:**
+   A batch is the next packet plus whatever packets have already queued up behind
+   it, up to ``batch_size`` elements. No timer holds a packet back to wait for more:
+   when the converter keeps up, every packet goes out alone with the lowest latency;
+   when it falls behind, packets pile up in the queue and the next batch grows,
+   which amortises the per-call overhead exactly when throughput matters.
+
+2. **Offloading and backpressure:**
+   Batches of at least ``offload_threshold`` elements run in an executor (NumPy
+   releases the GIL inside its loops, so threads convert while the loop keeps
+   serving); smaller ones are cheaper to convert inline than to hand over. At most
+   ``max_pending`` batches are in flight and the packet queue is bounded, so a fast
+   producer is slowed down to the converter's pace instead of filling memory.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from concurrent.futures import Executor
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 1 << 16
+DEFAULT_OFFLOAD_THRESHOLD = 1 << 14
+DEFAULT_MAX_PENDING = 4
+DEFAULT_MAX_QUEUED = 256
+
+
+def _split(result, sizes: list[int], shapes: list[tuple]) -> list:
+    """Cut the result of a batch back into one result per packet."""
+    if isinstance(result, tuple):
+        return list(zip(*(_split(part, sizes, shapes) for part in result), strict=True))
+    if len(sizes) == 1:
+        return [result.reshape(shapes[0])[()]]
+    parts = np.split(result, np.cumsum(sizes)[:-1])
+    return [part.reshape(shape)[()] for part, shape in zip(parts, shapes, strict=True)]
+
+
+def _submit(
+    func: Callable, packets: list[np.ndarray], executor: Executor | None, offload_threshold: int
+) -> tuple[asyncio.Future, list[int], list[tuple]]:
+    """Start converting one batch of packets, in the executor if it is large."""
+    loop = asyncio.get_running_loop()
+    sizes = [packet.size for packet in packets]
+    shapes = [packet.shape for packet in packets]
+    if len(packets) == 1:
+        batch = packets[0].reshape(-1)
+    else:
+        batch = np.concatenate([packet.reshape(-1) for packet in packets])
+    if batch.size >= offload_threshold:
+        return loop.run_in_executor(executor, func, batch), sizes, shapes
+    future = loop.create_future()
+    try:
+        future.set_result(func(batch))
+    except Exception as error:
+        future.set_exception(error)
+    return future, sizes, shapes
+
+
+async def convert_packets(
+    func: Callable,
+    packets: AsyncIterable,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    offload_threshold: int = DEFAULT_OFFLOAD_THRESHOLD,
+    max_pending: int = DEFAULT_MAX_PENDING,
+    max_queued: int = DEFAULT_MAX_QUEUED,
+    executor: Executor | None = None,
+) -> AsyncIterator:
+    """Convert a stream of packets, yielding one result per packet, in order.
+
+    Parameters
+    ----------
+    func : callable
+        A vectorised conversion of one array, e.g. ``BrightnessConverter.flux_to_mag``.
+    packets : async iterable
+        The input arrays (or scalars). The stream is read by a background task
+        while earlier batches are converted.
+    batch_size : int
+        The largest number of elements gathered into one call of ``func``. A
+        single packet larger than this is converted on its own.
+    offload_threshold : int
+        Batches with at least this many elements run in ``executor``; smaller
+        ones are converted on the event loop.
+    max_pending : int
+        The most batches in flight at once. When reached, no further packets are
+        taken until the oldest batch is done.
+    max_queued : int
+        The most packets read ahead of conversion. When reached, the producer
+        waits.
+    executor : concurrent.futures.Executor, optional
+        Where to run large batches; the event loop's default thread pool if omitted.
+
+    Yields
+    ------
+    np.ndarray or tuple
+        The converted values of each packet, with the packet's shape.
+    """
+    if batch_size < 1 or max_pending < 1 or max_queued < 1:
+        raise ValueError("batch_size, max_pending and max_queued must be positive")
+    queue = asyncio.Queue(maxsize=max_queued)
+
+    async def read() -> None:
+        async for packet in packets:
+            await queue.put(np.asarray(packet))
+
+    reader = asyncio.create_task(read())
+    pending = deque()
+    getter = None
+    carry = None  # A packet taken from the queue that did not fit into the last batch
+    finished = False
+    try:
+        while not finished or pending:
+            if not finished and len(pending) < max_pending:
+                if carry is None:
+                    getter = getter or asyncio.ensure_future(queue.get())
+                    waits = {getter, reader}
+                    if pending:
+                        waits.add(pending[0][0])
+                    await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+                    if getter.done():
+                        batch, getter = [getter.result()], None
+                    elif reader.done() and queue.empty():
+                        finished = True
+                        batch = []
+                    else:
+                        batch = []
+                else:
+                    batch, carry = [carry], None
+                size = sum(packet.size for packet in batch)
+                # Take the packets that are already waiting, without waiting for more
+                while batch and size < batch_size and not queue.empty():
+                    packet = queue.get_nowait()
+                    if size + packet.size > batch_size:
+                        carry = packet
+                        break
+                    batch.append(packet)
+                    size += packet.size
+                if batch:
+                    pending.append(_submit(func, batch, executor, offload_threshold))
+            else:
+                # Backpressure: nothing more is read until the oldest batch is done
+                await asyncio.wait({pending[0][0]})
+            while pending and pending[0][0].done():
+                future, sizes, shapes = pending.popleft()
+                for result in _split(future.result(), sizes, shapes):
+                    yield result
+        # Re-raise an error of the packet stream, after the packets before it
+        await reader
+    finally:
+        if getter is not None:
+            getter.cancel()
+        reader.cancel()
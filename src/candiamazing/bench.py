@@ -0,0 +1,351 @@
+"""
+bench.py
+========
+
+**Description:**
+This module contains the performance benchmark suite for the `candiamazing` package.
+It times the functions in `utils.py`, the converter methods in `core.py` and the CLI
+entry point over a range of array sizes and dtypes, writes the results as JSON and
+compares them against a stored baseline to catch throughput regressions.
+
+**Development Notes (Instructional):**
+1. **Warm vs. cold:**
+   A "warm" timing is the best of several repeated calls, which is what a long running
+   pipeline sees. A "cold" timing is a single first call on freshly allocated data (or,
+   for the CLI, a whole new interpreter), which is what a short script sees.
+
+2. **Best-of timings:**
+   Noise on a shared machine only ever makes a run slower, so the minimum over
+   repeats is the most stable estimate of the true cost of a call.
+
+Run it with either
+
+candiamazing bench --output results.json
+candiamazing bench --baseline results.json
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterable
+
+import numpy as np
+
+from . import constants, scalar, utils
+from .core import BrightnessConverter, DistanceConverter
+
+SCALAR = None  # Size marker for a plain Python float input
+DEFAULT_SIZES = constants.BENCH_SIZES
+DEFAULT_DTYPES = constants.BENCH_DTYPES
+DEFAULT_TOLERANCE = constants.BENCH_TOLERANCE
+ZEROPOINT = 25.0
+APPROX = 1e-4  # Tolerance, in magnitudes, of the approximate-mode benchmarks
+PACKETS = 64  # Packets per stream in the asyncio benchmarks
+# Shorter times are below what the timer can measure; clamping keeps throughputs finite
+RESOLUTION = time.get_clock_info("perf_counter").resolution
+
+# Input ranges that keep every conversion in its valid domain
+INPUT_RANGES = {
+    "flux": (1.0, 1e4),
+    "mag": (10.0, 30.0),
+    "distmod": (0.0, 40.0),
+    "distance": (10.0, 1e9),
+}
+
+
+def _conversions() -> dict[str, tuple[Callable, str]]:
+    """The benchmarked callables, with the kind of input each one expects."""
+    brightness = BrightnessConverter(zeropoint=ZEROPOINT)
+    distance = DistanceConverter()
+    return {
+        # The pure-math functions behind the converters' scalar fast path, timed for
+        # Python floats only: the converter methods should cost little more
+        "scalar.flux_to_mag": (lambda x: scalar.flux_to_mag(x, ZEROPOINT), "flux"),
+        "scalar.mag_to_flux": (lambda x: scalar.mag_to_flux(x, ZEROPOINT), "mag"),
+        "utils.flux_to_mag": (lambda x: utils.flux_to_mag(x, ZEROPOINT), "flux"),
+        "utils.mag_to_flux": (lambda x: utils.mag_to_flux(x, ZEROPOINT), "mag"),
+        "utils.mag_to_flux[approx]": (
+            lambda x: utils.mag_to_flux(x, ZEROPOINT, approx=APPROX),
+            "mag",
+        ),
+        "utils.distance_modulus_to_distance": (utils.distance_modulus_to_distance, "distmod"),
+        "utils.distance_to_distance_modulus": (utils.distance_to_distance_modulus, "distance"),
+        "BrightnessConverter.flux_to_mag": (brightness.flux_to_mag, "flux"),
+        "BrightnessConverter.mag_to_flux": (brightness.mag_to_flux, "mag"),
+        "DistanceConverter.distmod_to_distance": (distance.distmod_to_distance, "distmod"),
+        "DistanceConverter.distance_to_distmod": (distance.distance_to_distmod, "distance"),
+    }
+
+
+def make_input(kind: str, size: int | None, dtype: str, seed: int = 0) -> float | np.ndarray:
+    """Create benchmark input of the given kind, or a Python float if ``size`` is None."""
+    low, high = INPUT_RANGES[kind]
+    if size is SCALAR:
+        return (low + high) / 2
+    rng = np.random.default_rng(seed)
+    return rng.uniform(low, high, size).astype(dtype)
+
+
+def time_call(func: Callable[[], object], repeat: int = 5, min_time: float = 0.02) -> float:
+    """Return the best per-call time of ``func`` in seconds, after one warm-up call.
+
+    Each of the ``repeat`` measurements loops over enough calls to take at least
+    ``min_time`` seconds, so very fast calls are not dominated by timer resolution.
+    """
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 10
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _result(name: str, size: int | None, dtype: str, mode: str, seconds: float) -> dict:
+    elements = 1 if size is SCALAR else size
+    seconds = max(seconds, RESOLUTION)
+    return {
+        "name": name,
+        "size": size,
+        "dtype": dtype,
+        "mode": mode,
+        "seconds": seconds,
+        "throughput": elements / seconds,
+    }
+
+
+def bench_conversions(
+    sizes: Iterable[int | None] = DEFAULT_SIZES,
+    dtypes: Iterable[str] = DEFAULT_DTYPES,
+    repeat: int = 5,
+) -> list[dict]:
+    """Time every conversion in `utils.py` and `core.py`, cold and warm.
+
+    Parameters
+    ----------
+    sizes : iterable of int or None
+        Array sizes to time. None stands for a plain Python float.
+    dtypes : iterable of str
+        NumPy dtypes of the input arrays. Scalars are timed once, as ``"float"``.
+    repeat : int
+        The number of warm measurements to take the best of.
+
+    Returns
+    -------
+    list of dict
+        One record per (conversion, size, dtype, mode).
+    """
+    results = []
+    for name, (func, kind) in _conversions().items():
+        for size in sizes:
+            if name.startswith("scalar.") and size is not SCALAR:
+                continue
+            for dtype in ("float",) if size is SCALAR else dtypes:
+                x = make_input(kind, size, "float64" if size is SCALAR else dtype)
+
+                start = time.perf_counter()
+                func(x)
+                results.append(_result(name, size, dtype, "cold", time.perf_counter() - start))
+
+                seconds = time_call(lambda: func(x), repeat=repeat)  # noqa: B023
+                results.append(_result(name, size, dtype, "warm", seconds))
+    return results
+
+
+def bench_cli(repeat: int = 5) -> list[dict]:
+    """Time the CLI: start-up for ``--help`` and a scalar ``flux_to_mag``.
+
+    Cold timings run each command in a new interpreter, as a shell script would.
+    The warm timing calls `cli.main` in-process.
+    """
+    from .cli import main
+
+    argv = ["flux_to_mag", "100.0", str(ZEROPOINT)]
+
+    def run_in_process():
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(argv)
+
+    def new_interpreter(args):
+        def run():
+            subprocess.run(
+                [sys.executable, "-m", "candiamazing.cli", *args],
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+
+        return min(time_call(run, repeat=1, min_time=0) for _ in range(repeat))
+
+    return [
+        _result("cli.help", SCALAR, "float", "cold", new_interpreter(["--help"])),
+        _result("cli.main", SCALAR, "float", "cold", new_interpreter(argv)),
+        _result("cli.main", SCALAR, "float", "warm", time_call(run_in_process, repeat=repeat)),
+    ]
+
+
+def bench_async(sizes: Iterable[int | None] = DEFAULT_SIZES, repeat: int = 5) -> list[dict]:
+    """Time `BaseConverter.aconvert` against calling the method on each packet in turn.
+
+    Each size is the number of elements per packet, in a stream of `PACKETS`
+    float64 packets. Times are per packet: the warm throughput of the synchronous
+    loop and of the async stream, and the mean latency from a packet being produced
+    to its result being yielded.
+    """
+    converter = BrightnessConverter(zeropoint=ZEROPOINT)
+    loop = asyncio.new_event_loop()
+    results = []
+    try:
+        for size in sizes:
+            if size is SCALAR:
+                continue
+            packets = [make_input("flux", size, "float64", seed) for seed in range(PACKETS)]
+
+            def run_sync():
+                for packet in packets:  # noqa: B023
+                    converter.flux_to_mag(packet)
+
+            async def produce(stamps):
+                for packet in packets:  # noqa: B023
+                    stamps.append(time.perf_counter())
+                    yield packet
+                    await asyncio.sleep(0)
+
+            async def consume(stamps=None):
+                stamps = [] if stamps is None else stamps
+                latency = 0.0
+                async for _ in converter.aconvert("flux_to_mag", produce(stamps)):
+                    latency += time.perf_counter() - stamps[0]
+                    del stamps[0]
+                return latency / PACKETS
+
+            seconds = time_call(run_sync, repeat=repeat) / PACKETS
+            name = "BrightnessConverter.flux_to_mag[packets]"
+            results.append(_result(name, size, "float64", "warm", seconds))
+            seconds = time_call(lambda: loop.run_until_complete(consume()), repeat=repeat)
+            name = "BrightnessConverter.aconvert"
+            results.append(_result(name, size, "float64", "warm", seconds / PACKETS))
+            latency = min(loop.run_until_complete(consume()) for _ in range(repeat))
+            name = "BrightnessConverter.aconvert[latency]"
+            results.append(_result(name, size, "float64", "warm", latency))
+    finally:
+        loop.close()
+    return results
+
+
+def run_benchmarks(
+    sizes: Iterable[int | None] = DEFAULT_SIZES,
+    dtypes: Iterable[str] = DEFAULT_DTYPES,
+    repeat: int = 5,
+    cli: bool = True,
+    aio: bool = True,
+) -> dict:
+    """Run the whole benchmark suite.
+
+    Returns
+    -------
+    dict
+        A JSON-serialisable report with a ``"meta"`` block describing the machine
+        and library versions, and the list of ``"results"``.
+    """
+    from . import __version__
+
+    sizes = list(sizes)
+    dtypes = list(dtypes)
+    results = bench_conversions(sizes=sizes, dtypes=dtypes, repeat=repeat)
+    if aio:
+        results.extend(bench_async(sizes=sizes, repeat=repeat))
+    if cli:
+        results.extend(bench_cli(repeat=repeat))
+    return {
+        "meta": {
+            "candiamazing": __version__,
+            "numpy": np.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+
+def _key(record: dict) -> tuple:
+    return (record["name"], record["size"], record["dtype"], record["mode"])
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """Find benchmarks whose time grew by more than ``tolerance`` against a baseline.
+
+    Parameters
+    ----------
+    report, baseline : dict
+        Reports as produced by `run_benchmarks`. Records missing from either
+        report are ignored.
+    tolerance : float
+        The allowed fractional slowdown, e.g. 0.25 for 25%.
+
+    Returns
+    -------
+    list of dict
+        One entry per regression, with the current and baseline timings and
+        their ratio.
+    """
+    reference = {_key(record): record for record in baseline["results"]}
+    regressions = []
+    for record in report["results"]:
+        base = reference.get(_key(record))
+        if base is None or base["seconds"] <= 0:
+            continue
+        ratio = record["seconds"] / base["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                {
+                    "name": record["name"],
+                    "size": record["size"],
+                    "dtype": record["dtype"],
+                    "mode": record["mode"],
+                    "seconds": record["seconds"],
+                    "baseline_seconds": base["seconds"],
+                    "ratio": ratio,
+                }
+            )
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    """Render a report as a human readable table."""
+    lines = [f"{'benchmark':<40} {'size':>10} {'dtype':>8} {'mode':>5} {'time':>12} {'elem/s':>10}"]
+    for record in report["results"]:
+        size = "scalar" if record["size"] is SCALAR else f"{record['size']:.0e}"
+        lines.append(
+            f"{record['name']:<40} {size:>10} {record['dtype']:>8} {record['mode']:>5} "
+            f"{record['seconds'] * 1e6:>10.2f}us {record['throughput']:>10.3g}"
+        )
+    return "\n".join(lines)
+
+
+def save_report(report: dict, path: str) -> None:
+    """Write a report to ``path`` as strict JSON (no ``NaN`` or ``Infinity``)."""
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, allow_nan=False)
+
+
+def load_report(path: str) -> dict:
+    """Read a report written by `save_report`."""
+    with open(path) as f:
+        return json.load(f)
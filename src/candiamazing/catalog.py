@@ -0,0 +1,412 @@
+"""
+catalog.py
+==========
+
+**Description:**
+This module handles reading and writing catalogs in bounded-size chunks so that
+the conversions in `utils.py` can be applied to inputs far larger than memory.
+Text catalogs are streamed line by line, while binary arrays (``.npy`` files or
+raw dumps) are memory-mapped and converted block by block.
+
+**Development Notes (Instructional):**
+1. **Why chunks?**
+   Calling a conversion once per row pays Python overhead per row, while loading a
+   whole catalog at once pays memory proportional to the catalog. Reading a fixed
+   number of rows into a NumPy array and converting that array in one call keeps
+   memory bounded by the chunk size and leaves the heavy lifting to NumPy.
+
+2. **Streams, not filenames:**
+   The functions below take already-open text streams. This lets the same code
+   serve files, pipes (`sys.stdin`/`sys.stdout`) and in-memory buffers in tests.
+
+3. **Column views:**
+   Catalogs already in memory are NumPy structured arrays or mappings of column
+   names to arrays (e.g. record batches). Indexing a structured array by field name
+   gives a strided view into the record memory, not a copy, so conversions can read
+   their inputs and write their results in place through `column`.
+"""
+
+import os
+import re
+import warnings
+from collections.abc import Callable, Iterator, Mapping, MutableMapping
+from itertools import islice
+from typing import TextIO
+
+import numpy as np
+
+from . import constants
+
+DEFAULT_CHUNKSIZE = constants.CATALOG_CHUNKSIZE
+DEFAULT_BLOCKSIZE = constants.ARRAY_BLOCKSIZE
+RAW_DTYPE = constants.RAW_DTYPE
+
+
+def _column_index(header: str, column: str, delimiter: str) -> int:
+    """Find the position of ``column`` in a delimited header line."""
+    names = [name.strip() for name in header.rstrip("\r\n").split(delimiter)]
+    try:
+        return names.index(column)
+    except ValueError:
+        raise KeyError(f"Column {column!r} not found in header {names}") from None
+
+
+def _parse_chunk(lines: list[str], index: int, delimiter: str, first_line: int) -> np.ndarray:
+    """Parse column ``index`` of a chunk of lines; errors name the offending line."""
+    try:
+        # loadtxt parses the whole chunk in compiled code, no per-row Python
+        return np.loadtxt(lines, delimiter=delimiter, usecols=index, dtype=np.float64, ndmin=1)
+    except ValueError:
+        pass
+    # Only on failure: find the first bad line, since loadtxt's row numbers
+    # count from the chunk (and not consistently from 0 or 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # Blank and comment lines hold no data
+        for offset, line in enumerate(lines):
+            try:
+                np.loadtxt([line], delimiter=delimiter, usecols=index, dtype=np.float64)
+            except ValueError as error:
+                reason = re.sub(r" at row \d+", "", str(error)).rstrip(".")
+                number = first_line + offset
+                raise ValueError(f"line {number}: {reason}: {line.strip()!r}") from None
+    raise ValueError(f"lines {first_line}-{first_line + len(lines) - 1} could not be parsed")
+
+
+def iter_column_chunks(
+    stream: TextIO,
+    column: str | None = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    delimiter: str = ",",
+) -> Iterator[np.ndarray]:
+    """Read one numeric column from a delimited text stream in chunks.
+
+    Parameters
+    ----------
+    stream : TextIO
+        An open text stream, e.g. a file or ``sys.stdin``.
+    column : str, optional
+        Name of the column to read. If given, the first line of the stream is
+        treated as a header. If omitted, the stream has no header and the
+        first column is read.
+    chunksize : int
+        The maximum number of rows held in memory at once.
+    delimiter : str
+        The field delimiter.
+
+    Yields
+    ------
+    np.ndarray
+        Float64 arrays of at most ``chunksize`` values.
+
+    Raises
+    ------
+    KeyError
+        If ``column`` is not in the header.
+    ValueError
+        If a row has no numeric value in the column; the message gives its line
+        number in the stream.
+    """
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be positive, got {chunksize}")
+
+    index, line = 0, 1
+    if column is not None:
+        header = stream.readline()
+        if not header:
+            return
+        index = _column_index(header, column, delimiter)
+        line = 2
+
+    while True:
+        lines = list(islice(stream, chunksize))
+        if not lines:
+            return
+        yield _parse_chunk(lines, index, delimiter, line)
+        line += len(lines)
+
+
+def write_column_chunks(
+    stream: TextIO,
+    chunks: Iterator[np.ndarray],
+    name: str | None = None,
+) -> int:
+    """Write chunks of values to a text stream, one value per line.
+
+    Parameters
+    ----------
+    stream : TextIO
+        An open text stream, e.g. a file or ``sys.stdout``.
+    chunks : iterator of np.ndarray
+        The values to write.
+    name : str, optional
+        If given, written as a header line before the values.
+
+    Returns
+    -------
+    int
+        The number of values written.
+    """
+    if name is not None:
+        stream.write(f"{name}\n")
+
+    count = 0
+    for chunk in chunks:
+        if chunk.size == 0:
+            continue
+        stream.write("\n".join(map(str, chunk.tolist())))
+        stream.write("\n")
+        count += chunk.size
+    return count
+
+
+def convert_stream(
+    func: Callable[[np.ndarray], np.ndarray],
+    instream: TextIO,
+    outstream: TextIO,
+    column: str | None = None,
+    output_column: str | None = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    delimiter: str = ",",
+) -> int:
+    """Apply a conversion to a catalog column, streaming chunk by chunk.
+
+    Parameters
+    ----------
+    func : callable
+        A vectorised conversion, called once per chunk.
+    instream, outstream : TextIO
+        Open text streams to read from and write to.
+    column : str, optional
+        Name of the input column, see `iter_column_chunks`.
+    output_column : str, optional
+        Header for the output column. Only written if the input had a header.
+    chunksize : int
+        The maximum number of rows held in memory at once.
+    delimiter : str
+        The field delimiter of the input.
+
+    Returns
+    -------
+    int
+        The number of rows converted.
+    """
+    chunks = iter_column_chunks(instream, column=column, chunksize=chunksize, delimiter=delimiter)
+    name = output_column if column is not None else None
+    return write_column_chunks(outstream, (func(chunk) for chunk in chunks), name=name)
+
+
+def open_array(path: str | os.PathLike, dtype: str = RAW_DTYPE) -> np.ndarray:
+    """Memory-map a ``.npy`` file or raw binary dump for reading.
+
+    Parameters
+    ----------
+    path : str or PathLike
+        The file to open. Files ending in ``.npy`` are read with their own
+        header, anything else is treated as a flat raw array.
+    dtype : str
+        The element type of raw files, little-endian float64 by default.
+        Ignored for ``.npy`` files.
+
+    Returns
+    -------
+    np.ndarray
+        A read-only memory map; no data is read until it is accessed.
+    """
+    if os.fspath(path).endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    if os.path.getsize(path) == 0:
+        # np.memmap cannot map an empty file
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def create_array(
+    path: str | os.PathLike,
+    shape: tuple[int, ...],
+    dtype: str = RAW_DTYPE,
+    fortran_order: bool = False,
+) -> np.ndarray:
+    """Pre-allocate a memory-mapped output file.
+
+    Parameters
+    ----------
+    path : str or PathLike
+        The file to create. Files ending in ``.npy`` get a NumPy header,
+        anything else is written as a flat raw array.
+    shape : tuple of int
+        The shape of the array.
+    dtype : str
+        The element type of the output.
+    fortran_order : bool
+        Lay the array out in Fortran (column-major) order rather than C order.
+
+    Returns
+    -------
+    np.ndarray
+        A writable memory map backed by ``path``.
+    """
+    order = "F" if fortran_order else "C"
+    if os.fspath(path).endswith(".npy"):
+        return np.lib.format.open_memmap(
+            path, mode="w+", dtype=dtype, shape=shape, fortran_order=fortran_order
+        )
+    if np.prod(shape) == 0:
+        # np.memmap cannot map an empty file, so just leave one behind
+        open(path, "wb").close()
+        return np.empty(shape, dtype=dtype, order=order)
+    return np.memmap(path, dtype=dtype, mode="w+", shape=shape, order=order)
+
+
+def _flat_view(array: np.ndarray) -> np.ndarray:
+    """A 1-d view of a contiguous array, in its memory order; never a copy."""
+    flat = array.ravel(order="K")
+    if array.size and not np.may_share_memory(flat, array):
+        raise ValueError("Expected a C- or Fortran-contiguous array")
+    return flat
+
+
+def convert_array(
+    func: Callable[[np.ndarray], np.ndarray],
+    input_path: str | os.PathLike,
+    output_path: str | os.PathLike,
+    blocksize: int = DEFAULT_BLOCKSIZE,
+    dtype: str = RAW_DTYPE,
+    pass_out: bool = False,
+) -> int:
+    """Apply a conversion to a memory-mapped array, block by block.
+
+    Only one block of the input is paged in at a time and each result is
+    written straight into the memory-mapped output, so the whole array is
+    never held in memory. The output has the shape and memory order (C or
+    Fortran) of the input, and blocks follow that order through both files.
+
+    Parameters
+    ----------
+    func : callable
+        A vectorised conversion, called once per block.
+    input_path, output_path : str or PathLike
+        The files to read from and write to, see `open_array`.
+    blocksize : int
+        The number of elements converted per block.
+    dtype : str
+        The element type of raw input and output files.
+    pass_out : bool
+        If True, ``func`` is called as ``func(block, out=target_block)`` so it
+        writes straight into the output map without a temporary block.
+
+    Returns
+    -------
+    int
+        The number of elements converted.
+    """
+    if blocksize < 1:
+        raise ValueError(f"blocksize must be positive, got {blocksize}")
+
+    source = open_array(input_path, dtype=dtype)
+    if not os.fspath(output_path).endswith(".npy"):
+        out_dtype = np.dtype(dtype)
+    elif np.issubdtype(source.dtype, np.floating):
+        out_dtype = source.dtype
+    else:
+        out_dtype = np.dtype(np.float64)
+    # The output takes the input's memory order, so that flat views of both maps
+    # list the elements in the same order: blocks are then plain slices (no
+    # copies) and each file is read or written front to back
+    fortran = source.flags.f_contiguous and not source.flags.c_contiguous
+    target = create_array(output_path, source.shape, dtype=out_dtype, fortran_order=fortran)
+    flat_source = _flat_view(source)
+    flat_target = _flat_view(target)
+    for start in range(0, flat_source.size, blocksize):
+        block = slice(start, start + blocksize)
+        if pass_out:
+            func(flat_source[block], out=flat_target[block])
+        else:
+            flat_target[block] = func(flat_source[block])
+
+    if isinstance(target, np.memmap):
+        target.flush()
+    return flat_source.size
+
+
+def column(table: np.ndarray | Mapping, name: str) -> np.ndarray:
+    """A zero-copy view of one column of an in-memory table.
+
+    Parameters
+    ----------
+    table : np.ndarray or Mapping
+        A structured array, or a mapping of column names to arrays.
+    name : str
+        The column to view.
+
+    Returns
+    -------
+    np.ndarray
+        The field view of a structured array, or the column of a mapping as an
+        array (not copied if it already is one or exposes its buffer).
+    """
+    names = column_names(table)
+    if name not in names:
+        raise KeyError(f"Column {name!r} not found in table columns {list(names)}")
+    return table[name] if isinstance(table, np.ndarray) else np.asarray(table[name])
+
+
+def column_names(table: np.ndarray | Mapping) -> tuple[str, ...]:
+    """The column names of a structured array or a mapping of columns."""
+    if isinstance(table, np.ndarray):
+        if table.dtype.names is None:
+            raise TypeError(f"Expected a structured array, got dtype {table.dtype}")
+        return table.dtype.names
+    return tuple(table)
+
+
+def add_columns(
+    table: np.ndarray | MutableMapping, columns: Mapping[str, np.dtype], shape: tuple[int, ...]
+) -> np.ndarray | MutableMapping:
+    """Make sure ``table`` has writable columns of the given names.
+
+    Parameters
+    ----------
+    table : np.ndarray or MutableMapping
+        A structured array, or a mapping of column names to arrays.
+    columns : Mapping
+        The element type of each column, used for the columns that are created.
+    shape : tuple of int
+        The shape of the columns of a mapping.
+
+    Returns
+    -------
+    np.ndarray or MutableMapping
+        For a structured array, ``table`` itself if it already has every field,
+        else a new structured array with the missing fields appended (the record
+        memory cannot grow in place, so this copies each field once). A mapping is
+        updated in place: columns that are not writable float arrays of ``shape``
+        (e.g. read-only Arrow buffers, integer arrays or lists) are replaced by new
+        arrays holding a copy of their values, and missing columns by new empty
+        arrays.
+    """
+    names = column_names(table)
+    if isinstance(table, np.ndarray):
+        new = [name for name in columns if name not in names]
+        if not new:
+            return table
+        fields = [(name, table.dtype.fields[name][0]) for name in names]
+        grown = np.empty(table.shape, dtype=fields + [(name, columns[name]) for name in new])
+        for name in names:
+            grown[name] = table[name]
+        return grown
+
+    for name, dtype in columns.items():
+        current = table.get(name)
+        if not (
+            isinstance(current, np.ndarray)
+            and current.flags.writeable
+            and current.shape == shape
+            and current.dtype.kind == "f"
+        ):
+            fresh = np.empty(shape, dtype=dtype)
+            if current is not None and np.shape(current) == shape:
+                # The column may also be an input (converted in place), so its
+                # values must survive the replacement
+                fresh[...] = current
+            table[name] = fresh
+    return table
@@ -9,11 +9,24 @@ Try it with either
 python ./src/candiamazing/cli.py --help
 candiamazing --help
 
+Only the standard library and the NumPy-free `constants` and `scalar` modules are
+imported up front. Everything that needs NumPy is imported inside the command
+that uses it, so ``--help`` and single-value conversions start quickly.
 """
 
 import argparse
+import sys
+from contextlib import ExitStack
 
-from candiamazing import utils
+from candiamazing import constants, scalar
+
+# Conversion methods available to array subcommands, and the converter class that provides each
+ARRAY_CONVERSIONS = {
+    "flux_to_mag": "BrightnessConverter",
+    "mag_to_flux": "BrightnessConverter",
+    "distance_to_distmod": "DistanceConverter",
+    "distmod_to_distance": "DistanceConverter",
+}
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -30,7 +43,8 @@ def build_parser() -> argparse.ArgumentParser:
     The parser includes:
     - A short description of the tool.
     - An epilog with runnable examples.
-    - Two subcommands: 'flux_to_mag' and 'mag_to_flux'.
+    - Subcommands: 'flux_to_mag', 'mag_to_flux', 'convert_array',
+      'convert_files', 'bench' and 'serve'.
 
     The epilog uses ``RawDescriptionHelpFormatter`` so that newlines and
     indentation are preserved in the help output.
@@ -42,11 +56,23 @@ def build_parser() -> argparse.ArgumentParser:
         epilog=(
             "Examples:\n"
             "  candiamazing flux_to_mag 3631 8.9\n"
-            "  candiamazing mag_to_flux 10 8.9\n\n"
+            "  candiamazing mag_to_flux 10 8.9\n"
+            "  candiamazing flux_to_mag --input catalog.csv --column flux 8.9\n"
+            "  candiamazing convert_array flux_to_mag fluxes.npy mags.npy --zeropoint 8.9\n"
+            "  candiamazing convert_files flux_to_mag 'fields/*.csv' --output-dir mags "
+            "--column flux --zeropoint 8.9 --workers 8\n"
+            "  candiamazing --profile flux_to_mag --input catalog.csv --column flux 8.9\n"
+            "  candiamazing bench --output results.json\n"
+            "  candiamazing serve --socket /tmp/candiamazing.sock\n\n"
             "Run `candiamazing <command> -h` for command-specific help."
         ),
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the calls, elements and time spent in each conversion to stderr",
+    )
 
     subparsers = parser.add_subparsers(
         dest="command",
@@ -55,6 +81,10 @@ def build_parser() -> argparse.ArgumentParser:
     )
     add_flux_to_mag_subcommand(subparsers)
     add_mag_to_flux_subcommand(subparsers)
+    add_convert_array_subcommand(subparsers)
+    add_convert_files_subcommand(subparsers)
+    add_bench_subcommand(subparsers)
+    add_serve_subcommand(subparsers)
 
     return parser
 
@@ -66,12 +96,14 @@ def add_flux_to_mag_subcommand(subparsers: argparse._SubParsersAction) -> None:
         "flux_to_mag",
         help="Convert flux to magnitude",
     )
-    parser_flux_to_mag.add_argument("flux", type=float, help="The flux value")
+    source = parser_flux_to_mag.add_mutually_exclusive_group(required=True)
+    source.add_argument("flux", type=float, nargs="?", help="The flux value")
     parser_flux_to_mag.add_argument(
         "zeropoint",
         type=float,
         help="The zeropoint for the magnitude system",
     )
+    add_batch_arguments(parser_flux_to_mag, source, default_output_column="mag")
     parser_flux_to_mag.set_defaults(func=run_flux_to_mag)
 
 
@@ -82,34 +114,396 @@ def add_mag_to_flux_subcommand(subparsers: argparse._SubParsersAction) -> None:
         "mag_to_flux",
         help="Convert magnitude to flux",
     )
-    parser_mag_to_flux.add_argument("mag", type=float, help="The magnitude value")
+    source = parser_mag_to_flux.add_mutually_exclusive_group(required=True)
+    source.add_argument("mag", type=float, nargs="?", help="The magnitude value")
     parser_mag_to_flux.add_argument(
         "zeropoint",
         type=float,
         help="The zeropoint for the magnitude system",
     )
+    add_batch_arguments(parser_mag_to_flux, source, default_output_column="flux")
     parser_mag_to_flux.set_defaults(func=run_mag_to_flux)
 
 
+def add_convert_array_subcommand(subparsers: argparse._SubParsersAction) -> None:
+    """Register the 'convert_array' subcommand and its arguments."""
+
+    parser_convert_array = subparsers.add_parser(
+        "convert_array",
+        help="Convert a .npy file or raw binary array out-of-core",
+    )
+    parser_convert_array.add_argument(
+        "conversion",
+        choices=sorted(ARRAY_CONVERSIONS),
+        help="The conversion to apply",
+    )
+    parser_convert_array.add_argument("input", help="Input .npy file or raw binary dump")
+    parser_convert_array.add_argument("output", help="Output file, created or overwritten")
+    parser_convert_array.add_argument(
+        "--zeropoint",
+        type=float,
+        help="The zeropoint for the magnitude system (flux/mag conversions only)",
+    )
+    parser_convert_array.add_argument(
+        "--blocksize",
+        type=int,
+        default=constants.ARRAY_BLOCKSIZE,
+        help=f"Elements converted per block (default: {constants.ARRAY_BLOCKSIZE})",
+    )
+    parser_convert_array.add_argument(
+        "--dtype",
+        default=constants.RAW_DTYPE,
+        help=f"Element type of raw (non-.npy) files (default: {constants.RAW_DTYPE})",
+    )
+    parser_convert_array.set_defaults(func=run_convert_array)
+
+
+def add_convert_files_subcommand(subparsers: argparse._SubParsersAction) -> None:
+    """Register the 'convert_files' subcommand and its arguments."""
+
+    parser_convert_files = subparsers.add_parser(
+        "convert_files",
+        help="Convert many catalog files in parallel, skipping those already up to date",
+    )
+    parser_convert_files.add_argument(
+        "conversion",
+        choices=sorted(ARRAY_CONVERSIONS),
+        help="The conversion to apply",
+    )
+    parser_convert_files.add_argument(
+        "inputs", nargs="+", help="Input files or glob patterns (quote them to skip the shell)"
+    )
+    parser_convert_files.add_argument(
+        "--output-dir", required=True, help="Directory to write the converted files to"
+    )
+    parser_convert_files.add_argument(
+        "--zeropoint",
+        type=float,
+        help="The zeropoint for the magnitude system (flux/mag conversions only)",
+    )
+    parser_convert_files.add_argument(
+        "--workers", type=int, default=1, help="Worker processes (default: 1)"
+    )
+    parser_convert_files.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Spread the outputs over this many shard-NNN directories (default: 1, flat)",
+    )
+    parser_convert_files.add_argument(
+        "--format",
+        choices=("auto", "text", "array"),
+        default="auto",
+        help="Input format; 'auto' treats .npy files as arrays, others as text (default)",
+    )
+    parser_convert_files.add_argument(
+        "--hash",
+        action="store_true",
+        help="Detect changed inputs by content hash instead of size and modification time",
+    )
+    parser_convert_files.add_argument(
+        "--force", action="store_true", help="Convert every input, even if up to date"
+    )
+    parser_convert_files.add_argument(
+        "--column",
+        help="Name of the input column of text catalogs (the first line is then a header)",
+    )
+    parser_convert_files.add_argument(
+        "--output-column",
+        help="Header of the output column of text catalogs (default: the converted "
+        "quantity, e.g. 'mag')",
+    )
+    parser_convert_files.add_argument(
+        "--chunksize",
+        type=int,
+        default=constants.CATALOG_CHUNKSIZE,
+        help=f"Rows converted per chunk (default: {constants.CATALOG_CHUNKSIZE})",
+    )
+    parser_convert_files.add_argument(
+        "--delimiter", default=",", help="Field delimiter (default: ',')"
+    )
+    parser_convert_files.set_defaults(func=run_convert_files)
+
+
+def parse_size(text: str) -> int | None:
+    """Parse a benchmark size such as ``1e6``, or ``scalar`` for a plain float."""
+    if text == "scalar":
+        return None
+    try:
+        return int(float(text))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}") from None
+
+
+def add_bench_subcommand(subparsers: argparse._SubParsersAction) -> None:
+    """Register the 'bench' subcommand and its arguments."""
+
+    parser_bench = subparsers.add_parser(
+        "bench",
+        help="Run the performance benchmark suite",
+    )
+    parser_bench.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=list(constants.BENCH_SIZES),
+        help="Array sizes to time, e.g. 'scalar 1e4 1e8' (default: scalar 100 1e4 1e6)",
+    )
+    parser_bench.add_argument(
+        "--dtypes",
+        nargs="+",
+        default=list(constants.BENCH_DTYPES),
+        help="Input dtypes to time (default: float64 float32)",
+    )
+    parser_bench.add_argument(
+        "--repeat", type=int, default=5, help="Warm measurements per benchmark (default: 5)"
+    )
+    parser_bench.add_argument("--no-cli", action="store_true", help="Skip the CLI benchmarks")
+    parser_bench.add_argument(
+        "--no-async", action="store_true", help="Skip the asyncio streaming benchmarks"
+    )
+    parser_bench.add_argument("--output", help="Write the results to this JSON file")
+    parser_bench.add_argument(
+        "--baseline",
+        help="Compare against this JSON file; exit with status 1 on a regression",
+    )
+    parser_bench.add_argument(
+        "--tolerance",
+        type=float,
+        default=constants.BENCH_TOLERANCE,
+        help="Allowed fractional slowdown against the baseline "
+        f"(default: {constants.BENCH_TOLERANCE})",
+    )
+    parser_bench.set_defaults(func=run_bench)
+
+
+def add_serve_subcommand(subparsers: argparse._SubParsersAction) -> None:
+    """Register the 'serve' subcommand and its arguments."""
+
+    parser_serve = subparsers.add_parser(
+        "serve",
+        help="Run a persistent conversion server",
+        description="Answer JSON-lines or binary-frame conversion requests from a warm "
+        "interpreter, see candiamazing.server for the protocol.",
+    )
+    parser_serve.add_argument(
+        "--socket",
+        help="Listen on this Unix socket path instead of reading stdin and writing stdout",
+    )
+    parser_serve.set_defaults(func=run_serve)
+
+
+def add_batch_arguments(
+    parser: argparse.ArgumentParser,
+    source: argparse._MutuallyExclusiveGroup,
+    default_output_column: str,
+) -> None:
+    """Register the options for converting a whole catalog instead of one value."""
+
+    source.add_argument(
+        "--input",
+        help="Catalog file to convert in batch mode, or '-' for stdin",
+    )
+    parser.add_argument(
+        "--column",
+        help="Name of the input column (the first line is then read as a header). "
+        "Without it the input is a single headerless column.",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="File to write converted values to, or '-' for stdout (default)",
+    )
+    parser.add_argument(
+        "--output-column",
+        default=default_output_column,
+        help=f"Header of the output column (default: {default_output_column})",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=constants.CATALOG_CHUNKSIZE,
+        help=f"Rows converted per chunk (default: {constants.CATALOG_CHUNKSIZE})",
+    )
+    parser.add_argument("--delimiter", default=",", help="Field delimiter (default: ',')")
+
+
+def run_batch(args: argparse.Namespace, func) -> int:
+    """Stream a catalog from ``args.input`` through ``func`` into ``args.output``."""
+    from candiamazing import catalog
+
+    with ExitStack() as stack:
+        if args.input == "-":
+            instream = sys.stdin
+        else:
+            instream = stack.enter_context(open(args.input, newline=""))
+        if args.output == "-":
+            outstream = sys.stdout
+        else:
+            outstream = stack.enter_context(open(args.output, "w"))
+
+        try:
+            catalog.convert_stream(
+                func,
+                instream,
+                outstream,
+                column=args.column,
+                output_column=args.output_column,
+                chunksize=args.chunksize,
+                delimiter=args.delimiter,
+            )
+        except KeyError as error:
+            # An unknown --column; args[0] is the message without KeyError's quotes
+            raise SystemExit(f"error: {error.args[0]}") from None
+        except ValueError as error:
+            # A malformed row, reported with its line number
+            raise SystemExit(f"error: {args.input}: {error}") from None
+    return 0
+
+
 def run_flux_to_mag(args: argparse.Namespace) -> int:
     """Execute the 'flux_to_mag' command."""
-    mag = utils.flux_to_mag(args.flux, args.zeropoint)
+    if args.input is not None:
+        from candiamazing import utils
+
+        return run_batch(args, lambda flux: utils.flux_to_mag(flux, args.zeropoint))
+    mag = scalar.flux_to_mag(args.flux, args.zeropoint)
     print(mag)
     return 0
 
 
 def run_mag_to_flux(args: argparse.Namespace) -> int:
     """Execute the 'mag_to_flux' command."""
-    flux = utils.mag_to_flux(args.mag, args.zeropoint)
+    if args.input is not None:
+        from candiamazing import utils
+
+        return run_batch(args, lambda mag: utils.mag_to_flux(mag, args.zeropoint))
+    flux = scalar.mag_to_flux(args.mag, args.zeropoint)
     print(flux)
     return 0
 
 
+def make_converter(args: argparse.Namespace):
+    """Build the converter for ``args.conversion``, with ``args.zeropoint`` if it needs one."""
+    from candiamazing import core
+
+    converter_class = getattr(core, ARRAY_CONVERSIONS[args.conversion])
+    if converter_class is core.BrightnessConverter:
+        if args.zeropoint is None:
+            raise SystemExit(f"error: --zeropoint is required for {args.conversion}")
+        return converter_class(zeropoint=args.zeropoint)
+    return converter_class()
+
+
+def run_convert_array(args: argparse.Namespace) -> int:
+    """Execute the 'convert_array' command."""
+    converter = make_converter(args)
+    converter.convert_file(
+        args.conversion, args.input, args.output, blocksize=args.blocksize, dtype=args.dtype
+    )
+    return 0
+
+
+def run_convert_files(args: argparse.Namespace) -> int:
+    """Execute the 'convert_files' command, reporting progress on stderr."""
+    from candiamazing import sharding
+
+    def progress(result, done, total):
+        if result.skipped:
+            status = "up to date"
+        else:
+            status = (
+                f"{result.elements} values in {result.seconds:.3f}s "
+                f"({result.throughput:.3g} values/s)"
+            )
+        print(f"[{done}/{total}] {result.input} -> {result.output}: {status}", file=sys.stderr)
+
+    try:
+        results = sharding.convert_files(
+            make_converter(args),
+            args.conversion,
+            args.inputs,
+            args.output_dir,
+            workers=args.workers,
+            shards=args.shards,
+            fmt=args.format,
+            use_hash=args.hash,
+            force=args.force,
+            progress=progress,
+            column=args.column,
+            output_column=args.output_column or args.conversion.split("_to_")[1],
+            chunksize=args.chunksize,
+            delimiter=args.delimiter,
+        )
+    except (FileNotFoundError, ValueError) as error:
+        raise SystemExit(f"error: {error}") from None
+    except KeyError as error:
+        raise SystemExit(f"error: {error.args[0]}") from None
+
+    converted = [result for result in results if not result.skipped]
+    elements = sum(result.elements for result in converted)
+    seconds = sum(result.seconds for result in converted)
+    rate = f" ({elements / seconds:.3g} values/s per worker)" if seconds > 0 else ""
+    print(
+        f"converted {len(converted)} file(s), {elements} values{rate}; "
+        f"{len(results) - len(converted)} up to date"
+    )
+    return 0
+
+
+def run_bench(args: argparse.Namespace) -> int:
+    """Execute the 'bench' command."""
+    from candiamazing import bench
+
+    report = bench.run_benchmarks(
+        sizes=args.sizes,
+        dtypes=args.dtypes,
+        repeat=args.repeat,
+        cli=not args.no_cli,
+        aio=not args.no_async,
+    )
+    print(bench.format_report(report))
+    if args.output is not None:
+        bench.save_report(report, args.output)
+
+    if args.baseline is None:
+        return 0
+    regressions = bench.compare(report, bench.load_report(args.baseline), args.tolerance)
+    for reg in regressions:
+        print(
+            f"REGRESSION {reg['name']} size={reg['size']} dtype={reg['dtype']} "
+            f"mode={reg['mode']}: {reg['ratio']:.2f}x slower than baseline"
+        )
+    return 1 if regressions else 0
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    """Execute the 'serve' command."""
+    from candiamazing import server
+
+    if args.socket is not None:
+        try:
+            server.serve_socket(args.socket)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    server.serve_stream(sys.stdin.buffer, sys.stdout.buffer)
+    return 0
+
+
 def main(argv: list[str] | None = None) -> int:
     """Run the CLI entry point."""
     parser = build_parser()
     args = parser.parse_args(argv)
-    return args.func(args)
+    if not args.profile:
+        return args.func(args)
+
+    from candiamazing import profiling
+
+    with profiling.profile() as stats:
+        code = args.func(args)
+    print(profiling.format_summary(stats), file=sys.stderr)
+    return code
 
 
 if __name__ == "__main__":
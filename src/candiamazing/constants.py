@@ -0,0 +1,31 @@
+"""
+constants.py
+============
+
+**Description:**
+This module collects the default settings shared by several modules of the
+`candiamazing` package.
+
+**Development Notes (Instructional):**
+1. **Why a separate file?**
+   The CLI needs these values to build its ``--help`` text. Keeping them in a file
+   that imports nothing means ``candiamazing --help`` does not have to import NumPy
+   (which takes far longer than the rest of the CLI put together).
+"""
+
+# Rows of a text catalog converted per chunk (see `catalog.py`)
+CATALOG_CHUNKSIZE = 65536
+
+# Elements of a memory-mapped array converted per block (see `catalog.py`)
+ARRAY_BLOCKSIZE = 1 << 20
+
+# Element type of raw binary dumps: little-endian float64
+RAW_DTYPE = "<f8"
+
+# Benchmark defaults (see `bench.py`); a size of None means a plain Python float
+BENCH_SIZES = (None, 100, 10_000, 1_000_000)
+BENCH_DTYPES = ("float64", "float32")
+BENCH_TOLERANCE = 0.25
+
+# Monte Carlo samples held in memory at once (see `montecarlo.py`): 32 MB of float64
+MC_MAX_ELEMENTS = 1 << 22
@@ -27,16 +27,540 @@ package's functionality in a convenient way.
    use in their scripts. It represents the "public face" of your software.
 """
 
+import functools
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Mapping,
+    MutableMapping,
+)
+
 import numpy as np
 
+import candiamazing.aggregate as aggregate
+import candiamazing.aio as aio
+import candiamazing.catalog as catalog
+import candiamazing.montecarlo as montecarlo
+import candiamazing.parallel as parallel
+import candiamazing.query as query
+import candiamazing.scalar as scalar
 import candiamazing.utils as utils
+from candiamazing.cosmology import FlatLambdaCDM
+from candiamazing.photometry import PhotometricSystem
+
+# Exact types that take the pure-`math` fast path (NumPy scalars are not included)
+PYTHON_SCALARS = (float, int)
+
+# Precision policies of `BaseConverter`, and the floating type each one forces
+DTYPE_POLICIES = {
+    "preserve": None,
+    "float32": np.dtype(np.float32),
+    "float64": np.dtype(np.float64),
+}
+
+# Integer fluxes below this are converted by table lookup in `BrightnessConverter`
+DEFAULT_LOOKUP_MAX = 1 << 16
+
+# The most memory the cached magnitude tables may take, see `magnitude_table`
+LOOKUP_CACHE_BYTES = 64 << 20
+
+_tables: OrderedDict = OrderedDict()  # (zeropoint, dtype) -> table, least recently used first
+_tables_lock = threading.Lock()
+
+
+def magnitude_table(zeropoint: float, size: int, dtype=np.float64) -> np.ndarray:
+    """The magnitudes of the integer fluxes ``0 .. size - 1``, from a shared cache.
+
+    A table is computed with `utils.flux_to_mag` itself, so looking an integer flux
+    up gives exactly the magnitude that converting it would (``+inf`` for zero). One
+    table is kept per zeropoint and dtype, grown when a larger one is needed; the
+    least recently used are dropped once the tables exceed ``LOOKUP_CACHE_BYTES``,
+    and a table larger than that on its own is not cached at all.
+
+    Returns
+    -------
+    np.ndarray
+        A read-only table of at least ``size`` magnitudes.
+    """
+    dtype = np.dtype(dtype)
+    key = (float(zeropoint), dtype.str)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is not None and table.size >= size:
+            _tables.move_to_end(key)
+            return table
+    with np.errstate(divide="ignore"):
+        table = utils.flux_to_mag(np.arange(size), zeropoint, dtype=dtype)
+    table.flags.writeable = False
+    if table.nbytes > LOOKUP_CACHE_BYTES:
+        return table
+    with _tables_lock:
+        _tables[key] = table
+        _tables.move_to_end(key)
+        while sum(t.nbytes for t in _tables.values()) > LOOKUP_CACHE_BYTES:
+            _tables.popitem(last=False)
+    return table
+
+
+def _look_up(table: np.ndarray, exact, x: np.ndarray, out=None, where=True) -> np.ndarray:
+    """``table[x]`` for integer ``x``, shaped like a `utils` conversion for chunking.
+
+    Elements outside ``1 .. table.size - 1`` (zero or negative counts, or counts past
+    the table) are converted by ``exact``, a `utils.flux_to_mag` with the converter's
+    settings, and only those: the rest of the chunk is still looked up. A chunk
+    with more than a few such elements is converted exactly as a whole.
+    """
+    bad = None
+    if not (x.min() >= 1 and x.max() < table.size):
+        # One comparison finds both sides: as unsigned, x - 1 wraps zero and
+        # negative counts around to the largest values
+        unsigned = np.dtype(x.dtype.str.replace("i", "u"))
+        outside = np.greater_equal(x.view(unsigned) - unsigned.type(1), table.size - 1)
+        if where is not True:
+            outside &= where
+        if np.count_nonzero(outside) > x.size // 64:
+            # Patching costs more per element than converting, so beyond a few
+            # elements outside it is cheaper to convert the whole chunk
+            return exact(x, out=out, where=where)
+        bad = np.flatnonzero(outside)
+    # "clip" only moves the ``bad`` elements, which are overwritten below, into the
+    # table; unlike "raise", it lets np.take write straight into ``out``, not via a buffer
+    if where is True:
+        out = np.take(table, x, out=out, mode="clip")
+    else:
+        values = np.take(table, x, mode="clip")
+        if out is None:
+            out = values
+        else:
+            np.copyto(out, values, where=where)
+    if bad is not None and bad.size:
+        out.put(bad, exact(x.take(bad)))
+    return out
 
 
 class BaseConverter:
-    """A base class for conversions between flux and magnitude."""
+    """A base class for conversions between flux and magnitude.
 
-    def __init__(self, description: str = "Base Converter"):
+    Every conversion method of a subclass runs through a shared execution
+    engine (see `parallel.ChunkedExecutor`), which splits large arrays into
+    cache-sized chunks and can spread them over several cores. Plain Python
+    floats and ints skip NumPy entirely and are converted with the `math`
+    based functions of `scalar.py`, returning plain floats.
+
+    Parameters
+    ----------
+    description : str
+        A short human readable name for the converter.
+    backend : str
+        How to run conversions on large arrays: ``"serial"`` (default),
+        ``"threads"`` or ``"processes"``.
+    n_workers : int, optional
+        The number of worker threads or processes. Defaults to the number of CPUs.
+    chunksize : int
+        The number of elements converted at a time.
+    parallel_threshold : int
+        Arrays smaller than this are never handed to the worker pool.
+    memo_size : int
+        If positive, remember the results for up to this many distinct scalar
+        inputs per method (least recently used are dropped first). Useful when
+        the same values are converted over and over; see `memo_info`.
+    dtype : str
+        The precision policy for arrays. ``"preserve"`` (default) computes in
+        the type of the input (float32 stays float32, integers become float64);
+        ``"float32"`` or ``"float64"`` compute and return that type whatever the
+        input. Constants are cast to the working type, so nothing is silently
+        upcast; see `utils.working_dtype` for the accuracy of each type. An
+        ``out`` buffer always sets the type of its own results, and Python
+        scalars are converted to Python floats.
+    invalid : str, optional
+        The policy for inputs outside a conversion's domain, such as zero or
+        negative fluxes: one of `utils.INVALID_POLICIES`. Under ``"mask"`` and
+        ``"bitmask"`` every element whose result is nan is flagged. By default
+        NumPy's behaviour is kept (a RuntimeWarning and nan or inf). With a
+        policy, Python scalars go through NumPy as well and give NumPy floats.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
+    """
+
+    def __init__(
+        self,
+        description: str = "Base Converter",
+        backend: str = "serial",
+        n_workers: int | None = None,
+        chunksize: int = parallel.DEFAULT_CHUNKSIZE,
+        parallel_threshold: int = parallel.DEFAULT_THRESHOLD,
+        memo_size: int = 0,
+        dtype: str = "preserve",
+        invalid: str | None = None,
+        fill: float = np.nan,
+    ):
+        if dtype not in DTYPE_POLICIES:
+            raise ValueError(f"dtype must be one of {tuple(DTYPE_POLICIES)}, got {dtype!r}")
+        if invalid is not None and invalid not in utils.INVALID_POLICIES:
+            raise ValueError(f"invalid must be one of {utils.INVALID_POLICIES}, got {invalid!r}")
         self.description = description
+        self.dtype = dtype
+        self.invalid = invalid
+        self.fill = fill
+        # A policy is implemented by the NumPy path, so then no type takes the fast path
+        self._scalar_types = PYTHON_SCALARS if invalid is None else ()
+        self.executor = parallel.ChunkedExecutor(
+            backend=backend,
+            n_workers=n_workers,
+            chunksize=chunksize,
+            threshold=parallel_threshold,
+        )
+        self.memo_size = memo_size
+        self._reset_scalar()
+
+    def __getstate__(self) -> dict:
+        # Memoised functions cannot be pickled; they are rebuilt on unpickling
+        state = self.__dict__.copy()
+        del state["_scalar"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._reset_scalar()
+
+    def _scalar_functions(self) -> dict[str, Callable[[float], float]]:
+        """The pure-`math` fast path for each conversion method, keyed by method name.
+
+        Subclasses bind their state (e.g. the zeropoint) into these functions.
+        """
+        return {}
+
+    def _reset_scalar(self) -> None:
+        """(Re)build the scalar fast paths, e.g. after the converter's state changed."""
+        functions = self._scalar_functions()
+        if self.memo_size > 0:
+            memoize = functools.lru_cache(maxsize=self.memo_size)
+            functions = {name: memoize(func) for name, func in functions.items()}
+        self._scalar = functions
+
+    def settings(self) -> dict:
+        """Everything about this converter that can change its results.
+
+        Execution options (backend, workers, chunk size, memoisation) are left
+        out, since they never change a result.
+
+        Returns
+        -------
+        dict
+            JSON-serialisable settings, e.g. to tell whether converted files are
+            still up to date (see `sharding.convert_files`). Two converters with
+            equal settings give identical results.
+        """
+        return {
+            "converter": type(self).__name__,
+            "dtype": self.dtype,
+            "invalid": self.invalid,
+            # As a string, so that a nan fill still compares equal after a JSON round trip
+            "fill": repr(float(self.fill)),
+        }
+
+    def memo_info(self) -> dict[str, functools._CacheInfo]:
+        """Hit and miss statistics of the scalar memo, per method.
+
+        Returns
+        -------
+        dict
+            Maps method names to ``functools.lru_cache`` statistics (hits,
+            misses, maxsize, currsize). Empty if memoisation is off.
+        """
+        return {
+            name: func.cache_info()
+            for name, func in self._scalar.items()
+            if hasattr(func, "cache_info")
+        }
+
+    def memo_clear(self) -> None:
+        """Forget all memoised scalar results and reset the statistics."""
+        for func in self._scalar.values():
+            if hasattr(func, "cache_clear"):
+                func.cache_clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Shut down any worker pool started by the ``"threads"`` or ``"processes"`` backend."""
+        self.executor.close()
+
+    def _apply(self, func, x, *args, out=None, where=True):
+        """Run the `utils` conversion ``func`` on ``x`` through the execution engine."""
+        dtype = DTYPE_POLICIES[self.dtype]
+        if dtype is not None:
+            func = functools.partial(func, dtype=dtype)
+        if self.invalid is None:
+            return self.executor.run(func, x, *args, out=out, where=where)
+        # Chunks just write nan into invalid elements; the flags of the whole result
+        # are rebuilt from those at the end
+        flagged = self.invalid in ("mask", "bitmask")
+        if flagged and utils._any_duck(x, *args):
+            raise TypeError(
+                f"invalid={self.invalid!r} is not supported for duck arrays; "
+                "use 'nan' or 'sentinel'"
+            )
+        policy = "nan" if flagged else self.invalid
+        func = functools.partial(func, invalid=policy, fill=self.fill)
+        result = self.executor.run(func, x, *args, out=out, where=where)
+        if not flagged:
+            return result
+        bad = np.isnan(result[0] if isinstance(result, tuple) else result)
+        if where is not True:
+            bad = np.logical_and(bad, where)
+        return utils.flag_invalid(result, bad, self.invalid)
+
+    def convert_file(
+        self,
+        method: str,
+        input_path: str | os.PathLike,
+        output_path: str | os.PathLike,
+        blocksize: int = catalog.DEFAULT_BLOCKSIZE,
+        dtype: str = catalog.RAW_DTYPE,
+    ) -> int:
+        """Apply one of this converter's methods to an array stored on disk.
+
+        The input is memory-mapped and converted block by block into a
+        pre-allocated memory-mapped output, so arrays larger than memory can
+        be converted. Files ending in ``.npy`` are read and written as NumPy
+        files, anything else as raw binary.
+
+        Parameters
+        ----------
+        method : str
+            Name of the conversion method, e.g. ``"flux_to_mag"``.
+        input_path : str or PathLike
+            The file holding the values to convert.
+        output_path : str or PathLike
+            The file to write the converted values to. It is overwritten.
+        blocksize : int
+            The number of elements converted per block.
+        dtype : str
+            The element type of raw input and output files, little-endian
+            float64 by default.
+
+        Returns
+        -------
+        int
+            The number of elements converted.
+        """
+        return catalog.convert_array(
+            self._method(method),
+            input_path,
+            output_path,
+            blocksize=blocksize,
+            dtype=dtype,
+            pass_out=True,
+        )
+
+    def convert_columns(
+        self,
+        method: str,
+        table: np.ndarray | MutableMapping,
+        columns: Mapping[str | tuple[str, ...], str | tuple[str, ...]],
+    ) -> np.ndarray | MutableMapping:
+        """Apply one of this converter's methods to columns of an in-memory catalog.
+
+        Each input column is read through a zero-copy view (see `catalog.column`)
+        and the results are written straight into the memory of the output
+        columns, so converting many columns takes no per-column copies. An output
+        may be its own input, converting it in place. Outputs are converted in
+        the order given, so later entries can read the columns earlier ones wrote.
+
+        Parameters
+        ----------
+        method : str
+            Name of the conversion method, e.g. ``"flux_to_mag"``.
+        table : np.ndarray or MutableMapping
+            A structured array, or a mapping of column names to 1-d arrays such
+            as a record batch.
+        columns : Mapping
+            Maps the input column name(s) of each conversion to its output
+            column name(s). Methods with several inputs or results take tuples,
+            e.g. ``{("flux_g", "flux_g_err"): ("mag_g", "mag_g_err")}``, and
+            `MultiBandConverter` takes the band column as the second input.
+
+        Returns
+        -------
+        np.ndarray or MutableMapping
+            The table holding the results. Missing output columns are created in
+            the working type of the first input (see `catalog.add_columns`), which
+            gives a new structured array; otherwise this is ``table`` itself.
+            Under the ``"mask"`` and ``"bitmask"`` invalid policies the flagged
+            elements are left as nan.
+        """
+        func = self._method(method)
+        plan = [
+            tuple((names,) if isinstance(names, str) else tuple(names) for names in pair)
+            for pair in columns.items()
+        ]
+
+        names = catalog.column_names(table)
+        types, shape = {}, None
+        for sources, targets in plan:
+            if sources[0] in types:
+                dtype = types[sources[0]]
+            else:
+                first = catalog.column(table, sources[0])
+                shape = first.shape if shape is None else shape
+                dtype = utils.working_dtype(first, dtype=DTYPE_POLICIES[self.dtype])
+            for name in targets:
+                if name not in names or not isinstance(table, np.ndarray):
+                    types.setdefault(name, dtype)
+        table = catalog.add_columns(table, types, shape)
+
+        for sources, targets in plan:
+            inputs = [catalog.column(table, name) for name in sources]
+            outputs = tuple(catalog.column(table, name) for name in targets)
+            func(*inputs, out=outputs if len(outputs) > 1 else outputs[0])
+        return table
+
+    def sample(
+        self,
+        method: str,
+        value: float | np.ndarray,
+        error: float | np.ndarray | tuple,
+        n_samples: int = 1000,
+        **kwargs,
+    ) -> montecarlo.MonteCarloSummary:
+        """Propagate uncertainties through one of this converter's methods by Monte Carlo.
+
+        Draws are generated, converted and reduced in bounded-memory blocks,
+        see `montecarlo.sample` for the options.
+
+        Parameters
+        ----------
+        method : str
+            Name of the conversion method, e.g. ``"mag_to_flux"``.
+        value : float or np.ndarray
+            The central value of each source.
+        error : float, np.ndarray or tuple
+            The 1-sigma uncertainties, or a ``(lower, upper)`` pair.
+        n_samples : int
+            The number of draws per source.
+        **kwargs
+            Passed on to `montecarlo.sample`, e.g. ``seed`` or ``q``.
+
+        Returns
+        -------
+        montecarlo.MonteCarloSummary
+            Mean, standard deviation and percentiles per source.
+        """
+        return montecarlo.sample(self._method(method), value, error, n_samples, **kwargs)
+
+    def summarise(
+        self,
+        method: str,
+        chunks: Iterable[np.ndarray],
+        bins: int | None = None,
+        range: tuple[float, float] | None = None,
+        **kwargs,
+    ) -> aggregate.StreamingSummary:
+        """Summarise one of this converter's methods over a stream of chunks.
+
+        Only the running statistics and a fixed-bin histogram are kept, so catalogs
+        far larger than memory are summarised in a single pass; see
+        `aggregate.summarise`.
+
+        Parameters
+        ----------
+        method : str
+            Name of the conversion method, e.g. ``"flux_to_mag"``.
+        chunks : iterable of np.ndarray
+            The input values, e.g. from `catalog.iter_column_chunks`.
+        bins : int, optional
+            The number of histogram bins, e.g. for number counts.
+        range : tuple of float, optional
+            The histogram range, required with ``bins``.
+        **kwargs
+            Passed on to `aggregate.summarise`, e.g. ``backend``.
+
+        Returns
+        -------
+        aggregate.StreamingSummary
+            Count, min, max, mean, variance, histogram and approximate quantiles.
+        """
+        return aggregate.summarise(self._method(method), chunks, bins, range, **kwargs)
+
+    def select(
+        self,
+        method: str,
+        values: np.ndarray,
+        low: float | None = None,
+        high: float | None = None,
+        inclusive: str = "both",
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Select the rows whose conversion by ``method`` lies between ``low`` and ``high``.
+
+        The bounds are converted back into the units of ``values`` once, so the
+        column is only compared, never converted; the selection is the same as
+        filtering the converted values. See `query.select`, and `query.SortedIndex`
+        for repeated queries on one column.
+
+        Parameters
+        ----------
+        method : str
+            Name of a monotonic conversion method, e.g. ``"flux_to_mag"``.
+        values : np.ndarray
+            The catalog column, e.g. fluxes.
+        low, high : float, optional
+            Bounds on the converted value, e.g. ``high=22`` for magnitudes up to 22.
+        inclusive : str
+            Which bounds are included: ``"both"`` (default), ``"neither"``,
+            ``"left"`` or ``"right"``.
+        out : np.ndarray, optional
+            A boolean buffer to write the selection into.
+
+        Returns
+        -------
+        np.ndarray
+            A boolean mask shaped like ``values``.
+        """
+        return query.select(self, method, values, low, high, inclusive, out)
+
+    async def aconvert(
+        self, method: str, packets: AsyncIterable, **kwargs
+    ) -> AsyncIterator[np.ndarray]:
+        """Convert a stream of packets with one of this converter's methods, for asyncio.
+
+        Small packets are batched together and large batches are converted in an
+        executor, so the event loop is never blocked for long; see
+        `aio.convert_packets` for the batching and backpressure options.
+
+        Parameters
+        ----------
+        method : str
+            Name of a conversion method that takes one array, e.g. ``"flux_to_mag"``.
+        packets : async iterable
+            The arrays to convert, e.g. flux packets received from a broker.
+        **kwargs
+            Passed on to `aio.convert_packets`, e.g. ``batch_size`` or ``executor``.
+
+        Yields
+        ------
+        np.ndarray
+            The converted values of each packet, in the order the packets arrived.
+        """
+        async for result in aio.convert_packets(self._method(method), packets, **kwargs):
+            yield result
+
+    def _method(self, method: str) -> Callable:
+        """Look up a conversion method by name, refusing helpers like ``close``."""
+        func = getattr(self, method, None)
+        if method.startswith("_") or not callable(func) or hasattr(BaseConverter, method):
+            raise ValueError(f"{type(self).__name__} has no conversion method {method!r}")
+        return func
 
 
 class BrightnessConverter(BaseConverter):
@@ -53,75 +577,595 @@ class BrightnessConverter(BaseConverter):
     ----------
     zeropoint : float
         The zeropoint for the magnitude system.
+    approx : float, optional
+        Opt in to faster `mag_to_flux` array conversions whose error stays below
+        this many magnitudes (e.g. 1e-4 for quick-look work); see
+        `utils.mag_to_flux`. Exact by default.
+    lookup_max : int
+        Integer flux arrays (such as detector counts in ADU) are converted to
+        float64 magnitudes by `flux_to_mag` with one table lookup per element
+        instead of a logarithm, with exactly the same results; see
+        `magnitude_table`. Only values between 1 and ``lookup_max - 1`` are looked
+        up, the others (e.g. a few zero pixels) are converted exactly. 0 turns this
+        off.
+    **kwargs
+        Execution options passed on to `BaseConverter`, e.g. ``backend``.
     """
 
-    def __init__(self, zeropoint: float):
-        super().__init__(description="Brightness Converter")
-        self.zeropoint = zeropoint
+    def __init__(
+        self,
+        zeropoint: float,
+        approx: float | None = None,
+        lookup_max: int = DEFAULT_LOOKUP_MAX,
+        **kwargs,
+    ):
+        if approx is not None and approx <= 0:
+            raise ValueError(f"approx must be positive, got {approx}")
+        if lookup_max < 0:
+            raise ValueError(f"lookup_max must not be negative, got {lookup_max}")
+        self._zeropoint = zeropoint
+        self.approx = approx
+        self.lookup_max = lookup_max
+        super().__init__(description="Brightness Converter", **kwargs)
+
+    @property
+    def zeropoint(self) -> float:
+        """The zeropoint for the magnitude system."""
+        return self._zeropoint
 
-    def flux_to_mag(self, flux: float | np.ndarray) -> float | np.ndarray:
+    @zeropoint.setter
+    def zeropoint(self, value: float) -> None:
+        self._zeropoint = value
+        self._reset_scalar()
+
+    def _scalar_functions(self) -> dict[str, Callable[[float], float]]:
+        functions = scalar.bind_zeropoint(self._zeropoint)
+        del functions["absolute_magnitude"]  # A method of AbsoluteMagnitudeConverter only
+        return functions
+
+    def settings(self) -> dict:
+        # The table lookup gives exactly the exact results, so lookup_max is left out
+        return {
+            **super().settings(),
+            "zeropoint": np.asarray(self._zeropoint, dtype=float).tolist(),
+            "approx": self.approx,
+        }
+
+    def _lookup_table(self, flux, out, where) -> np.ndarray | None:
+        """The magnitude table to convert ``flux`` with, or None to convert it exactly."""
+        if (
+            not self.lookup_max
+            or type(flux) is not np.ndarray
+            or flux.dtype.kind not in "iu"
+            or flux.size == 0
+            or self.invalid in ("mask", "bitmask")
+            or np.ndim(self.zeropoint) != 0
+        ):
+            return None
+        dtype = utils.working_dtype(flux, out=out, dtype=DTYPE_POLICIES[self.dtype])
+        if dtype.itemsize < 8:
+            # Float32 logarithms vectorise so well that a gather is no faster
+            return None
+        # Counts past the table are converted exactly, see `_look_up`
+        high = min(int(flux.max()), self.lookup_max - 1)
+        if high < 1:
+            return None
+        # Round the size up, so that later inputs with slightly larger counts reuse the table
+        size = min(max(1 << high.bit_length(), 1 << 10), self.lookup_max)
+        if size * dtype.itemsize > LOOKUP_CACHE_BYTES:
+            return None
+        return magnitude_table(self.zeropoint, size, dtype)
+
+    def flux_to_mag(
+        self,
+        flux: float | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
         """Convert flux to magnitude using the stored zeropoint.
 
         Parameters
         ----------
         flux : float or np.ndarray
             The flux value(s) to convert.
+        out : np.ndarray, optional
+            A buffer to write the result into, avoiding any new allocation.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.flux_to_mag`.
 
         Returns
         -------
         float or np.ndarray
             The corresponding magnitude value(s).
         """
-        return utils.flux_to_mag(flux, self.zeropoint)
+        if out is None and type(flux) in self._scalar_types:
+            return self._scalar["flux_to_mag"](flux)
+        table = self._lookup_table(flux, out, where)
+        if table is not None:
+            # Zero, negative and too large counts take the exact conversion, which
+            # also applies the invalid policy to them
+            exact = functools.partial(
+                utils.flux_to_mag,
+                zeropoint=self.zeropoint,
+                dtype=table.dtype,
+                invalid=self.invalid,
+                fill=self.fill,
+            )
+            look_up = functools.partial(_look_up, table, exact)
+            return self.executor.run(look_up, flux, out=out, where=where)
+        return self._apply(utils.flux_to_mag, flux, self.zeropoint, out=out, where=where)
 
-    def mag_to_flux(self, mag: float | np.ndarray) -> float | np.ndarray:
+    def mag_to_flux(
+        self,
+        mag: float | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
         """Convert magnitude to flux using the stored zeropoint.
 
         Parameters
         ----------
         mag : float or np.ndarray
             The magnitude value(s) to convert.
+        out : np.ndarray, optional
+            A buffer to write the result into, avoiding any new allocation.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.mag_to_flux`.
 
         Returns
         -------
         float or np.ndarray
             The corresponding flux value(s).
         """
-        return utils.mag_to_flux(mag, self.zeropoint)
+        if out is None and type(mag) in self._scalar_types:
+            return self._scalar["mag_to_flux"](mag)
+        func = utils.mag_to_flux
+        if self.approx is not None:
+            func = functools.partial(func, approx=self.approx)
+        return self._apply(func, mag, self.zeropoint, out=out, where=where)
+
+    def flux_to_mag_with_error(
+        self,
+        flux: float | np.ndarray,
+        flux_err: float | np.ndarray,
+        out: tuple[np.ndarray, np.ndarray] | None = None,
+        where: bool | np.ndarray = True,
+    ) -> tuple[float | np.ndarray, float | np.ndarray]:
+        """Convert flux and its uncertainty to magnitude and its uncertainty in one pass.
+
+        Parameters
+        ----------
+        flux : float or np.ndarray
+            The flux value(s) to convert.
+        flux_err : float or np.ndarray
+            The 1-sigma flux uncertainties.
+        out : tuple of np.ndarray, optional
+            Buffers ``(mag, mag_err)`` to write the results into.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.flux_to_mag_with_error`.
+
+        Returns
+        -------
+        tuple
+            The magnitude value(s) and their uncertainties.
+        """
+        if (
+            out is None
+            and type(flux) in self._scalar_types
+            and type(flux_err) in self._scalar_types
+        ):
+            return self._scalar["flux_to_mag_with_error"](flux, flux_err)
+        return self._apply(
+            utils.flux_to_mag_with_error, flux, flux_err, self.zeropoint, out=out, where=where
+        )
+
+    def mag_to_flux_with_error(
+        self,
+        mag: float | np.ndarray,
+        mag_err: float | np.ndarray,
+        out: tuple[np.ndarray, np.ndarray] | None = None,
+        where: bool | np.ndarray = True,
+    ) -> tuple[float | np.ndarray, float | np.ndarray]:
+        """Convert magnitude and its uncertainty to flux and its uncertainty in one pass.
+
+        Parameters
+        ----------
+        mag : float or np.ndarray
+            The magnitude value(s) to convert.
+        mag_err : float or np.ndarray
+            The 1-sigma magnitude uncertainties.
+        out : tuple of np.ndarray, optional
+            Buffers ``(flux, flux_err)`` to write the results into.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.mag_to_flux_with_error`.
+
+        Returns
+        -------
+        tuple
+            The flux value(s) and their uncertainties.
+        """
+        if out is None and type(mag) in self._scalar_types and type(mag_err) in self._scalar_types:
+            return self._scalar["mag_to_flux_with_error"](mag, mag_err)
+        return self._apply(
+            utils.mag_to_flux_with_error, mag, mag_err, self.zeropoint, out=out, where=where
+        )
 
 
 class DistanceConverter(BaseConverter):
-    """A class for converting between distance modulus and distance in parsecs."""
+    """A class for converting between distance modulus and distance in parsecs,
+    and between distance modulus and redshift.
+
+    Parameters
+    ----------
+    cosmology : FlatLambdaCDM, optional
+        The cosmology used by the redshift conversions. Defaults to
+        ``FlatLambdaCDM(H0=70, Om0=0.3)``.
+    **kwargs
+        Execution options passed on to `BaseConverter`, e.g. ``backend``.
+    """
+
+    def __init__(self, cosmology: FlatLambdaCDM | None = None, **kwargs):
+        super().__init__(description="Distance Converter", **kwargs)
+        self.cosmology = cosmology if cosmology is not None else FlatLambdaCDM()
 
-    def __init__(self):
-        super().__init__(description="Distance Converter")
+    def settings(self) -> dict:
+        return {**super().settings(), "cosmology": repr(self.cosmology)}
 
-    def distmod_to_distance(self, distmod: float | np.ndarray) -> float | np.ndarray:
+    def _scalar_functions(self) -> dict[str, Callable[[float], float]]:
+        return {
+            "distmod_to_distance": scalar.distance_modulus_to_distance,
+            "distance_to_distmod": scalar.distance_to_distance_modulus,
+            "distance_to_distmod_with_error": scalar.distance_to_distance_modulus_with_error,
+        }
+
+    def distmod_to_distance(
+        self,
+        distmod: float | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
         """Convert distance modulus to distance in parsecs.
 
         Parameters
         ----------
         distmod : float or np.ndarray
             The distance modulus value(s) to convert.
+        out : np.ndarray, optional
+            A buffer to write the result into, avoiding any new allocation.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.distance_modulus_to_distance`.
 
         Returns
         -------
         float or np.ndarray
             The corresponding distance value(s) in parsecs.
         """
-        return utils.distance_modulus_to_distance(distmod)
+        if out is None and type(distmod) in self._scalar_types:
+            return self._scalar["distmod_to_distance"](distmod)
+        return self._apply(utils.distance_modulus_to_distance, distmod, out=out, where=where)
 
-    def distance_to_distmod(self, distance: float | np.ndarray) -> float | np.ndarray:
+    def distance_to_distmod(
+        self,
+        distance: float | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
         """Convert distance in parsecs to distance modulus.
 
         Parameters
         ----------
         distance : float or np.ndarray
             The distance value(s) in parsecs to convert.
+        out : np.ndarray, optional
+            A buffer to write the result into, avoiding any new allocation.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.distance_to_distance_modulus`.
+
+        Returns
+        -------
+        float or np.ndarray
+            The corresponding distance modulus value(s).
+        """
+        if out is None and type(distance) in self._scalar_types:
+            return self._scalar["distance_to_distmod"](distance)
+        return self._apply(utils.distance_to_distance_modulus, distance, out=out, where=where)
+
+    def distance_to_distmod_with_error(
+        self,
+        distance: float | np.ndarray,
+        distance_err: float | np.ndarray,
+        out: tuple[np.ndarray, np.ndarray] | None = None,
+        where: bool | np.ndarray = True,
+    ) -> tuple[float | np.ndarray, float | np.ndarray]:
+        """Convert distance in parsecs and its uncertainty to distance modulus and its uncertainty.
+
+        Parameters
+        ----------
+        distance : float or np.ndarray
+            The distance value(s) in parsecs to convert.
+        distance_err : float or np.ndarray
+            The 1-sigma distance uncertainties in parsecs.
+        out : tuple of np.ndarray, optional
+            Buffers ``(distmod, distmod_err)`` to write the results into.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see
+            `utils.distance_to_distance_modulus_with_error`.
+
+        Returns
+        -------
+        tuple
+            The distance modulus value(s) and their uncertainties.
+        """
+        if (
+            out is None
+            and type(distance) in self._scalar_types
+            and type(distance_err) in self._scalar_types
+        ):
+            return self._scalar["distance_to_distmod_with_error"](distance, distance_err)
+        return self._apply(
+            utils.distance_to_distance_modulus_with_error,
+            distance,
+            distance_err,
+            out=out,
+            where=where,
+        )
+
+    def redshift_to_distmod(self, redshift: float | np.ndarray) -> float | np.ndarray:
+        """Convert redshift to distance modulus in the converter's cosmology.
+
+        The luminosity distance integral is evaluated once per cosmology on a
+        cached table and interpolated, see `cosmology.FlatLambdaCDM`.
+
+        Parameters
+        ----------
+        redshift : float or np.ndarray
+            The redshift value(s) to convert. Values outside ``[0, z_max]``
+            give ``nan``.
 
         Returns
         -------
         float or np.ndarray
             The corresponding distance modulus value(s).
         """
-        return utils.distance_to_distance_modulus(distance)
+        distmod = self.cosmology.distmod(redshift)
+        return float(distmod) if type(redshift) in PYTHON_SCALARS else distmod
+
+    def distmod_to_redshift(self, distmod: float | np.ndarray) -> float | np.ndarray:
+        """Convert distance modulus to redshift in the converter's cosmology.
+
+        Parameters
+        ----------
+        distmod : float or np.ndarray
+            The distance modulus value(s) to convert.
+
+        Returns
+        -------
+        float or np.ndarray
+            The corresponding redshift value(s).
+        """
+        redshift = self.cosmology.redshift_from_distmod(distmod)
+        return float(redshift) if type(distmod) in PYTHON_SCALARS else redshift
+
+
+class AbsoluteMagnitudeConverter(BrightnessConverter):
+    """A class for converting fluxes and distances to absolute magnitudes and luminosities.
+
+    This combines a `BrightnessConverter` and a `DistanceConverter`: the absolute
+    magnitude is the apparent magnitude from ``flux_to_mag`` minus the distance
+    modulus from ``distance_to_distmod``. Rather than making those two passes
+    and subtracting, it evaluates a single logarithm of ``flux * distance**2``
+    chunk by chunk, so a catalog is read once and no full-size temporaries are
+    created. The flux to magnitude methods of `BrightnessConverter` are
+    available as well.
+
+    Parameters
+    ----------
+    zeropoint : float
+        The zeropoint for the magnitude system.
+    **kwargs
+        Execution options passed on to `BaseConverter`, e.g. ``backend``.
+    """
+
+    def __init__(self, zeropoint: float, **kwargs):
+        super().__init__(zeropoint, **kwargs)
+        self.description = "Absolute Magnitude Converter"
+
+    def _scalar_functions(self) -> dict[str, Callable[..., float]]:
+        return {
+            **scalar.bind_zeropoint(self._zeropoint),
+            "luminosity": scalar.luminosity,
+        }
+
+    def absolute_magnitude(
+        self,
+        flux: float | np.ndarray,
+        distance: float | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
+        """Convert flux and distance in parsecs to absolute magnitude.
+
+        Parameters
+        ----------
+        flux : float or np.ndarray
+            The flux value(s) to convert.
+        distance : float or np.ndarray
+            The distance value(s) in parsecs, broadcastable against ``flux``.
+        out : np.ndarray, optional
+            A buffer to write the result into, avoiding any new allocation.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.absolute_magnitude`.
+
+        Returns
+        -------
+        float or np.ndarray
+            The corresponding absolute magnitude value(s).
+        """
+        if (
+            out is None
+            and type(flux) in self._scalar_types
+            and type(distance) in self._scalar_types
+        ):
+            return self._scalar["absolute_magnitude"](flux, distance)
+        return self._apply(
+            utils.absolute_magnitude, flux, distance, self.zeropoint, out=out, where=where
+        )
+
+    def luminosity(
+        self,
+        flux: float | np.ndarray,
+        distance: float | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
+        """Convert flux and distance in parsecs to luminosity, ``4 * pi * distance**2 * flux``.
+
+        Parameters
+        ----------
+        flux : float or np.ndarray
+            The flux value(s) to convert.
+        distance : float or np.ndarray
+            The distance value(s) in parsecs, broadcastable against ``flux``.
+        out : np.ndarray, optional
+            A buffer to write the result into, avoiding any new allocation.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.luminosity`.
+
+        Returns
+        -------
+        float or np.ndarray
+            The corresponding luminosity value(s), in units of the flux times
+            square parsecs.
+        """
+        if (
+            out is None
+            and type(flux) in self._scalar_types
+            and type(distance) in self._scalar_types
+        ):
+            return self._scalar["luminosity"](flux, distance)
+        return self._apply(utils.luminosity, flux, distance, out=out, where=where)
+
+
+class MultiBandConverter(BaseConverter):
+    """A class for converting between flux and magnitude in a catalog that mixes bands.
+
+    Instead of one zeropoint, this converter holds a `PhotometricSystem` of named
+    bands. Every conversion takes a band column alongside the values; the
+    per-row zeropoints are gathered from the registry with a single ``np.take``
+    and the whole table is converted in one vectorised pass, without splitting
+    it by band.
+
+    Parameters
+    ----------
+    system : PhotometricSystem
+        The registry of bands and their zeropoints.
+    magsys : str
+        The magnitude system, ``"AB"`` (default) or ``"Vega"``.
+    **kwargs
+        Execution options passed on to `BaseConverter`, e.g. ``backend``.
+    """
+
+    def __init__(self, system: PhotometricSystem, magsys: str = "AB", **kwargs):
+        system.zeropoints(magsys)  # Fail early on an unknown magnitude system
+        self.system = system
+        self.magsys = magsys
+        super().__init__(description="Multi-Band Converter", **kwargs)
+
+    def settings(self) -> dict:
+        return {
+            **super().settings(),
+            "bands": self.system.names,
+            "zeropoints": self.system.zeropoints(self.magsys).tolist(),
+        }
+
+    def zeropoints(self, band, dtype=np.float64) -> float | np.ndarray:
+        """Gather the zeropoint of every row of a band column.
+
+        Parameters
+        ----------
+        band : int, str or np.ndarray
+            Band indices into the `PhotometricSystem`, or band names.
+        dtype : dtype
+            The float type of the result, so that float32 catalogs stay float32.
+
+        Returns
+        -------
+        float or np.ndarray
+            The zeropoint(s), with the shape of ``band``.
+
+        Raises
+        ------
+        IndexError
+            If a band index is negative or past the last band.
+        """
+        if isinstance(band, str) or np.asarray(band).dtype.kind in "USO":
+            band = self.system.index(band)
+        table = self.system.zeropoints(self.magsys).astype(dtype, copy=False)
+        # np.take would wrap negative indices around to the last bands
+        if np.any(np.less(band, 0)):
+            raise IndexError(f"band indices must be between 0 and {table.size - 1}")
+        return np.take(table, band, mode="raise")
+
+    def flux_to_mag(
+        self,
+        flux: float | np.ndarray,
+        band: int | str | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
+        """Convert flux to magnitude, each row with the zeropoint of its band.
+
+        Parameters
+        ----------
+        flux : float or np.ndarray
+            The flux value(s) to convert.
+        band : int, str or np.ndarray
+            The band of each flux, as indices into the `PhotometricSystem` or as
+            names, broadcastable against ``flux``.
+        out : np.ndarray, optional
+            A buffer to write the result into.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.flux_to_mag`.
+
+        Returns
+        -------
+        float or np.ndarray
+            The corresponding magnitude value(s).
+        """
+        if out is None and type(flux) in self._scalar_types and type(band) in (int, str):
+            return scalar.flux_to_mag(flux, float(self.zeropoints(band)))
+        dtype = utils.working_dtype(flux, dtype=DTYPE_POLICIES[self.dtype])
+        zeropoint = self.zeropoints(band, dtype)
+        return self._apply(utils.flux_to_mag, flux, zeropoint, out=out, where=where)
+
+    def mag_to_flux(
+        self,
+        mag: float | np.ndarray,
+        band: int | str | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
+        """Convert magnitude to flux, each row with the zeropoint of its band.
+
+        Parameters
+        ----------
+        mag : float or np.ndarray
+            The magnitude value(s) to convert.
+        band : int, str or np.ndarray
+            The band of each magnitude, as indices into the `PhotometricSystem`
+            or as names, broadcastable against ``mag``.
+        out : np.ndarray, optional
+            A buffer to write the result into.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True, see `utils.mag_to_flux`.
+
+        Returns
+        -------
+        float or np.ndarray
+            The corresponding flux value(s).
+        """
+        if out is None and type(mag) in self._scalar_types and type(band) in (int, str):
+            return scalar.mag_to_flux(mag, float(self.zeropoints(band)))
+        dtype = utils.working_dtype(mag, dtype=DTYPE_POLICIES[self.dtype])
+        zeropoint = self.zeropoints(band, dtype)
+        return self._apply(utils.mag_to_flux, mag, zeropoint, out=out, where=where)
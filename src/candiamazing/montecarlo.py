@@ -0,0 +1,163 @@
+"""
+montecarlo.py
+=============
+
+**Description:**
+This module propagates uncertainties through any conversion by Monte Carlo
+sampling. Each source's value is drawn many times from its error distribution
+(symmetric, or split-normal for asymmetric errors), every draw is converted, and
+the converted draws are reduced to a mean, a standard deviation and percentiles
+per source.
+
+**Development Notes (Instructional):**
+1. **Bounded memory:**
+   Ten million sources with a thousand draws each would be 80 GB of float64. The
+   engine instead works through the sources in blocks of rows, sized so that one
+   block of draws holds at most ``max_elements`` numbers, converts the block in
+   place and reduces it straight away. Only the per-source summaries are kept.
+
+2. **Reproducible random streams:**
+   Every block gets its own `np.random.Generator`, seeded from a child of one
+   `np.random.SeedSequence`. Block ``i`` always gets child ``i``, so the same seed
+   gives the same numbers whether the blocks run serially, on threads or in a
+   process pool, and whatever the number of workers.
+"""
+
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from . import constants
+from .parallel import BACKENDS
+
+DEFAULT_PERCENTILES = (16.0, 50.0, 84.0)
+
+
+class MonteCarloSummary(NamedTuple):
+    """Per-source statistics of the converted Monte Carlo draws.
+
+    Attributes
+    ----------
+    mean, std : np.ndarray
+        The mean and (``ddof=1``) standard deviation of each source's draws.
+    percentiles : np.ndarray
+        Shape ``(len(q), n_sources)``: the requested percentiles of each source.
+    q : tuple of float
+        The percentile levels, e.g. ``(16, 50, 84)``.
+    """
+
+    mean: np.ndarray
+    std: np.ndarray
+    percentiles: np.ndarray
+    q: tuple[float, ...]
+
+
+def _summarise_block(
+    func: Callable,
+    value: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    n_samples: int,
+    q: tuple[float, ...],
+    seed: np.random.SeedSequence,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Draw, convert and reduce the samples of one block of sources."""
+    rng = np.random.default_rng(seed)
+    samples = rng.standard_normal((value.size, n_samples))
+    # Split normal: the lower error scales negative deviates, the upper error positive ones
+    negative = samples < 0
+    np.multiply(samples, lower[:, None], out=samples, where=negative)
+    np.multiply(samples, upper[:, None], out=samples, where=np.logical_not(negative, out=negative))
+    del negative
+    np.add(samples, value[:, None], out=samples)
+
+    samples = func(samples, out=samples)
+    mean = samples.mean(axis=1)
+    std = samples.std(axis=1, ddof=1) if n_samples > 1 else np.zeros_like(mean)
+    percentiles = np.percentile(samples, q, axis=1, overwrite_input=True)
+    return mean, std, percentiles
+
+
+def sample(
+    func: Callable,
+    value: float | np.ndarray,
+    error: float | np.ndarray | tuple,
+    n_samples: int = 1000,
+    q: Sequence[float] = DEFAULT_PERCENTILES,
+    seed: int | np.random.SeedSequence | None = None,
+    max_elements: int = constants.MC_MAX_ELEMENTS,
+    backend: str = "serial",
+    n_workers: int | None = None,
+) -> MonteCarloSummary:
+    """Propagate uncertainties through ``func`` by Monte Carlo sampling.
+
+    Parameters
+    ----------
+    func : callable
+        The conversion, called as ``func(draws, out=draws)`` on a 2-D block of
+        draws; any converter method such as ``BrightnessConverter.mag_to_flux``
+        works. For the ``"processes"`` backend it must be picklable.
+    value : float or np.ndarray
+        The central value of each source.
+    error : float, np.ndarray or tuple
+        The 1-sigma uncertainty of each source, or a ``(lower, upper)`` pair for
+        asymmetric errors, which are sampled from a split normal distribution.
+    n_samples : int
+        The number of draws per source.
+    q : sequence of float
+        The percentiles (0-100) to report.
+    seed : int or np.random.SeedSequence, optional
+        Seed for reproducible draws. The same seed gives the same result on
+        every backend and for any number of workers.
+    max_elements : int
+        At most this many draws are held in memory per block of sources (per
+        worker, for parallel backends).
+    backend : str
+        ``"serial"`` (default), ``"threads"`` or ``"processes"``.
+    n_workers : int, optional
+        The number of worker threads or processes.
+
+    Returns
+    -------
+    MonteCarloSummary
+        Mean, standard deviation and percentiles per source, each with the
+        shape of ``value`` (percentiles with a leading axis over ``q``).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    if n_samples < 1:
+        raise ValueError(f"n_samples must be positive, got {n_samples}")
+
+    value = np.asarray(value, dtype=np.float64)
+    lower, upper = error if isinstance(error, tuple) else (error, error)
+    shape = value.shape
+    value = value.reshape(-1)
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), shape).reshape(-1)
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), shape).reshape(-1)
+    q = tuple(float(level) for level in q)
+
+    rows = max(1, max_elements // n_samples)
+    starts = range(0, value.size, rows)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    tasks = [
+        (func, value[s : s + rows], lower[s : s + rows], upper[s : s + rows], n_samples, q, child)
+        for s, child in zip(starts, seed.spawn(len(starts)), strict=True)
+    ]
+
+    if backend == "serial" or len(tasks) < 2:
+        blocks = [_summarise_block(*task) for task in tasks]
+    else:
+        pool_class = ThreadPoolExecutor if backend == "threads" else ProcessPoolExecutor
+        with pool_class(max_workers=n_workers) as pool:
+            blocks = list(pool.map(_summarise_block, *zip(*tasks, strict=True)))
+
+    if not blocks:
+        # No sources, but the shapes are those of the non-empty path, e.g. (3, 0)
+        return MonteCarloSummary(np.empty(shape), np.empty(shape), np.empty((len(q), *shape)), q)
+    mean, std, percentiles = (np.concatenate(parts, axis=-1) for parts in zip(*blocks, strict=True))
+    return MonteCarloSummary(
+        mean.reshape(shape), std.reshape(shape), percentiles.reshape((len(q), *shape)), q
+    )
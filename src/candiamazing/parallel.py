@@ -0,0 +1,317 @@
+"""
+parallel.py
+===========
+
+**Description:**
+This module provides the chunked execution engine behind `BaseConverter`. It splits
+large arrays into cache-sized chunks and runs a conversion from `utils.py` over them,
+either in the calling thread, on a thread pool or on a process pool.
+
+**Development Notes (Instructional):**
+1. **Why chunks help even on one core:**
+   Every conversion in `utils.py` is a chain of two or three ufunc calls. Running the
+   whole chain on a chunk that fits in cache means the data is fetched from main memory
+   once, instead of once per step.
+
+2. **Threads vs. processes:**
+   NumPy releases the GIL inside ufunc loops such as ``np.log10``, so threads already
+   run the conversions in parallel with no copying at all. Processes avoid the GIL
+   entirely; to keep them cheap, input and output live in
+   `multiprocessing.shared_memory` blocks and workers only receive block names and
+   offsets, never the arrays themselves.
+"""
+
+import os
+import sys
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import utils
+
+BACKENDS = ("serial", "threads", "processes")
+DEFAULT_CHUNKSIZE = 1 << 16
+DEFAULT_THRESHOLD = 1 << 20
+
+
+def _run_span(
+    func: Callable,
+    source: np.ndarray,
+    args: tuple,
+    target: np.ndarray,
+    where: bool | np.ndarray,
+    chunksize: int,
+) -> None:
+    """Convert the flat array ``source`` into ``target`` one chunk at a time.
+
+    Array-valued ``args`` must be flat and the same size as ``source``; they are
+    sliced into chunks alongside it. ``target`` is a tuple of arrays for
+    conversions with several outputs.
+    """
+    for start in range(0, source.size, chunksize):
+        block = slice(start, start + chunksize)
+        mask = where if isinstance(where, bool) else where[block]
+        func(source[block], *_slice_args(args, block), out=_slice_out(target, block), where=mask)
+
+
+def _slice_args(args: tuple, block: slice) -> tuple:
+    """Take ``block`` of every array-valued argument, leaving scalars as they are."""
+    return tuple(arg[block] if isinstance(arg, np.ndarray) else arg for arg in args)
+
+
+def _slice_out(target: np.ndarray | tuple, block: slice) -> np.ndarray | tuple:
+    """Take ``block`` of an output array, or of each array in a tuple of outputs."""
+    if isinstance(target, tuple):
+        return tuple(array[block] for array in target)
+    return target[block]
+
+
+def _flatten_arg(arg):
+    """Flatten an array argument, and unwrap a 0-d array to a scalar.
+
+    Python scalars are returned as they are, so they keep NumPy's weak type
+    promotion (a Python float does not upcast a float32 array).
+    """
+    if np.ndim(arg) != 0:
+        return np.asarray(arg).reshape(-1)
+    if isinstance(arg, np.ndarray):
+        return arg[()]
+    return arg
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to a shared memory block owned by the parent process."""
+    if sys.version_info >= (3, 13):
+        # The parent unlinks the block, so the worker must not track it too
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _run_shared_span(
+    func: Callable,
+    args: tuple,
+    blocks: dict[str, tuple[str, str]],
+    size: int,
+    start: int,
+    stop: int,
+    chunksize: int,
+) -> None:
+    """Process pool task: convert ``[start, stop)`` of arrays held in shared memory.
+
+    Array-valued arguments are not in ``args`` (they hold None there); they are
+    found in ``blocks`` under the keys ``"arg0"``, ``"arg1"`` and so on. Multiple
+    outputs are under ``"target0"``, ``"target1"`` and so on.
+    """
+    handles = {key: _attach(name) for key, (name, _) in blocks.items()}
+    try:
+        views = {
+            key: np.ndarray((size,), dtype=blocks[key][1], buffer=shm.buf)[start:stop]
+            for key, shm in handles.items()
+        }
+        where = views.get("where", True)
+        args = tuple(views.get(f"arg{i}", arg) for i, arg in enumerate(args))
+        if "target" in views:
+            target = views["target"]
+        else:
+            outputs = sum(key.startswith("target") for key in views)
+            target = tuple(views[f"target{i}"] for i in range(outputs))
+        _run_span(func, views["source"], args, target, where, chunksize)
+        del views, args, target
+    finally:
+        for shm in handles.values():
+            shm.close()
+
+
+def _spans(size: int, parts: int, chunksize: int) -> list[tuple[int, int]]:
+    """Split ``range(size)`` into about ``parts`` spans aligned to ``chunksize``."""
+    chunks = -(-size // chunksize)
+    per_part = max(1, -(-chunks // parts)) * chunksize
+    return [(start, min(start + per_part, size)) for start in range(0, size, per_part)]
+
+
+class ChunkedExecutor:
+    """Run element-wise conversions over large arrays in chunks, optionally in parallel.
+
+    Parameters
+    ----------
+    backend : str
+        One of ``"serial"``, ``"threads"`` or ``"processes"``.
+    n_workers : int, optional
+        The number of worker threads or processes. Defaults to the number of CPUs.
+    chunksize : int
+        The number of elements converted per ufunc chain. The default keeps a chunk
+        of float64 values within a typical L2 cache.
+    threshold : int
+        Arrays with fewer elements than this are converted in a single call on the
+        calling thread, since parallel dispatch would cost more than it saves.
+    """
+
+    def __init__(
+        self,
+        backend: str = "serial",
+        n_workers: int | None = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        threshold: int = DEFAULT_THRESHOLD,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+        if chunksize < 1:
+            raise ValueError(f"chunksize must be positive, got {chunksize}")
+        self.backend = backend
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.threshold = threshold
+        self._pool: Executor | None = None
+
+    def __getstate__(self) -> dict:
+        # Pools cannot be pickled; a copy starts its own when first needed
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.backend == "threads":
+                self._pool = ThreadPoolExecutor(max_workers=self.n_workers)
+            else:
+                self._pool = ProcessPoolExecutor(max_workers=self.n_workers)
+        return self._pool
+
+    def close(self) -> None:
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def run(
+        self,
+        func: Callable,
+        x: float | np.ndarray,
+        *args,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
+        """Evaluate ``func(x, *args, out=out, where=where)`` chunk by chunk.
+
+        ``func`` must be one of the ufunc-chain conversions from `utils.py` (or
+        behave like one). Array-valued ``args`` with the same shape as ``x`` (such
+        as the distances that go with a set of fluxes) are chunked alongside it.
+        Conversions with several results, such as a value and its error, return
+        a tuple and take ``out`` as a tuple of buffers, like NumPy ufuncs do.
+        Inputs that cannot be split into independent flat chunks, such as scalars,
+        broadcast ``args`` or non-contiguous ``out`` buffers, are passed straight
+        through to ``func``, and so are duck arrays such as dask arrays, which
+        bring their own chunks (see `utils`, note 7).
+
+        Returns
+        -------
+        float, np.ndarray or tuple
+            The converted value(s), in ``out`` if it was given.
+        """
+        if utils._any_duck(x, *args, where):
+            return func(x, *args, out=out, where=where)
+        size = np.size(x)
+        shape = np.shape(x)
+        outs = out if isinstance(out, tuple) else (out,)
+        if (
+            size <= self.chunksize
+            or np.ndim(x) == 0
+            or any(np.ndim(arg) != 0 and np.shape(arg) != shape for arg in args)
+            or any(
+                array is not None and (array.shape != shape or not array.flags.c_contiguous)
+                for array in outs
+            )
+            or (not isinstance(where, bool) and np.shape(where) != np.shape(x))
+        ):
+            return func(x, *args, out=out, where=where)
+
+        x = np.asarray(x)
+        args = tuple(_flatten_arg(arg) for arg in args)
+        if out is None:
+            # Probe with harmless values to find the result dtype(s) of the chain
+            probe_args = _slice_args(args, slice(0, 1))
+            probe = func(np.ones(1, dtype=x.dtype), *probe_args)
+            if isinstance(probe, tuple):
+                out = tuple(np.empty(x.shape, dtype=result.dtype) for result in probe)
+            else:
+                out = np.empty(x.shape, dtype=probe.dtype)
+        source = x.reshape(-1)
+        if isinstance(out, tuple):
+            target = tuple(array.reshape(-1) for array in out)
+        else:
+            target = out.reshape(-1)
+        mask = where if isinstance(where, bool) else np.asarray(where, dtype=bool).reshape(-1)
+
+        if self.backend == "serial" or size < self.threshold:
+            _run_span(func, source, args, target, mask, self.chunksize)
+        elif self.backend == "threads":
+            self._run_threads(func, source, args, target, mask)
+        else:
+            self._run_processes(func, source, args, target, mask)
+        return out
+
+    def _run_threads(self, func, source, args, target, where) -> None:
+        pool = self._get_pool()
+        futures = []
+        for start, stop in _spans(source.size, self.n_workers, self.chunksize):
+            mask = where if isinstance(where, bool) else where[start:stop]
+            futures.append(
+                pool.submit(
+                    _run_span,
+                    func,
+                    source[start:stop],
+                    _slice_args(args, slice(start, stop)),
+                    _slice_out(target, slice(start, stop)),
+                    mask,
+                    self.chunksize,
+                )
+            )
+        for future in futures:
+            future.result()
+
+    def _run_processes(self, func, source, args, target, where) -> None:
+        if isinstance(target, tuple):
+            targets = {f"target{i}": array for i, array in enumerate(target)}
+        else:
+            targets = {"target": target}
+        arrays = {"source": source, **targets}
+        if not isinstance(where, bool):
+            arrays["where"] = where
+        for i, arg in enumerate(args):
+            if isinstance(arg, np.ndarray):
+                arrays[f"arg{i}"] = arg
+        # Array arguments travel through shared memory, not through pickling
+        args = tuple(None if isinstance(arg, np.ndarray) else arg for arg in args)
+
+        handles = {}
+        try:
+            for key, array in arrays.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                handles[key] = shm
+                if not key.startswith("target"):
+                    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            blocks = {key: (shm.name, arrays[key].dtype.str) for key, shm in handles.items()}
+
+            pool = self._get_pool()
+            futures = [
+                pool.submit(
+                    _run_shared_span, func, args, blocks, source.size, start, stop, self.chunksize
+                )
+                for start, stop in _spans(source.size, self.n_workers, self.chunksize)
+            ]
+            for future in futures:
+                future.result()
+
+            for key, array in targets.items():
+                shared_target = np.ndarray(array.shape, dtype=array.dtype, buffer=handles[key].buf)
+                if isinstance(where, bool):
+                    array[...] = shared_target
+                else:
+                    np.copyto(array, shared_target, where=where)
+                del shared_target
+        finally:
+            for shm in handles.values():
+                shm.close()
+                shm.unlink()
@@ -0,0 +1,273 @@
+"""
+pipeline.py
+===========
+
+**Description:**
+This module chains conversions of `BrightnessConverter` and `DistanceConverter`,
+such as magnitudes in one zeropoint system to fluxes and back to magnitudes in
+another. A `Pipeline` is built symbolically before any data flows, simplified, and
+then run over the data in a single chunked pass instead of one pass per step.
+
+**Development Notes (Instructional):**
+1. **Everything is affine in log space:**
+   Write a linear quantity (flux, distance) as its ``log10`` and leave logarithmic
+   ones (magnitude, distance modulus) as they are. In those coordinates each of the
+   four conversions is ``u -> scale * u + offset``: ``flux_to_mag`` has scale -2.5 and
+   offset the zeropoint, ``distance_to_distmod`` has scale 5 and offset -5, and the
+   inverses have the inverse maps. Affine maps compose into one affine map, so a chain
+   of any length collapses into a single expression with at most one logarithm and
+   one power.
+
+2. **What simplifies:**
+   An inverse pair with the same constants (``flux_to_mag`` followed by
+   ``mag_to_flux`` at the same zeropoint) composes into the identity and disappears.
+   A change of zeropoint, ``mag_to_flux`` at one zeropoint followed by
+   ``flux_to_mag`` at another, composes into scale 1 and is folded into a single
+   added offset. `Pipeline.plan` records which steps were fused and how.
+"""
+
+import functools
+import math
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import numpy as np
+
+from . import parallel, utils
+
+# The quantity each conversion reads and writes, and whether it is logarithmic
+QUANTITIES = {"flux": False, "mag": True, "distance": False, "distmod": True}
+
+# Relative size below which a composed offset is rounding noise from cancelling terms
+_CANCEL_RTOL = 1e-12
+
+
+class Step(NamedTuple):
+    """One conversion, as the affine map ``u -> scale * u + offset`` in log space.
+
+    Attributes
+    ----------
+    name : str
+        A readable name, e.g. ``"flux_to_mag(zeropoint=25.0)"``.
+    source, target : str
+        The quantities read and written, keys of `QUANTITIES`.
+    scale, offset : float
+        The map between the log-space coordinates of ``source`` and ``target``.
+    """
+
+    name: str
+    source: str
+    target: str
+    scale: float
+    offset: float
+
+    def then(self, other: "Step") -> "Step":
+        """Compose with ``other``, which is applied to the result of this step."""
+        if other.source != self.target:
+            raise ValueError(
+                f"{other.name} takes {other.source} but {self.name} produces {self.target}"
+            )
+        scale = other.scale * self.scale
+        offset = other.scale * self.offset
+        terms = abs(offset) + abs(other.offset)
+        offset += other.offset
+        if math.isclose(scale, 1.0, rel_tol=_CANCEL_RTOL):
+            scale = 1.0
+        if abs(offset) <= _CANCEL_RTOL * terms:
+            offset = 0.0
+        return Step(f"{self.name} -> {other.name}", self.source, other.target, scale, offset)
+
+    @property
+    def is_identity(self) -> bool:
+        return self.source == self.target and self.scale == 1.0 and self.offset == 0.0
+
+
+class Plan(NamedTuple):
+    """The simplified form of a `Pipeline`.
+
+    Attributes
+    ----------
+    steps : tuple of Step
+        The conversions as given.
+    fused : Step
+        All steps composed into one map.
+    expression : str
+        The expression evaluated per element, in terms of the input ``x``.
+    notes : tuple of str
+        What was cancelled or folded while simplifying.
+    """
+
+    steps: tuple[Step, ...]
+    fused: Step
+    expression: str
+    notes: tuple[str, ...]
+
+    def __str__(self) -> str:
+        lines = [f"{len(self.steps)} step(s) fused into 1 pass: {self.expression}"]
+        lines += [f"  {index}. {step.name}" for index, step in enumerate(self.steps, 1)]
+        lines += [f"  - {note}" for note in self.notes]
+        return "\n".join(lines)
+
+
+def converter_step(converter, method: str) -> Step:
+    """The `Step` for one conversion method of a converter.
+
+    Parameters
+    ----------
+    converter : BrightnessConverter or DistanceConverter
+        The converter whose state (e.g. zeropoint) the step uses.
+    method : str
+        ``"flux_to_mag"`` or ``"mag_to_flux"`` for a `BrightnessConverter`,
+        ``"distance_to_distmod"`` or ``"distmod_to_distance"`` for a `DistanceConverter`.
+    """
+    zeropoint = getattr(converter, "zeropoint", [])
+    if method in ("flux_to_mag", "mag_to_flux") and np.ndim(zeropoint) == 0:
+        zeropoint = float(zeropoint)
+        if method == "flux_to_mag":
+            return Step(f"flux_to_mag(zeropoint={zeropoint})", "flux", "mag", -2.5, zeropoint)
+        return Step(f"mag_to_flux(zeropoint={zeropoint})", "mag", "flux", -0.4, zeropoint / 2.5)
+    if method == "distance_to_distmod" and hasattr(converter, method):
+        return Step("distance_to_distmod", "distance", "distmod", 5.0, -5.0)
+    if method == "distmod_to_distance" and hasattr(converter, method):
+        return Step("distmod_to_distance", "distmod", "distance", 0.2, 1.0)
+    raise ValueError(f"{type(converter).__name__}.{method} cannot be used in a pipeline")
+
+
+def _simplify(steps: tuple[Step, ...]) -> tuple[Step, tuple[str, ...]]:
+    """Compose ``steps`` into one, noting each inverse pair that cancels or folds."""
+    notes = []
+    stack: list[Step] = []
+    for step in steps:
+        if stack and stack[-1].source == step.target and stack[-1].target == step.source:
+            previous = stack.pop()
+            pair = previous.then(step)
+            if pair.is_identity:
+                notes.append(f"cancelled inverse pair {pair.name}")
+                continue
+            if pair.scale == 1.0:
+                notes.append(f"folded {pair.name} into an offset of {pair.offset:+g}")
+            step = pair
+        stack.append(step)
+    fused = functools.reduce(Step.then, stack) if stack else Step("identity", "", "", 1.0, 0.0)
+    if steps:
+        fused = fused._replace(source=steps[0].source, target=steps[-1].target)
+    return fused, tuple(notes)
+
+
+def _expression(fused: Step) -> str:
+    """A readable form of what `_evaluate` computes for ``fused``."""
+    u = "log10(x)" if not QUANTITIES.get(fused.source, True) else "x"
+    if fused.scale == 1.0:
+        linear = u
+    else:
+        linear = f"{fused.scale:g} * {u}"
+    if fused.offset:
+        linear = f"{linear} {'+' if fused.offset > 0 else '-'} {abs(fused.offset):g}"
+    if QUANTITIES.get(fused.target, True):
+        return linear
+    if u == "log10(x)" and fused.scale == 1.0:
+        return f"x * {10**fused.offset:g}" if fused.offset else "x"
+    return f"10 ** ({linear})"
+
+
+def _evaluate(
+    x: float | np.ndarray,
+    scale: float,
+    offset: float,
+    log_in: bool,
+    log_out: bool,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+) -> float | np.ndarray:
+    """Evaluate a fused pipeline, ``scale * u + offset`` in log-space coordinates."""
+    if out is None and np.ndim(x) == 0:
+        u = x if log_in else np.log10(x)
+        u = scale * u + offset
+        return u if log_out else 10**u
+    dtype = utils.working_dtype(x, out=out)
+    if not log_in and not log_out and scale == 1.0:
+        # A pure rescaling of a flux or distance needs neither a log nor a power
+        return np.multiply(x, utils._cast(10**offset, dtype), out=out, where=where, dtype=dtype)
+    if log_in:
+        out = np.multiply(x, utils._cast(scale, dtype), out=out, where=where, dtype=dtype)
+    else:
+        out = np.log10(x, out=out, where=where, dtype=dtype)
+        if scale != 1.0:
+            np.multiply(out, utils._cast(scale, dtype), out=out, where=where)
+    if offset != 0.0:
+        np.add(out, utils._cast(offset, dtype), out=out, where=where)
+    if not log_out:
+        np.power(utils._cast(10.0, dtype), out, out=out, where=where)
+    return out
+
+
+class Pipeline:
+    """A chain of converter methods, run as one fused, chunked pass.
+
+    Parameters
+    ----------
+    steps : iterable of tuple, optional
+        ``(converter, method)`` pairs, applied in order, e.g.
+        ``[(hsc, "mag_to_flux"), (sdss, "flux_to_mag")]``. The converters' state is
+        read when the pipeline is built; later changes to a zeropoint are not seen.
+    **kwargs
+        Execution options for the pass, as for `parallel.ChunkedExecutor`:
+        ``backend``, ``n_workers``, ``chunksize`` and ``threshold``.
+    """
+
+    def __init__(self, steps: Iterable[tuple] = (), **kwargs):
+        self._options = kwargs
+        self.executor = parallel.ChunkedExecutor(**kwargs)
+        self._compile(tuple(converter_step(converter, method) for converter, method in steps))
+
+    def _compile(self, steps: tuple[Step, ...]) -> None:
+        # Compose the steps as given first: `Step.then` checks that each one takes
+        # what the one before produces, a mismatch simplifying could hide inside a
+        # cancelled pair
+        if steps:
+            functools.reduce(Step.then, steps)
+        self.steps = steps
+        fused, notes = _simplify(steps)
+        self.plan = Plan(steps, fused, _expression(fused), notes)
+
+    def then(self, converter, method: str) -> "Pipeline":
+        """A new pipeline with ``converter.method`` appended to this one's steps."""
+        pipeline = Pipeline(**self._options)
+        pipeline._compile(self.steps + (converter_step(converter, method),))
+        return pipeline
+
+    def __repr__(self) -> str:
+        return f"Pipeline({[step.name for step in self.steps]})"
+
+    def __call__(
+        self,
+        x: float | np.ndarray,
+        out: np.ndarray | None = None,
+        where: bool | np.ndarray = True,
+    ) -> float | np.ndarray:
+        """Run the simplified pipeline over ``x`` in one chunked pass.
+
+        Parameters
+        ----------
+        x : float or np.ndarray
+            Values of the quantity the first step reads.
+        out : np.ndarray, optional
+            A buffer to write the result into, avoiding any new allocation.
+        where : bool or np.ndarray, optional
+            Only convert elements where this is True; others keep the value ``out``
+            had (or are left uninitialised if ``out`` is not given).
+
+        Returns
+        -------
+        float or np.ndarray
+            Values of the quantity the last step writes.
+        """
+        fused = self.plan.fused
+        func = functools.partial(
+            _evaluate,
+            scale=fused.scale,
+            offset=fused.offset,
+            log_in=QUANTITIES.get(fused.source, True),
+            log_out=QUANTITIES.get(fused.target, True),
+        )
+        return self.executor.run(func, x, out=out, where=where)
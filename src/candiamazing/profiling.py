@@ -0,0 +1,295 @@
+"""
+profiling.py
+============
+
+**Description:**
+This module measures how much work a program does in `candiamazing`. While
+profiling is on, every conversion function of `utils.py` and `scalar.py` and every
+conversion method of the `BaseConverter` subclasses keeps per-function counts of
+calls, elements converted, wall time, bytes touched and result arrays created. The
+numbers are read with `snapshot`, cleared with `reset`, and can be streamed to an
+external profiler or tracer through `add_hook`.
+
+**Development Notes (Instructional):**
+1. **Zero cost when off:**
+   Instead of checking a flag inside every conversion, `enable` swaps the functions
+   for measuring wrappers (in their modules and on the converter classes) and
+   `disable` puts the originals back. Code that is not being profiled runs exactly
+   the functions it always did. Calls reach the wrappers because the package looks
+   functions up on their module (``utils.flux_to_mag``) at call time; callables
+   bound earlier, e.g. with `functools.partial`, keep the unwrapped function.
+   Swapping module and class attributes is global state: `enable` and `disable`
+   are not thread-safe against conversions running in other threads, which may
+   see a mix of wrapped and unwrapped functions while the swap is under way.
+
+2. **What is counted:**
+   ``elements`` is the size of the first argument, ``bytes`` the size of the array
+   arguments plus the arrays returned, and ``new_arrays`` the number of returned
+   arrays that were not passed in as ``out``. It is not a count of allocations:
+   temporaries inside a conversion are not seen, and tracing them (e.g. with
+   `tracemalloc`) would cost more than the conversions being measured. Nested
+   calls (a converter method calling a `utils` function, once per chunk) are each
+   counted under their own name, so the time of an outer call includes the inner
+   ones. A function that re-enters itself, as the `utils` conversions do through
+   the module under an ``invalid`` policy, is counted once, for the outer call.
+   Worker processes of the ``"processes"`` backend are not profiled.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+
+from . import core, scalar, utils
+
+# The module-level conversion functions that are profiled
+UTILS_FUNCTIONS = (
+    "flux_to_mag",
+    "mag_to_flux",
+    "distance_modulus_to_distance",
+    "distance_to_distance_modulus",
+    "absolute_magnitude",
+    "luminosity",
+    "flux_to_mag_with_error",
+    "mag_to_flux_with_error",
+    "distance_to_distance_modulus_with_error",
+)
+SCALAR_FUNCTIONS = UTILS_FUNCTIONS
+
+
+class CallStats(NamedTuple):
+    """The totals of one profiled function.
+
+    Attributes
+    ----------
+    calls : int
+        The number of calls.
+    elements : int
+        The number of input elements converted.
+    seconds : float
+        The total wall time.
+    bytes : int
+        The bytes of array inputs and outputs touched.
+    new_arrays : int
+        The number of result arrays returned that were not passed in as ``out``.
+    """
+
+    calls: int = 0
+    elements: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+    new_arrays: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Elements converted per second."""
+        return self.elements / self.seconds if self.seconds > 0 else 0.0
+
+
+class Event(NamedTuple):
+    """One profiled call, as passed to the hooks registered with `add_hook`.
+
+    ``start`` is a `time.perf_counter` value; the other fields are as in `CallStats`.
+    """
+
+    name: str
+    start: float
+    seconds: float
+    elements: int
+    bytes: int
+    new_arrays: int
+
+
+_lock = threading.Lock()
+_stats: dict[str, CallStats] = {}
+_hooks: list[Callable[[Event], None]] = []
+_originals: list[tuple[object, str, object]] = []
+_depth = 0  # The number of nested `enable` calls
+_active = threading.local()  # The names being measured in this thread
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return 0
+
+
+def _record(name: str, start: float, seconds: float, args: tuple, out, result) -> None:
+    elements = int(np.size(args[0])) if args else 0
+    outs = out if isinstance(out, tuple) else (out,)
+    results = result if isinstance(result, tuple) else (result,)
+    new_arrays = sum(
+        isinstance(array, np.ndarray) and not any(array is buffer for buffer in outs)
+        for array in results
+    )
+    nbytes = sum(_nbytes(arg) for arg in args) + _nbytes(result)
+    with _lock:
+        total = _stats.get(name, CallStats())
+        _stats[name] = CallStats(
+            total.calls + 1,
+            total.elements + elements,
+            total.seconds + seconds,
+            total.bytes + nbytes,
+            total.new_arrays + new_arrays,
+        )
+        hooks = list(_hooks)
+    if hooks:
+        event = Event(name, start, seconds, elements, nbytes, new_arrays)
+        for hook in hooks:
+            hook(event)
+
+
+def _wrap(func: Callable, name: str, method: bool = False) -> Callable:
+    """A measuring wrapper around ``func``; ``method`` skips ``self`` when counting."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        names = _active.__dict__.setdefault("names", set())
+        if name in names:
+            # Re-entered, e.g. through the module by `utils._with_invalid`: the outer call counts
+            return func(*args, **kwargs)
+        names.add(name)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            names.discard(name)
+        seconds = time.perf_counter() - start
+        _record(name, start, seconds, args[1:] if method else args, kwargs.get("out"), result)
+        return result
+
+    return wrapper
+
+
+def _converter_classes() -> list[type]:
+    classes, todo = [], [core.BaseConverter]
+    while todo:
+        cls = todo.pop()
+        for subclass in cls.__subclasses__():
+            if subclass not in classes:
+                classes.append(subclass)
+                todo.append(subclass)
+    return classes
+
+
+def _targets() -> Iterator[tuple[object, str, str, bool]]:
+    """Everything that is profiled: ``(owner, attribute, name, is_method)``."""
+    for function in UTILS_FUNCTIONS:
+        yield utils, function, f"utils.{function}", False
+    for function in SCALAR_FUNCTIONS:
+        yield scalar, function, f"scalar.{function}", False
+    for cls in _converter_classes():
+        for attribute, value in vars(cls).items():
+            if (
+                not attribute.startswith("_")
+                and inspect.isfunction(value)
+                and not inspect.isasyncgenfunction(value)
+                and not hasattr(core.BaseConverter, attribute)
+            ):
+                yield cls, attribute, f"{cls.__name__}.{attribute}", True
+
+
+def enable() -> None:
+    """Start profiling. Calls nest: profiling stops after as many `disable` calls.
+
+    This swaps functions on modules and classes, so it is not thread-safe: call it
+    before starting threads that convert, not while they run.
+    """
+    global _depth
+    with _lock:
+        _depth += 1
+        if _depth > 1:
+            return
+        for owner, attribute, name, method in _targets():
+            original = vars(owner)[attribute]
+            _originals.append((owner, attribute, original))
+            setattr(owner, attribute, _wrap(original, name, method))
+
+
+def disable() -> None:
+    """Stop profiling and restore the unwrapped functions. The counts are kept."""
+    global _depth
+    with _lock:
+        if _depth == 0:
+            return
+        _depth -= 1
+        if _depth > 0:
+            return
+        while _originals:
+            owner, attribute, original = _originals.pop()
+            setattr(owner, attribute, original)
+
+
+def is_enabled() -> bool:
+    """True while profiling is on."""
+    return _depth > 0
+
+
+def snapshot() -> dict[str, CallStats]:
+    """The totals so far, per profiled function name (e.g. ``"utils.flux_to_mag"``)."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset() -> None:
+    """Forget all counts."""
+    with _lock:
+        _stats.clear()
+
+
+def add_hook(hook: Callable[[Event], None]) -> None:
+    """Call ``hook(event)`` after every profiled call, e.g. to emit tracing spans."""
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[Event], None]) -> None:
+    """Stop calling a hook added with `add_hook`."""
+    with _lock:
+        _hooks.remove(hook)
+
+
+@contextmanager
+def profile(reset_counts: bool = True) -> Iterator[dict[str, CallStats]]:
+    """Profile the calls made inside a ``with`` block.
+
+    Parameters
+    ----------
+    reset_counts : bool
+        Clear earlier counts on entry (default), or add to them.
+
+    Yields
+    ------
+    dict
+        Empty on entry; filled with the `snapshot` of the block when it exits.
+    """
+    if reset_counts:
+        reset()
+    result: dict[str, CallStats] = {}
+    enable()
+    try:
+        yield result
+    finally:
+        disable()
+        result.update(snapshot())
+
+
+def format_summary(stats: dict[str, CallStats]) -> str:
+    """Render profile totals as a table, slowest first."""
+    lines = [
+        f"{'function':<48} {'calls':>8} {'elements':>12} {'time':>10} {'elem/s':>10} "
+        f"{'MB':>9} {'arrays':>7}"
+    ]
+    for name, total in sorted(stats.items(), key=lambda item: -item[1].seconds):
+        lines.append(
+            f"{name:<48} {total.calls:>8} {total.elements:>12} {total.seconds:>9.4f}s "
+            f"{total.throughput:>10.3g} {total.bytes / 1e6:>9.2f} {total.new_arrays:>7}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,282 @@
+"""
+query.py
+========
+
+**Description:**
+This module answers range queries on converted quantities, such as "all sources
+brighter than m = 22", without converting the catalog. The bounds are converted
+back into the catalog's own units once (`native_range`), after which a selection
+is a single comparison pass over the raw column (`select`), or, with a
+`SortedIndex` built over the column, two binary searches.
+
+**Development Notes (Instructional):**
+1. **Monotonic conversions:**
+   The four conversions of `utils.py` are monotonic: ``flux_to_mag`` and
+   ``mag_to_flux`` decrease, ``distance_to_distance_modulus`` and its inverse
+   increase. "``m <= 22``" is therefore the same as "``flux >= f``" for one flux
+   ``f``, found by running the conversion backwards with `pipeline.converter_step`.
+
+2. **Same answer as converting first:**
+   A bound converted backwards can be off by an ulp or two, which would move a
+   value sitting exactly on the edge to the wrong side. Each native bound is
+   therefore searched for among the representable values of the column's dtype
+   (galloping, then bisecting) as the last value whose forward conversion, by the
+   converter itself, still satisfies the query. The
+   selection is then identical to converting the column with the converter and
+   filtering the result. Fluxes and distances that are zero, negative or nan have
+   no valid conversion and are never selected.
+"""
+
+import operator
+
+import numpy as np
+
+from .pipeline import QUANTITIES, converter_step
+
+INCLUSIVE = ("both", "neither", "left", "right")
+
+
+def _float_dtype(dtype) -> np.dtype:
+    dtype = np.dtype(dtype)
+    return dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+
+
+def _to_key(value, dtype: np.dtype) -> int:
+    """An integer that orders floats of ``dtype`` like their values; adjacent floats differ by 1."""
+    bits = int(np.array(value, dtype).view(f"i{dtype.itemsize}"))
+    return bits if bits >= 0 else -(bits & ((1 << (8 * dtype.itemsize - 1)) - 1))
+
+
+def _from_key(key: int, dtype: np.dtype):
+    if key < 0:
+        key = -key | (1 << (8 * dtype.itemsize - 1))
+    return np.array(key, f"u{dtype.itemsize}").view(dtype)[()]
+
+
+def _edge(test, start, inside: int, dtype: np.dtype):
+    """The outermost value for which ``test`` holds, searching from ``start``.
+
+    ``test`` must hold on one side of the edge only: above it for ``inside=+1``,
+    below it for ``inside=-1``. The search gallops away from ``start`` in steps of
+    1, 2, 4, ... representable values until ``test`` changes, then bisects, so it
+    costs O(log) calls however far off ``start`` is. Returns None if ``test``
+    holds nowhere.
+    """
+    lowest, highest = _to_key(-np.inf, dtype), _to_key(np.inf, dtype)
+    key = _to_key(start, dtype)
+    # Gallop from the start towards the side where ``test`` changes
+    direction = -inside if test(start) else inside
+    good = key if direction == -inside else None
+    bad = key if good is None else None
+    step = 1
+    while True:
+        probe = min(max(key + direction * step, lowest), highest)
+        if test(_from_key(probe, dtype)):
+            good = probe
+            if bad is not None:
+                break
+        else:
+            bad = probe
+            if good is not None:
+                break
+        if probe in (lowest, highest):
+            return None if good is None else _from_key(good, dtype)
+        key, step = probe, 2 * step
+    while abs(good - bad) > 1:
+        middle = (good + bad) // 2
+        if test(_from_key(middle, dtype)):
+            good = middle
+        else:
+            bad = middle
+    return _from_key(good, dtype)
+
+
+def native_range(
+    converter,
+    method: str,
+    low: float | None = None,
+    high: float | None = None,
+    inclusive: str = "both",
+    dtype=np.float64,
+) -> tuple:
+    """The inputs of ``converter.method`` whose result lies between ``low`` and ``high``.
+
+    Parameters
+    ----------
+    converter : BrightnessConverter or DistanceConverter
+        The converter, e.g. ``BrightnessConverter(zeropoint=8.9)``.
+    method : str
+        ``"flux_to_mag"``, ``"mag_to_flux"``, ``"distance_to_distmod"`` or
+        ``"distmod_to_distance"``.
+    low, high : float, optional
+        Bounds on the converted value; omit either for a one-sided query.
+    inclusive : str
+        Which bounds are included, as for `pandas.Series.between`: ``"both"``
+        (default), ``"neither"``, ``"left"`` or ``"right"``.
+    dtype : dtype
+        The type of the column the bounds will be compared with. Integer columns
+        are compared in float64.
+
+    Returns
+    -------
+    tuple
+        ``(lower, upper)`` in the input's units and ``dtype``: an input ``x`` is
+        selected exactly when ``lower <= x <= upper``. Empty if ``lower > upper``.
+    """
+    if inclusive not in INCLUSIVE:
+        raise ValueError(f"inclusive must be one of {INCLUSIVE}, got {inclusive!r}")
+    step = converter_step(converter, method)
+    convert = getattr(converter, method)
+    dtype = _float_dtype(dtype)
+
+    def forward(x) -> float:
+        with np.errstate(all="ignore"):
+            result = convert(np.full(1, x, dtype=dtype))
+        return np.ma.getdata(result[0] if isinstance(result, tuple) else result)[0]
+
+    def backward(y) -> float:
+        # Invert ``u -> scale * u + offset`` in log space, in float64
+        with np.errstate(all="ignore"):
+            v = np.float64(y) if QUANTITIES[step.target] else np.log10(max(y, 0.0))
+            u = (v - step.offset) / step.scale
+            return dtype.type(u if QUANTITIES[step.source] else 10**u)
+
+    bounds = [dtype.type(-np.inf), dtype.type(np.inf)]
+    if not QUANTITIES[step.source]:
+        # Zero, negative and nan fluxes or distances have no valid conversion
+        bounds[0] = np.nextafter(dtype.type(0), dtype.type(1))
+    for bound, is_low, closed in (
+        (low, True, inclusive in ("both", "left")),
+        (high, False, inclusive in ("both", "right")),
+    ):
+        if bound is None:
+            continue
+        if np.isnan(bound):
+            raise ValueError("query bounds must not be nan")
+        if is_low:
+            compare = operator.ge if closed else operator.gt
+        else:
+            compare = operator.le if closed else operator.lt
+        # A lower bound on the result is a lower bound on the input if the
+        # conversion increases, and an upper bound if it decreases
+        inside = 1 if (step.scale > 0) == is_low else -1
+        edge = _edge(
+            lambda x, compare=compare, bound=bound: compare(forward(x), bound),
+            backward(bound),
+            inside,
+            dtype,
+        )
+        if edge is None:
+            # Nothing satisfies this bound
+            return dtype.type(np.inf), dtype.type(-np.inf)
+        if inside > 0:
+            bounds[0] = max(bounds[0], edge)
+        else:
+            bounds[1] = min(bounds[1], edge)
+    return bounds[0], bounds[1]
+
+
+def in_range(
+    x: np.ndarray,
+    lower: float,
+    upper: float,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+) -> np.ndarray:
+    """True where ``lower <= x <= upper``; shaped like the `utils` conversions for chunking."""
+    out = np.greater_equal(x, lower, out=out, where=where)
+    return np.logical_and(out, np.less_equal(x, upper), out=out, where=where)
+
+
+def select(
+    converter,
+    method: str,
+    values: np.ndarray,
+    low: float | None = None,
+    high: float | None = None,
+    inclusive: str = "both",
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """The rows of ``values`` whose conversion lies between ``low`` and ``high``.
+
+    Equivalent to filtering ``converter.method(values)``, but only compares
+    ``values`` with the two bounds of `native_range`, in one chunked pass through
+    the converter's execution engine and without a converted temporary.
+
+    Parameters
+    ----------
+    converter, method
+        As for `native_range`.
+    values : np.ndarray
+        The catalog column, in the input units of ``method`` (e.g. fluxes).
+    low, high : float, optional
+        Bounds on the converted value; omit either for a one-sided query.
+    inclusive : str
+        Which bounds are included: ``"both"`` (default), ``"neither"``,
+        ``"left"`` or ``"right"``.
+    out : np.ndarray, optional
+        A boolean buffer to write the selection into.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean mask shaped like ``values``.
+    """
+    values = np.asarray(values)
+    lower, upper = native_range(converter, method, low, high, inclusive, values.dtype)
+    return converter.executor.run(in_range, values, lower, upper, out=out)
+
+
+class SortedIndex:
+    """A sorted index over one catalog column, for range queries in O(log N).
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The column, in its own units (e.g. fluxes or distances). Building the
+        index sorts a copy of it, once; nan values sort last and are never found.
+
+    Attributes
+    ----------
+    order : np.ndarray
+        The row numbers of the column in sorted order.
+    sorted : np.ndarray
+        The column values in sorted order.
+    """
+
+    def __init__(self, values: np.ndarray):
+        values = np.asarray(values).reshape(-1)
+        self.order = np.argsort(values, kind="stable")
+        self.sorted = values[self.order]
+
+    def __len__(self) -> int:
+        return self.sorted.size
+
+    def __repr__(self) -> str:
+        return f"SortedIndex({len(self)} rows of {self.sorted.dtype})"
+
+    def span(
+        self,
+        converter,
+        method: str,
+        low: float | None = None,
+        high: float | None = None,
+        inclusive: str = "both",
+    ) -> slice:
+        """The positions in `sorted` (and `order`) of the rows a query selects.
+
+        The arguments are as for `select`; the query costs two binary searches.
+        """
+        lower, upper = native_range(converter, method, low, high, inclusive, self.sorted.dtype)
+        start = int(np.searchsorted(self.sorted, lower, side="left"))
+        stop = int(np.searchsorted(self.sorted, upper, side="right"))
+        return slice(start, max(start, stop))
+
+    def count(self, converter, method: str, **kwargs) -> int:
+        """The number of rows a query selects, see `span`."""
+        span = self.span(converter, method, **kwargs)
+        return span.stop - span.start
+
+    def rows(self, converter, method: str, **kwargs) -> np.ndarray:
+        """The row numbers a query selects, in increasing order, see `span`."""
+        return np.sort(self.order[self.span(converter, method, **kwargs)])
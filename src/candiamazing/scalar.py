@@ -0,0 +1,160 @@
+"""
+scalar.py
+=========
+
+**Description:**
+This module provides the conversions of `utils.py` for single Python floats, using
+only the standard library `math` module.
+
+**Development Notes (Instructional):**
+1. **Why duplicate the math?**
+   NumPy is built for arrays. For one number, the cost of dispatching a ufunc (and of
+   importing NumPy at all) is far larger than the arithmetic itself. These functions
+   give the same answers as `utils.py` for plain floats, including ``nan`` and ``inf``
+   where NumPy would return them, without touching NumPy.
+
+2. **Binding the zeropoint:**
+   The converters call these functions with their zeropoint on every scalar, so
+   `bind_zeropoint` builds closures with it bound once. ``functools.partial`` with a
+   ``zeropoint=`` keyword would rebuild a keyword dict on every call, which costs
+   more than the arithmetic. The closures, like the distance conversions the
+   `DistanceConverter` calls directly, inline the common in-domain case of `_log10`
+   and `_exp10`, and return exactly what the functions above return.
+"""
+
+import math
+from collections.abc import Callable
+
+# Error propagation factors, as in `utils.py`: 2.5 / ln(10) and 5 / ln(10)
+_MAG_ERROR_FACTOR = 2.5 / math.log(10)
+_DISTMOD_ERROR_FACTOR = 5 / math.log(10)
+
+
+def _log10(x: float) -> float:
+    """`math.log10` with NumPy's results outside its domain instead of exceptions."""
+    if x > 0:
+        return math.log10(x)
+    if x == 0:
+        return -math.inf
+    return math.nan
+
+
+def _exp10(x: float) -> float:
+    """``10 ** x`` with NumPy's overflow to ``inf`` instead of an exception."""
+    try:
+        return 10.0**x
+    except OverflowError:
+        return math.inf
+
+
+def _ratio(x: float, y: float) -> float:
+    """``|x / y|`` with NumPy's ``inf`` (or ``nan`` for 0 / 0) instead of an exception."""
+    if y == 0:
+        return math.nan if x == 0 else math.inf
+    return abs(x / y)
+
+
+def flux_to_mag(flux: float, zeropoint: float) -> float:
+    """Convert a flux to a magnitude, see `utils.flux_to_mag`."""
+    return -2.5 * _log10(flux) + zeropoint
+
+
+def mag_to_flux(mag: float, zeropoint: float) -> float:
+    """Convert a magnitude to a flux, see `utils.mag_to_flux`."""
+    return _exp10((zeropoint - mag) / 2.5)
+
+
+def distance_modulus_to_distance(distmod: float) -> float:
+    """Convert a distance modulus to parsecs, see `utils.distance_modulus_to_distance`."""
+    try:
+        return 10.0 ** ((distmod + 5) / 5)
+    except OverflowError:
+        return math.inf
+
+
+def distance_to_distance_modulus(distance: float) -> float:
+    """Convert parsecs to a distance modulus, see `utils.distance_to_distance_modulus`."""
+    return 5 * (math.log10(distance) if distance > 0 else _log10(distance)) - 5
+
+
+def absolute_magnitude(flux: float, distance: float, zeropoint: float) -> float:
+    """Convert flux and parsecs to an absolute magnitude, see `utils.absolute_magnitude`."""
+    return -2.5 * _log10(flux * (distance * distance)) + zeropoint + 5
+
+
+def luminosity(flux: float, distance: float) -> float:
+    """Convert flux and parsecs to a luminosity, see `utils.luminosity`."""
+    return 4 * math.pi * (distance * distance) * flux
+
+
+def flux_to_mag_with_error(flux: float, flux_err: float, zeropoint: float) -> tuple[float, float]:
+    """Convert a flux and its error to a magnitude and its error.
+
+    See `utils.flux_to_mag_with_error`.
+    """
+    return flux_to_mag(flux, zeropoint), _MAG_ERROR_FACTOR * _ratio(flux_err, flux)
+
+
+def mag_to_flux_with_error(mag: float, mag_err: float, zeropoint: float) -> tuple[float, float]:
+    """Convert a magnitude and its error to a flux and its error.
+
+    See `utils.mag_to_flux_with_error`.
+    """
+    flux = mag_to_flux(mag, zeropoint)
+    return flux, flux * mag_err / _MAG_ERROR_FACTOR
+
+
+def distance_to_distance_modulus_with_error(
+    distance: float, distance_err: float
+) -> tuple[float, float]:
+    """Convert parsecs and their error to a distance modulus and its error.
+
+    See `utils.distance_to_distance_modulus_with_error`.
+    """
+    distmod = distance_to_distance_modulus(distance)
+    return distmod, _DISTMOD_ERROR_FACTOR * _ratio(distance_err, distance)
+
+
+def bind_zeropoint(zeropoint: float) -> dict[str, Callable[..., float]]:
+    """The conversions that take a zeropoint, with ``zeropoint`` bound.
+
+    Parameters
+    ----------
+    zeropoint : float
+        The zeropoint of the magnitude system.
+
+    Returns
+    -------
+    dict
+        Maps ``"flux_to_mag"``, ``"mag_to_flux"``, ``"flux_to_mag_with_error"``,
+        ``"mag_to_flux_with_error"`` and ``"absolute_magnitude"`` to functions of
+        the remaining arguments, with the same results as the functions above.
+    """
+    log10 = math.log10
+
+    def bound_flux_to_mag(flux: float) -> float:
+        return -2.5 * (log10(flux) if flux > 0 else _log10(flux)) + zeropoint
+
+    def bound_mag_to_flux(mag: float) -> float:
+        try:
+            return 10.0 ** ((zeropoint - mag) / 2.5)
+        except OverflowError:
+            return math.inf
+
+    def bound_flux_to_mag_with_error(flux: float, flux_err: float) -> tuple[float, float]:
+        return bound_flux_to_mag(flux), _MAG_ERROR_FACTOR * _ratio(flux_err, flux)
+
+    def bound_mag_to_flux_with_error(mag: float, mag_err: float) -> tuple[float, float]:
+        flux = bound_mag_to_flux(mag)
+        return flux, flux * mag_err / _MAG_ERROR_FACTOR
+
+    def bound_absolute_magnitude(flux: float, distance: float) -> float:
+        return -2.5 * _log10(flux * (distance * distance)) + zeropoint + 5
+
+    return {
+        "flux_to_mag": bound_flux_to_mag,
+        "mag_to_flux": bound_mag_to_flux,
+        "flux_to_mag_with_error": bound_flux_to_mag_with_error,
+        "mag_to_flux_with_error": bound_mag_to_flux_with_error,
+        "absolute_magnitude": bound_absolute_magnitude,
+    }
@@ -0,0 +1,348 @@
+"""
+server.py
+=========
+
+**Description:**
+This module implements a long-running conversion server (``candiamazing serve``) and
+the matching `Client`. The server keeps one warm interpreter with NumPy loaded and
+answers batched conversion requests, either over its stdin/stdout or over a local
+Unix socket.
+
+**Development Notes (Instructional):**
+1. **Why a server?**
+   Starting Python and importing NumPy costs far more than converting a few thousand
+   numbers. A pipeline that calls the CLI many times pays that start-up every time;
+   talking to one running server pays it once.
+
+2. **The protocol:**
+   Every message is either one line of JSON, or a binary frame for large arrays:
+
+   * JSON line: ``{"id": 1, "op": "flux_to_mag", "values": [1.0, 10.0], "zeropoint": 8.9}``
+     answered by ``{"id": 1, "result": [8.9, 6.4]}`` (or ``{"id": 1, "error": "..."}``).
+   * Binary frame: the 4 bytes ``CAMZ``, the header length and the payload length (as
+     little-endian uint32 and uint64), a JSON header like the line above but without
+     ``values``, and the values as raw little-endian float64. Answers to binary
+     requests are binary frames too.
+
+   Requests on one connection are answered in order, so a client may send many
+   requests before reading any answers (pipelining).
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+from itertools import count
+from typing import BinaryIO
+
+import numpy as np
+
+from . import utils
+
+MAGIC = b"CAMZ"
+FRAME_HEADER = struct.Struct("<4sIQ")
+PAYLOAD_DTYPE = "<f8"
+
+# Operations understood by the server, and whether each one takes a zeropoint
+OPERATIONS = {
+    "flux_to_mag": (utils.flux_to_mag, True),
+    "mag_to_flux": (utils.mag_to_flux, True),
+    "distance_to_distmod": (utils.distance_to_distance_modulus, False),
+    "distmod_to_distance": (utils.distance_modulus_to_distance, False),
+}
+
+
+def _read_exactly(rfile: BinaryIO, size: int) -> bytes:
+    data = rfile.read(size)
+    if len(data) != size:
+        raise EOFError("connection closed in the middle of a frame")
+    return data
+
+
+def read_message(rfile: BinaryIO) -> tuple[dict, np.ndarray | None, bool] | None:
+    """Read one request or response from a binary stream.
+
+    Returns
+    -------
+    tuple or None
+        ``(header, payload, binary)``, where ``payload`` holds the array of a
+        binary frame (None for JSON lines) and ``binary`` tells which kind of
+        message it was. None at the end of the stream.
+    """
+    while True:
+        first = rfile.read(1)
+        if not first:
+            return None
+        if first == MAGIC[:1]:
+            rest = _read_exactly(rfile, FRAME_HEADER.size - 1)
+            magic, header_size, payload_size = FRAME_HEADER.unpack(first + rest)
+            if magic != MAGIC:
+                raise ValueError(f"bad frame magic {magic!r}")
+            header = json.loads(_read_exactly(rfile, header_size))
+            payload = np.frombuffer(_read_exactly(rfile, payload_size), dtype=PAYLOAD_DTYPE)
+            return header, payload, True
+        if first.isspace():
+            continue
+        return json.loads(first + rfile.readline()), None, False
+
+
+def write_message(
+    wfile: BinaryIO, header: dict, payload: np.ndarray | None = None, binary: bool = False
+) -> None:
+    """Write one request or response to a binary stream.
+
+    For JSON lines the payload, if any, is sent as the list under ``"values"``
+    (requests) or ``"result"`` (responses) and should already be in ``header``.
+    """
+    if not binary:
+        wfile.write(json.dumps(header).encode() + b"\n")
+        return
+    header_bytes = json.dumps(header).encode()
+    data = b"" if payload is None else np.ascontiguousarray(payload, PAYLOAD_DTYPE).tobytes()
+    wfile.write(FRAME_HEADER.pack(MAGIC, len(header_bytes), len(data)))
+    wfile.write(header_bytes)
+    wfile.write(data)
+
+
+def handle_request(header: dict, payload: np.ndarray | None) -> float | np.ndarray:
+    """Run the conversion described by a request and return its result."""
+    op = header.get("op")
+    if op not in OPERATIONS:
+        raise ValueError(f"unknown op {op!r}, expected one of {sorted(OPERATIONS)}")
+    func, needs_zeropoint = OPERATIONS[op]
+
+    values = payload if payload is not None else header.get("values")
+    if values is None:
+        raise ValueError("request has no values")
+    if isinstance(values, list):
+        values = np.asarray(values, dtype=np.float64)
+
+    if needs_zeropoint:
+        if "zeropoint" not in header:
+            raise ValueError(f"op {op!r} needs a zeropoint")
+        return func(values, header["zeropoint"])
+    return func(values)
+
+
+def serve_stream(rfile: BinaryIO, wfile: BinaryIO) -> int:
+    """Answer requests from ``rfile`` on ``wfile`` until the end of the stream.
+
+    Errors in a request are reported back to the client and do not stop the server.
+
+    Returns
+    -------
+    int
+        The number of requests answered.
+    """
+    answered = 0
+    while True:
+        try:
+            message = read_message(rfile)
+        except (ValueError, EOFError) as err:
+            # The stream is no longer in sync, so report and stop
+            write_message(wfile, {"id": None, "error": str(err)})
+            wfile.flush()
+            return answered
+        if message is None:
+            return answered
+        header, payload, binary = message
+
+        response = {"id": header.get("id")}
+        result = None
+        try:
+            result = handle_request(header, payload)
+        except Exception as err:
+            response["error"] = f"{type(err).__name__}: {err}"
+        else:
+            if binary:
+                result = np.atleast_1d(result)
+                response["shape"] = list(np.shape(result))
+            else:
+                response["result"] = np.asarray(result).tolist()
+
+        write_message(wfile, response, result if binary else None, binary=binary)
+        wfile.flush()
+        answered += 1
+
+
+class _StreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve_stream(self.rfile, self.wfile)
+
+
+def make_socket_server(path: str) -> socketserver.BaseServer:
+    """Create a threaded server bound to a Unix socket at ``path``.
+
+    Each connection is handled on its own thread; requests within a connection
+    are answered in order. Call ``serve_forever()`` on the result to run it.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError("Unix sockets are not supported on this platform")
+    server = socketserver.ThreadingUnixStreamServer(path, _StreamHandler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_socket(path: str) -> None:
+    """Serve requests on a Unix socket at ``path`` until interrupted."""
+    with make_socket_server(path) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+class Client:
+    """A client for a running conversion server.
+
+    Use `Client.connect` for a server listening on a Unix socket, or
+    `Client.spawn` to start a private server process talking over pipes.
+
+    Parameters
+    ----------
+    rfile, wfile : BinaryIO
+        Streams to read responses from and write requests to.
+    """
+
+    def __init__(self, rfile: BinaryIO, wfile: BinaryIO, closer=None):
+        self.rfile = rfile
+        self.wfile = wfile
+        self._closer = closer
+        self._ids = count()
+
+    @classmethod
+    def connect(cls, path: str) -> "Client":
+        """Connect to a server listening on the Unix socket at ``path``."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        rfile = sock.makefile("rb")
+        wfile = sock.makefile("wb")
+
+        def closer():
+            rfile.close()
+            wfile.close()
+            sock.close()
+
+        return cls(rfile, wfile, closer)
+
+    @classmethod
+    def spawn(cls, python: str = sys.executable) -> "Client":
+        """Start ``candiamazing serve`` in a child process and connect to its pipes."""
+        process = subprocess.Popen(
+            [python, "-m", "candiamazing.cli", "serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+        def closer():
+            process.stdin.close()
+            process.wait()
+            process.stdout.close()
+
+        return cls(process.stdout, process.stdin, closer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection (and stop the server process, if spawned)."""
+        if self._closer is not None:
+            self._closer()
+            self._closer = None
+
+    def send(
+        self,
+        op: str,
+        values: float | list | np.ndarray,
+        zeropoint: float | None = None,
+        binary: bool | None = None,
+    ) -> int:
+        """Send a request without waiting for the answer.
+
+        Parameters
+        ----------
+        op : str
+            The conversion, one of `OPERATIONS`.
+        values : float, list or np.ndarray
+            The value(s) to convert.
+        zeropoint : float, optional
+            The zeropoint, for ``flux_to_mag`` and ``mag_to_flux``.
+        binary : bool, optional
+            Send the values as a binary frame instead of JSON. By default NumPy
+            arrays are sent as binary frames and everything else as JSON.
+
+        Returns
+        -------
+        int
+            The request id, to match against `receive`.
+
+        Notes
+        -----
+        Requests are buffered until the next `receive`. When pipelining a very
+        large number of requests, interleave `receive` calls so that neither
+        side's buffers fill up.
+        """
+        request_id = next(self._ids)
+        header = {"id": request_id, "op": op}
+        if zeropoint is not None:
+            header["zeropoint"] = zeropoint
+        if binary is None:
+            binary = isinstance(values, np.ndarray)
+        if binary:
+            write_message(self.wfile, header, np.asarray(values, dtype=np.float64), binary=True)
+        else:
+            header["values"] = np.asarray(values).tolist()
+            write_message(self.wfile, header)
+        return request_id
+
+    def receive(self) -> tuple[int, float | list | np.ndarray]:
+        """Wait for the next answer.
+
+        Returns
+        -------
+        tuple
+            ``(request_id, result)``. Binary answers come back as NumPy arrays,
+            JSON answers as floats or lists.
+
+        Raises
+        ------
+        RuntimeError
+            If the server reported an error for the request.
+        """
+        self.wfile.flush()
+        message = read_message(self.rfile)
+        if message is None:
+            raise EOFError("server closed the connection")
+        header, payload, binary = message
+        if "error" in header:
+            raise RuntimeError(f"request {header['id']} failed: {header['error']}")
+        if binary:
+            return header["id"], payload.reshape(header["shape"])
+        return header["id"], header["result"]
+
+    def request(self, op: str, values, zeropoint: float | None = None, binary=None):
+        """Send one request and wait for its answer."""
+        self.send(op, values, zeropoint=zeropoint, binary=binary)
+        return self.receive()[1]
+
+    def flux_to_mag(self, flux, zeropoint: float):
+        """Convert flux to magnitude on the server, see `utils.flux_to_mag`."""
+        return self.request("flux_to_mag", flux, zeropoint=zeropoint)
+
+    def mag_to_flux(self, mag, zeropoint: float):
+        """Convert magnitude to flux on the server, see `utils.mag_to_flux`."""
+        return self.request("mag_to_flux", mag, zeropoint=zeropoint)
+
+    def distance_to_distmod(self, distance):
+        """Convert parsecs to distance modulus on the server."""
+        return self.request("distance_to_distmod", distance)
+
+    def distmod_to_distance(self, distmod):
+        """Convert distance modulus to parsecs on the server."""
+        return self.request("distmod_to_distance", distmod)
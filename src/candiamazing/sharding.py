@@ -0,0 +1,284 @@
+"""
+sharding.py
+===========
+
+**Description:**
+This module converts many catalog files in one run (``candiamazing convert_files``).
+Input files, given as paths or glob patterns, are fanned out over a process pool;
+each converted file is written to its own output file, optionally spread over
+several shard directories, and a manifest in the output directory records what
+has been converted so that a rerun only touches new or changed inputs.
+
+**Development Notes (Instructional):**
+1. **Warm workers:**
+   The converter is pickled once per worker process, by the pool's initializer,
+   rather than once per file. Each worker then keeps it (and NumPy, and any memo
+   or lookup tables it builds) warm for every file it is given.
+
+2. **Incremental reruns:**
+   The manifest stores, per input, its size and modification time (and a SHA-256
+   of its contents with ``use_hash=True``) together with the conversion settings:
+   the method, the file options and everything `BaseConverter.settings` lists
+   (zeropoint, dtype, invalid policy, cosmology, ...).
+   An input is skipped when its output exists and neither the input nor the
+   settings have changed. The manifest is written even if the run is interrupted,
+   so finished files are not redone.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+import zlib
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+from . import catalog
+
+MANIFEST_NAME = ".candiamazing-manifest.json"
+FORMATS = ("auto", "text", "array")
+
+_converter = None  # The warm converter of a worker process, see `_init_worker`
+
+
+class FileResult(NamedTuple):
+    """The outcome of converting one file.
+
+    Attributes
+    ----------
+    input, output : str
+        The input file and the output file it was converted into.
+    elements : int
+        The number of values converted; 0 if the file was skipped.
+    seconds : float
+        The wall time of the conversion.
+    skipped : bool
+        True if the output was already up to date.
+    """
+
+    input: str
+    output: str
+    elements: int
+    seconds: float
+    skipped: bool
+
+    @property
+    def throughput(self) -> float:
+        """Values converted per second."""
+        return self.elements / self.seconds if self.seconds > 0 else 0.0
+
+
+def expand_inputs(patterns: Iterable[str]) -> list[str]:
+    """Expand glob patterns into a sorted, duplicate-free list of existing files.
+
+    Raises
+    ------
+    FileNotFoundError
+        If a plain path (not a pattern) does not exist.
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern)))
+        elif os.path.isfile(pattern):
+            paths.append(pattern)
+        else:
+            raise FileNotFoundError(f"No such input file: {pattern!r}")
+    return list(dict.fromkeys(paths))
+
+
+def shard_path(path: str, output_dir: str, shards: int = 1) -> str:
+    """The output file of ``path``: same name, in ``output_dir`` or one of its shards.
+
+    With several shards the file goes to ``shard-NNN/`` under ``output_dir``, chosen
+    by a stable hash of its name, so a file always lands in the same shard.
+    """
+    name = os.path.basename(path)
+    if shards <= 1:
+        return os.path.join(output_dir, name)
+    shard = zlib.crc32(name.encode()) % shards
+    return os.path.join(output_dir, f"shard-{shard:03d}", name)
+
+
+def fingerprint(path: str, use_hash: bool = False) -> dict:
+    """Size and modification time of a file, plus a SHA-256 of its contents if asked."""
+    stat = os.stat(path)
+    result = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if use_hash:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        result["sha256"] = digest.hexdigest()
+    return result
+
+
+def load_manifest(output_dir: str) -> dict:
+    """Read the manifest of an output directory; empty if there is none yet."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(output_dir: str, manifest: dict) -> None:
+    """Write the manifest atomically, so an interrupted run never leaves half a file."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _up_to_date(entry: dict | None, current: dict, settings: dict, output: str) -> bool:
+    if entry is None or entry.get("settings") != settings or not os.path.exists(output):
+        return False
+    if "sha256" in current:
+        return entry["input"].get("sha256") == current["sha256"]
+    return entry["input"] == current
+
+
+def _init_worker(converter) -> None:
+    global _converter
+    _converter = converter
+
+
+def _convert_one(
+    method: str, path: str, output: str, fmt: str, text_options: dict, converter=None
+) -> tuple[int, float]:
+    """Convert one file with the worker's converter; returns the count and wall time."""
+    func = getattr(converter or _converter, method)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    start = time.perf_counter()
+    if fmt == "array" or (fmt == "auto" and path.endswith(".npy")):
+        count = catalog.convert_array(func, path, output, pass_out=True)
+    else:
+        with open(path, newline="") as instream, open(output, "w") as outstream:
+            count = catalog.convert_stream(func, instream, outstream, **text_options)
+    return count, time.perf_counter() - start
+
+
+def convert_files(
+    converter,
+    method: str,
+    inputs: Iterable[str],
+    output_dir: str,
+    workers: int = 1,
+    shards: int = 1,
+    fmt: str = "auto",
+    use_hash: bool = False,
+    force: bool = False,
+    progress: Callable[[FileResult, int, int], None] | None = None,
+    **text_options,
+) -> list[FileResult]:
+    """Convert many catalog files, in parallel and incrementally.
+
+    Parameters
+    ----------
+    converter : BaseConverter
+        The converter, e.g. ``BrightnessConverter(zeropoint=8.9)``. It is sent to
+        each worker process once.
+    method : str
+        Name of the conversion method, e.g. ``"flux_to_mag"``.
+    inputs : iterable of str
+        Input files or glob patterns, see `expand_inputs`.
+    output_dir : str
+        Where the converted files go, see `shard_path`. Created if needed. Two
+        inputs with the same file name would share an output, so they raise
+        ValueError before any file is converted.
+    workers : int
+        The number of worker processes; 1 converts in the calling process.
+    shards : int
+        The number of shard directories to spread the outputs over.
+    fmt : str
+        ``"text"`` for delimited catalogs (see `catalog.convert_stream`),
+        ``"array"`` for ``.npy`` files or raw dumps (see `catalog.convert_array`),
+        or ``"auto"`` (default): arrays for ``.npy`` files, text otherwise.
+    use_hash : bool
+        Compare inputs by a SHA-256 of their contents rather than by size and
+        modification time.
+    force : bool
+        Convert every input, even if it is up to date.
+    progress : callable, optional
+        Called as ``progress(result, done, total)`` after each file.
+    **text_options
+        Passed on to `catalog.convert_stream` for text catalogs: ``column``,
+        ``output_column``, ``chunksize`` and ``delimiter``.
+
+    Returns
+    -------
+    list of FileResult
+        One result per input, in completion order.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}, got {fmt!r}")
+    if not callable(getattr(converter, method, None)):
+        raise ValueError(f"{type(converter).__name__} has no conversion method {method!r}")
+    paths = expand_inputs(inputs)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    settings = {
+        **converter.settings(),
+        "method": method,
+        "fmt": fmt,
+        **text_options,
+    }
+
+    results, tasks, claimed = [], [], {}
+    for path in paths:
+        output = shard_path(path, output_dir, shards)
+        if os.path.realpath(output) == os.path.realpath(path):
+            raise ValueError(f"Output {output!r} would overwrite its input")
+        # Outputs keep only the file name, so inputs of the same name in different
+        # directories would overwrite each other; refuse before converting any
+        other = claimed.setdefault(os.path.realpath(output), path)
+        if other != path:
+            raise ValueError(f"Inputs {other!r} and {path!r} would both be written to {output!r}")
+        current = fingerprint(path, use_hash)
+        if not force and _up_to_date(manifest.get(path), current, settings, output):
+            results.append(FileResult(path, output, 0, 0.0, True))
+        else:
+            tasks.append((path, output, current))
+
+    def record(result: FileResult, current: dict | None = None) -> None:
+        results.append(result)
+        if current is not None:
+            manifest[result.input] = {
+                "input": current,
+                "output": result.output,
+                "settings": settings,
+            }
+        if progress is not None:
+            progress(result, len(results), len(paths))
+
+    if progress is not None:
+        for done, result in enumerate(results, 1):
+            progress(result, done, len(paths))
+    try:
+        if workers <= 1 or len(tasks) < 2:
+            for path, output, current in tasks:
+                count, seconds = _convert_one(
+                    method, path, output, fmt, text_options, converter=converter
+                )
+                record(FileResult(path, output, count, seconds, False), current)
+        else:
+            with ProcessPoolExecutor(
+                workers, initializer=_init_worker, initargs=(converter,)
+            ) as pool:
+                futures = {
+                    pool.submit(_convert_one, method, path, output, fmt, text_options): (
+                        path,
+                        output,
+                        current,
+                    )
+                    for path, output, current in tasks
+                }
+                for future in as_completed(futures):
+                    path, output, current = futures[future]
+                    count, seconds = future.result()
+                    record(FileResult(path, output, count, seconds, False), current)
+    finally:
+        save_manifest(output_dir, manifest)
+    return results
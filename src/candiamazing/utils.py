@@ -20,12 +20,282 @@ It contains the raw physics equations for astronomical conversions (flux, magnit
    if this file grew to 1000+ lines, it would be standard practice to convert `utils.py` into
    a directory (`utils/`) containing multiple specific files (e.g., `utils/photometry.py`,
    `utils/cosmology.py`), while using `__init__.py` to keep the import paths clean.
+
+3. **Avoiding temporaries:**
+   A NumPy expression like ``-2.5 * np.log10(flux) + zeropoint`` creates a new array
+   for every operation. Each function below instead runs its expression as a chain of
+   ufunc calls that all write into the same ``out`` buffer, so a conversion allocates at
+   most one array, and none at all if the caller supplies ``out``.
+
+4. **Precision:**
+   Every function computes in one floating type, its "working dtype": the type of
+   ``out`` if given, else the ``dtype`` argument, else the type of the input arrays
+   (float64 for integers). Constants such as the zeropoint are cast to it, so a float32
+   catalog stays float32 throughout, even with a NumPy float64 zeropoint. In float32,
+   magnitudes and distance moduli below 100 are accurate to 2e-5 mag, and fluxes and
+   distances to a relative 1e-5 for magnitudes within 50 of the zeropoint (distance
+   moduli below 50). Float64 is about 1e9 times more accurate.
+
+5. **Approximate mode:**
+   `flux_to_mag` and `mag_to_flux` accept ``approx``, the error in magnitudes the
+   caller can live with. When it is loose enough `mag_to_flux` switches to ``exp2``,
+   which has a proven error bound, in place of the much slower general ``power``. A
+   tolerance below the bound simply keeps the exact path, so the requested accuracy is
+   always met. `flux_to_mag` has no cheaper kernel: NumPy's ``log10`` is already a
+   SIMD loop, and evaluating it in float32 saves less than the check for inputs
+   outside float32's range costs, so ``approx`` is accepted there and ignored.
+
+6. **Invalid inputs:**
+   Real photometry has zero and negative fluxes, which have no magnitude. Every
+   function takes an ``invalid`` policy for such inputs (see `INVALID_POLICIES`).
+   Rather than pre-filtering the data with ``np.where`` copies, the policy builds one
+   boolean array of out-of-domain elements, runs the usual ufunc chain with those
+   elements excluded through ``where=`` and warnings switched off with `np.errstate`,
+   and then writes only the excluded elements. Without a policy, NumPy's default
+   behaviour (a RuntimeWarning and nan or inf) is kept.
+
+7. **Duck arrays:**
+   Chunked and lazy arrays such as dask or xarray arrays are not NumPy arrays, but they
+   implement NumPy's ufunc protocol (``__array_ufunc__``, NEP 13). Given one, every
+   function below skips its buffers and runs the same chain of ufunc calls without
+   ``out``, so each call is handed to the array's own implementation and the result is
+   a duck array of the same kind, with the same chunks, and nothing computed yet.
+   ``where`` and the ``"nan"`` and ``"sentinel"`` policies select elements with
+   `np.where`, which such arrays implement through ``__array_function__`` (NEP 18);
+   arrays that implement only the ufunc protocol get a NumPy array from those options.
+   Writing into ``out`` and the policies that need the values right away (``"mask"``,
+   ``"bitmask"``, ``"clip"`` and ``"raise"``) are refused with a TypeError rather than
+   silently loading the whole array into memory.
 """
 
 import numpy as np
 
+# One parsec in centimetres
+PARSEC_CM = 3.0856775814913673e18
+
+# d(mag)/d(ln flux) = 2.5 / ln(10) and d(distmod)/d(ln distance) = 5 / ln(10)
+MAG_ERROR_FACTOR = 1.0857362047581294
+DISTMOD_ERROR_FACTOR = 2.1714724095162588
+
+
+def working_dtype(*values, out=None, dtype=None) -> np.dtype:
+    """The floating type a conversion of ``values`` computes in.
+
+    Parameters
+    ----------
+    *values : float or np.ndarray
+        The data inputs of the conversion (not its constants).
+    out : np.ndarray or tuple of np.ndarray, optional
+        The output buffer(s); their type wins if given.
+    dtype : dtype, optional
+        The requested type, used if there is no ``out``.
+
+    Returns
+    -------
+    np.dtype
+        ``out.dtype``, else ``dtype``, else the floating type of ``values``.
+    """
+    if out is not None:
+        return (out[0] if isinstance(out, tuple) else out).dtype
+    if dtype is not None:
+        return np.dtype(dtype)
+    return np.result_type(*values, 1.0)
+
+
+# log2(10) and ln(2)
+_LOG2_10 = 3.321928094887362
+_LN2 = 0.6931471805599453
+
+def approx_exp2_error(dtype: np.dtype) -> float:
+    """Worst-case error, in magnitudes, of the ``exp2`` form of `mag_to_flux` in ``dtype``.
+
+    Rounding ``(zeropoint - mag) / 2.5 * log2(10)`` costs up to three ulps of an
+    exponent as large as ``finfo(dtype).maxexp``, and each ulp of exponent is a
+    relative flux error of ``ln(2) * eps``.
+    """
+    finfo = np.finfo(dtype)
+    return MAG_ERROR_FACTOR * (3 * _LN2 * float(finfo.eps) * finfo.maxexp + 4 * float(finfo.eps))
+
+
+def _cast(value, dtype: np.dtype):
+    """Cast a constant (or a per-row array of constants) to the working dtype."""
+    return np.asarray(value, dtype=dtype)
+
+
+def _scalars(dtype, *values) -> tuple:
+    """Cast the inputs of a scalar conversion to ``dtype``, unless it is None."""
+    if dtype is None:
+        return values
+    return tuple(np.dtype(dtype).type(value) for value in values)
+
+
+def _is_duck(value) -> bool:
+    """True for arrays that are not NumPy arrays but implement its protocols (NEP 13/18)."""
+    if isinstance(value, (np.ndarray, np.generic, float, int)):
+        return False
+    cls = type(value)
+    return getattr(cls, "__array_ufunc__", None) is not None or hasattr(cls, "__array_function__")
+
+
+def _any_duck(*values) -> bool:
+    return any(_is_duck(value) for value in values)
+
+
+def _lazy_dtype(*values, dtype=None) -> np.dtype:
+    """`working_dtype` of duck arrays, read from their ``dtype`` without computing them."""
+    if dtype is not None:
+        return np.dtype(dtype)
+    return np.result_type(*(getattr(value, "dtype", value) for value in values), 1.0)
+
+
+def _lazy_constant(value, dtype: np.dtype):
+    """`_cast` for a constant that may itself be a duck array (e.g. per-row zeropoints)."""
+    return value if _is_duck(value) else _cast(value, dtype)
+
+
+def _lazy_finish(result, inputs, domains, out, where, invalid, fill):
+    """Apply ``out``, ``where`` and the ``invalid`` policy to a conversion of duck arrays.
+
+    ``inputs`` and ``domains`` are as for `_with_invalid`. Elements are selected with
+    `np.where`, so the result stays lazy.
+    """
+    if out is not None:
+        raise TypeError("out is not supported for duck arrays, which are not written in place")
+    if invalid not in (None, "nan", "sentinel"):
+        raise TypeError(
+            f"invalid={invalid!r} is not supported for duck arrays; use 'nan' or 'sentinel'"
+        )
+    outs = result if isinstance(result, tuple) else (result,)
+    if invalid is not None:
+        bad = None
+        for value, domain in zip(inputs, domains, strict=True):
+            if domain is not None:
+                bad = domain(value) if bad is None else np.logical_or(bad, domain(value))
+        replacement = fill if invalid == "sentinel" else np.nan
+        outs = tuple(np.where(bad, replacement, array) for array in outs)
+    if where is not True:
+        outs = tuple(np.where(where, array, np.nan) for array in outs)
+    return outs if isinstance(result, tuple) else outs[0]
 
-def flux_to_mag(flux: float | np.ndarray, zeropoint: float) -> float | np.ndarray:
+
+# Policies for inputs outside a conversion's domain (non-positive or nan fluxes and
+# distances, nan magnitudes):
+#   "nan"       invalid elements become nan, silently
+#   "mask"      as "nan", returned as a masked array (a tuple of them for two results)
+#   "bitmask"   as "nan", returned as ``(result, bits)`` with the invalid elements packed
+#               eight to a byte by `np.packbits`, 1/64 of the size of a float64 result
+#   "clip"      non-positive inputs are raised to the smallest normal float first, giving
+#               large but finite magnitudes; nan stays nan
+#   "raise"     ValueError if any element is invalid
+#   "sentinel"  invalid elements are set to the ``fill`` value, e.g. 99
+INVALID_POLICIES = ("nan", "mask", "bitmask", "clip", "raise", "sentinel")
+
+
+def _not_positive(value) -> np.ndarray:
+    """True where ``value`` is outside the domain of a logarithm: zero, negative or nan."""
+    inside = np.greater(value, 0)
+    return np.logical_not(inside, out=inside) if isinstance(inside, np.ndarray) else ~inside
+
+
+def flag_invalid(result, bad: np.ndarray, invalid: str):
+    """Attach the invalid elements ``bad`` to a result, as the ``"mask"`` and ``"bitmask"``
+    policies return them. Other policies return ``result`` unchanged.
+
+    Parameters
+    ----------
+    result : np.ndarray or tuple of np.ndarray
+        The converted values, with nan in the invalid elements.
+    bad : np.ndarray
+        True for the invalid elements, broadcastable to the result.
+    invalid : str
+        One of `INVALID_POLICIES`.
+    """
+    outs = result if isinstance(result, tuple) else (result,)
+    shape = np.shape(outs[0])
+    if invalid == "bitmask":
+        # np.unpackbits(bits, count=size).reshape(shape) recovers the boolean array
+        return result, np.packbits(np.broadcast_to(bad, shape), axis=None)
+    if invalid != "mask":
+        return result
+    if np.shape(bad) != shape:
+        bad = np.broadcast_to(bad, shape).copy()
+    masked = tuple(np.ma.MaskedArray(array, mask=bad) for array in outs)
+    return masked if isinstance(result, tuple) else masked[0]
+
+
+def _with_invalid(func, inputs, domains, out, where, invalid, fill, n_out=1, **kwargs):
+    """Run the conversion ``func(*inputs, out=out, where=where, **kwargs)`` under a policy.
+
+    ``domains`` holds, for each of ``inputs``, a predicate that is True outside the
+    domain of the conversion, or None for constants such as the zeropoint. The
+    chain runs once over everything under `np.errstate`, so NumPy neither warns
+    nor copies, and then only the invalid elements are overwritten.
+    """
+    if invalid not in INVALID_POLICIES:
+        raise ValueError(f"invalid must be one of {INVALID_POLICIES}, got {invalid!r}")
+    bad = np.False_
+    for value, domain in zip(inputs, domains, strict=True):
+        if domain is not None:
+            bad = domain(value) if bad is np.False_ else np.logical_or(bad, domain(value))
+    if where is not True:
+        bad = np.logical_and(bad, where)
+    any_bad = bool(bad.any())
+    if invalid == "raise" and any_bad:
+        raise ValueError(
+            f"{np.count_nonzero(bad)} input value(s) outside the domain of {func.__name__}"
+        )
+
+    shape = np.broadcast_shapes(*(np.shape(value) for value in inputs))
+    scalar = out is None and shape == ()
+    if out is None:
+        # Allocate here, so that scalars take the array path and honour ``where`` too
+        data = [value for value, domain in zip(inputs, domains, strict=True) if domain]
+        dtype = working_dtype(*data, dtype=kwargs.get("dtype"))
+        out = tuple(np.empty(shape, dtype) for _ in range(n_out))
+        out = out if n_out > 1 else out[0]
+    if any_bad and invalid == "clip":
+        # Gather the invalid elements' inputs before ``out``, which may be an input, is written
+        rows = np.broadcast_to(bad, shape)
+        tiny = np.finfo(working_dtype(out=out)).tiny
+        clipped = [
+            np.maximum(value, tiny) if domain is _not_positive else value
+            for value, domain in zip(
+                (np.broadcast_to(value, shape)[rows] for value in inputs), domains, strict=True
+            )
+        ]
+    # Invalid elements are converted too, silently, and overwritten below: masking
+    # them out of every ufunc with ``where`` would take the slow masked loops
+    with np.errstate(all="ignore"):
+        result = func(*inputs, out=out, where=where, **kwargs)
+    outs = result if isinstance(result, tuple) else (result,)
+
+    if any_bad and invalid == "clip":
+        # Convert just those elements again, with their inputs moved into the domain
+        with np.errstate(all="ignore"):
+            fixed = func(*clipped, **kwargs)
+        fixed = fixed if isinstance(fixed, tuple) else (fixed,)
+        for array, values in zip(outs, fixed, strict=True):
+            array[rows] = values
+    elif any_bad:
+        for array in outs:
+            np.copyto(array, fill if invalid == "sentinel" else np.nan, where=bad)
+
+    if scalar:
+        outs = tuple(array[()] for array in outs)
+    result = outs if isinstance(result, tuple) else outs[0]
+    return flag_invalid(result, bad, invalid)
+
+
+def flux_to_mag(
+    flux: float | np.ndarray,
+    zeropoint: float,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    approx: float | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> float | np.ndarray:
     """Convert flux to magnitude using the given zeropoint.
 
     Parameters
@@ -34,7 +304,23 @@ def flux_to_mag(flux: float | np.ndarray, zeropoint: float) -> float | np.ndarra
         The flux value(s) to convert.
     zeropoint : float
         The zeropoint for the magnitude system.
-
+    out : np.ndarray, optional
+        A buffer to write the result into. May be ``flux`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    approx : float, optional
+        The largest error, in magnitudes, the result may have. Accepted for
+        symmetry with `mag_to_flux`; the result is always exact.
+    invalid : str, optional
+        How to treat fluxes outside the domain of the logarithm (zero, negative or nan),
+        one of `INVALID_POLICIES`. By default they give a RuntimeWarning and nan or
+        inf, like plain NumPy.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
 
     Returns
     -------
@@ -45,10 +331,41 @@ def flux_to_mag(flux: float | np.ndarray, zeropoint: float) -> float | np.ndarra
     --------
     mag_to_flux : Convert magnitude to flux.
     """
-    return -2.5 * np.log10(flux) + zeropoint
+    if _any_duck(flux, zeropoint):
+        dtype = _lazy_dtype(flux, dtype=dtype)
+        mag = np.multiply(np.log10(flux, dtype=dtype), -2.5)
+        mag = np.add(mag, _lazy_constant(zeropoint, dtype))
+        return _lazy_finish(mag, (flux,), (_not_positive,), out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            flux_to_mag,
+            (flux, zeropoint),
+            (_not_positive, None),
+            out,
+            where,
+            invalid,
+            fill,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(flux) == 0:
+        flux, zeropoint = _scalars(dtype, flux, zeropoint)
+        return -2.5 * np.log10(flux) + zeropoint
+    dtype = working_dtype(flux, out=out, dtype=dtype)
+    out = np.log10(flux, out=out, where=where, dtype=dtype)
+    np.multiply(out, -2.5, out=out, where=where)
+    return np.add(out, _cast(zeropoint, dtype), out=out, where=where)
 
 
-def mag_to_flux(mag: float | np.ndarray, zeropoint: float) -> float | np.ndarray:
+def mag_to_flux(
+    mag: float | np.ndarray,
+    zeropoint: float,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    approx: float | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> float | np.ndarray:
     """Convert magnitude to flux using the given zeropoint.
 
     Parameters
@@ -57,6 +374,25 @@ def mag_to_flux(mag: float | np.ndarray, zeropoint: float) -> float | np.ndarray
         The magnitude value(s) to convert.
     zeropoint : float
         The zeropoint for the magnitude system.
+    out : np.ndarray, optional
+        A buffer to write the result into. May be ``mag`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    approx : float, optional
+        The largest error, in magnitudes, the result may have (a relative flux
+        error of ``approx / 1.0857``). If it is at least
+        ``approx_exp2_error(dtype)`` (2e-13 for float64), ``10 ** x`` is
+        evaluated as the much faster ``exp2(x * log2(10))``. Scalars are
+        always exact.
+    invalid : str, optional
+        How to treat nan magnitudes, one of `INVALID_POLICIES`. By default they simply
+        propagate as nan.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
 
     Returns
     -------
@@ -67,16 +403,63 @@ def mag_to_flux(mag: float | np.ndarray, zeropoint: float) -> float | np.ndarray
     --------
     flux_to_mag : Convert flux to magnitude.
     """
-    return 10 ** ((zeropoint - mag) / 2.5)
+    if _any_duck(mag, zeropoint):
+        dtype = _lazy_dtype(mag, dtype=dtype)
+        flux = np.subtract(_lazy_constant(zeropoint, dtype), mag, dtype=dtype)
+        flux = np.power(10.0, np.divide(flux, 2.5))
+        return _lazy_finish(flux, (mag,), (np.isnan,), out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            mag_to_flux,
+            (mag, zeropoint),
+            (np.isnan, None),
+            out,
+            where,
+            invalid,
+            fill,
+            dtype=dtype,
+            approx=approx,
+        )
+    if out is None and np.ndim(mag) == 0:
+        mag, zeropoint = _scalars(dtype, mag, zeropoint)
+        return 10 ** ((zeropoint - mag) / 2.5)
+    # Integer magnitudes must not make the first step an integer subtraction
+    dtype = working_dtype(mag, out=out, dtype=dtype)
+    out = np.subtract(_cast(zeropoint, dtype), mag, out=out, where=where, dtype=dtype)
+    if approx is not None and approx >= approx_exp2_error(dtype):
+        np.multiply(out, _LOG2_10 / 2.5, out=out, where=where)
+        return np.exp2(out, out=out, where=where)
+    np.divide(out, 2.5, out=out, where=where)
+    return np.power(10.0, out, out=out, where=where)
 
 
-def distance_modulus_to_distance(distmod: float | np.ndarray) -> float | np.ndarray:
+def distance_modulus_to_distance(
+    distmod: float | np.ndarray,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> float | np.ndarray:
     """Convert distance modulus to distance in parsecs.
 
     Parameters
     ----------
     distmod : float or np.ndarray
         The distance modulus value(s) to convert.
+    out : np.ndarray, optional
+        A buffer to write the result into. May be ``distmod`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    invalid : str, optional
+        How to treat nan distance moduli, one of `INVALID_POLICIES`. By default they
+        simply propagate as nan.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
 
     Returns
     -------
@@ -87,16 +470,58 @@ def distance_modulus_to_distance(distmod: float | np.ndarray) -> float | np.ndar
     --------
     distance_to_distance_modulus : Convert distance in parsecs to distance modulus.
     """
-    return 10 ** ((distmod + 5) / 5)
+    if _any_duck(distmod):
+        dtype = _lazy_dtype(distmod, dtype=dtype)
+        distance = np.power(10.0, np.divide(np.add(distmod, 5.0, dtype=dtype), 5.0))
+        return _lazy_finish(distance, (distmod,), (np.isnan,), out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            distance_modulus_to_distance,
+            (distmod,),
+            (np.isnan,),
+            out,
+            where,
+            invalid,
+            fill,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(distmod) == 0:
+        (distmod,) = _scalars(dtype, distmod)
+        return 10 ** ((distmod + 5) / 5)
+    dtype = working_dtype(distmod, out=out, dtype=dtype)
+    out = np.add(distmod, 5.0, out=out, where=where, dtype=dtype)
+    np.divide(out, 5.0, out=out, where=where)
+    return np.power(10.0, out, out=out, where=where)
 
 
-def distance_to_distance_modulus(distance: float | np.ndarray) -> float | np.ndarray:
+def distance_to_distance_modulus(
+    distance: float | np.ndarray,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> float | np.ndarray:
     """Convert distance in parsecs to distance modulus.
 
     Parameters
     ----------
     distance : float or np.ndarray
         The distance value(s) in parsecs to convert.
+    out : np.ndarray, optional
+        A buffer to write the result into. May be ``distance`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    invalid : str, optional
+        How to treat distances outside the domain of the logarithm (zero, negative or
+        nan), one of `INVALID_POLICIES`. By default they give a RuntimeWarning and nan
+        or -inf, like plain NumPy.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
 
     Returns
     -------
@@ -107,4 +532,423 @@ def distance_to_distance_modulus(distance: float | np.ndarray) -> float | np.nda
     --------
     distance_modulus_to_distance : Convert distance modulus to distance in parsecs.
     """
-    return 5 * np.log10(distance) - 5
+    if _any_duck(distance):
+        dtype = _lazy_dtype(distance, dtype=dtype)
+        distmod = np.subtract(np.multiply(np.log10(distance, dtype=dtype), 5.0), 5.0)
+        return _lazy_finish(distmod, (distance,), (_not_positive,), out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            distance_to_distance_modulus,
+            (distance,),
+            (_not_positive,),
+            out,
+            where,
+            invalid,
+            fill,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(distance) == 0:
+        (distance,) = _scalars(dtype, distance)
+        return 5 * np.log10(distance) - 5
+    dtype = working_dtype(distance, out=out, dtype=dtype)
+    out = np.log10(distance, out=out, where=where, dtype=dtype)
+    np.multiply(out, 5.0, out=out, where=where)
+    return np.subtract(out, 5.0, out=out, where=where)
+
+
+def _flux_times_distance_squared(flux, distance, out, where, dtype) -> None:
+    """Write ``flux * distance**2`` into ``out``, which may be ``flux`` or ``distance``."""
+    if np.may_share_memory(out, flux):
+        # ``flux`` is read in the first step, before ``out`` overwrites it
+        np.multiply(flux, distance, out=out, where=where, dtype=dtype)
+        np.multiply(out, distance, out=out, where=where, dtype=dtype)
+    else:
+        np.multiply(distance, distance, out=out, where=where, dtype=dtype)
+        np.multiply(out, flux, out=out, where=where, dtype=dtype)
+
+
+def absolute_magnitude(
+    flux: float | np.ndarray,
+    distance: float | np.ndarray,
+    zeropoint: float,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> float | np.ndarray:
+    """Convert flux and distance in parsecs to absolute magnitude in one pass.
+
+    This is ``flux_to_mag(flux, zeropoint) - distance_to_distance_modulus(distance)``
+    folded into a single logarithm, ``zeropoint + 5 - 2.5 * log10(flux * distance**2)``,
+    so each element of the inputs is read once and no temporaries are created.
+
+    Parameters
+    ----------
+    flux : float or np.ndarray
+        The flux value(s) to convert.
+    distance : float or np.ndarray
+        The distance value(s) in parsecs, broadcastable against ``flux``.
+    zeropoint : float
+        The zeropoint for the magnitude system.
+    out : np.ndarray, optional
+        A buffer to write the result into. May be ``flux`` or ``distance`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    invalid : str, optional
+        How to treat fluxes or distances that are zero, negative or nan, one of
+        `INVALID_POLICIES`. By default they give a RuntimeWarning and nan or inf, like
+        plain NumPy.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
+
+    Returns
+    -------
+    float or np.ndarray
+        The corresponding absolute magnitude value(s).
+
+    See Also
+    --------
+    luminosity : Convert flux and distance to luminosity.
+    """
+    if _any_duck(flux, distance, zeropoint):
+        dtype = _lazy_dtype(flux, distance, dtype=dtype)
+        mag = np.multiply(np.multiply(distance, distance, dtype=dtype), flux, dtype=dtype)
+        mag = np.multiply(np.log10(mag), -2.5)
+        mag = np.add(mag, _lazy_constant(np.add(zeropoint, 5.0), dtype))
+        domains = (_not_positive, _not_positive)
+        return _lazy_finish(mag, (flux, distance), domains, out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            absolute_magnitude,
+            (flux, distance, zeropoint),
+            (_not_positive, _not_positive, None),
+            out,
+            where,
+            invalid,
+            fill,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(flux) == 0 and np.ndim(distance) == 0:
+        flux, distance, zeropoint = _scalars(dtype, flux, distance, zeropoint)
+        return -2.5 * np.log10(flux * distance**2) + zeropoint + 5
+    dtype = working_dtype(flux, distance, out=out, dtype=dtype)
+    if out is None:
+        out = np.empty(np.broadcast_shapes(np.shape(flux), np.shape(distance)), dtype=dtype)
+    _flux_times_distance_squared(flux, distance, out, where, dtype)
+    np.log10(out, out=out, where=where)
+    np.multiply(out, -2.5, out=out, where=where)
+    return np.add(out, _cast(np.add(zeropoint, 5.0), dtype), out=out, where=where)
+
+
+def luminosity(
+    flux: float | np.ndarray,
+    distance: float | np.ndarray,
+    out: np.ndarray | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> float | np.ndarray:
+    """Convert flux and distance in parsecs to luminosity, ``4 * pi * distance**2 * flux``.
+
+    The result is in units of the flux times square parsecs; multiply by
+    ``PARSEC_CM**2`` for square centimetres.
+
+    Parameters
+    ----------
+    flux : float or np.ndarray
+        The flux value(s) to convert.
+    distance : float or np.ndarray
+        The distance value(s) in parsecs, broadcastable against ``flux``.
+    out : np.ndarray, optional
+        A buffer to write the result into. May be ``flux`` or ``distance`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    invalid : str, optional
+        How to treat nan fluxes or distances, one of `INVALID_POLICIES`. By default they
+        simply propagate as nan.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
+
+    Returns
+    -------
+    float or np.ndarray
+        The corresponding luminosity value(s).
+
+    See Also
+    --------
+    absolute_magnitude : Convert flux and distance to absolute magnitude.
+    """
+    if _any_duck(flux, distance):
+        dtype = _lazy_dtype(flux, distance, dtype=dtype)
+        lum = np.multiply(np.multiply(distance, distance, dtype=dtype), flux, dtype=dtype)
+        lum = np.multiply(lum, 4 * np.pi)
+        return _lazy_finish(lum, (flux, distance), (np.isnan, np.isnan), out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            luminosity,
+            (flux, distance),
+            (np.isnan, np.isnan),
+            out,
+            where,
+            invalid,
+            fill,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(flux) == 0 and np.ndim(distance) == 0:
+        flux, distance = _scalars(dtype, flux, distance)
+        return 4 * np.pi * distance**2 * flux
+    dtype = working_dtype(flux, distance, out=out, dtype=dtype)
+    if out is None:
+        out = np.empty(np.broadcast_shapes(np.shape(flux), np.shape(distance)), dtype=dtype)
+    _flux_times_distance_squared(flux, distance, out, where, dtype)
+    return np.multiply(out, 4 * np.pi, out=out, where=where)
+
+
+def _error_buffers(value, error, out, dtype):
+    """Allocate the ``(value, error)`` output pair of an error-propagating conversion."""
+    if out is not None:
+        return out
+    shape = np.broadcast_shapes(np.shape(value), np.shape(error))
+    return np.empty(shape, dtype=dtype), np.empty(shape, dtype=dtype)
+
+
+def flux_to_mag_with_error(
+    flux: float | np.ndarray,
+    flux_err: float | np.ndarray,
+    zeropoint: float,
+    out: tuple[np.ndarray, np.ndarray] | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> tuple[float | np.ndarray, float | np.ndarray]:
+    """Convert flux and its uncertainty to magnitude and its uncertainty.
+
+    The magnitude error is the first-order propagation
+    ``2.5 / ln(10) * |flux_err / flux|``, about ``1.0857 * flux_err / flux``.
+
+    Parameters
+    ----------
+    flux : float or np.ndarray
+        The flux value(s) to convert.
+    flux_err : float or np.ndarray
+        The 1-sigma flux uncertainties, broadcastable against ``flux``.
+    zeropoint : float
+        The zeropoint for the magnitude system.
+    out : tuple of np.ndarray, optional
+        Buffers ``(mag, mag_err)`` to write the results into. ``mag_err`` may be
+        ``flux_err`` itself; ``mag`` may be ``flux`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    invalid : str, optional
+        How to treat fluxes that are zero, negative or nan, or nan errors, one of
+        `INVALID_POLICIES`. By default they give a RuntimeWarning and nan or inf, like
+        plain NumPy.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
+
+    Returns
+    -------
+    tuple
+        The magnitude value(s) and their uncertainties.
+
+    See Also
+    --------
+    mag_to_flux_with_error : Convert magnitude and its uncertainty to flux.
+    """
+    if _any_duck(flux, flux_err, zeropoint):
+        dtype = _lazy_dtype(flux, flux_err, dtype=dtype)
+        mag_err = np.abs(np.divide(flux_err, flux, dtype=dtype))
+        mag_err = np.multiply(mag_err, MAG_ERROR_FACTOR)
+        result = flux_to_mag(flux, zeropoint, dtype=dtype), mag_err
+        domains = (_not_positive, np.isnan)
+        return _lazy_finish(result, (flux, flux_err), domains, out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            flux_to_mag_with_error,
+            (flux, flux_err, zeropoint),
+            (_not_positive, np.isnan, None),
+            out,
+            where,
+            invalid,
+            fill,
+            n_out=2,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(flux) == 0 and np.ndim(flux_err) == 0:
+        flux, flux_err, zeropoint = _scalars(dtype, flux, flux_err, zeropoint)
+        mag_err = MAG_ERROR_FACTOR * np.abs(np.divide(flux_err, flux))
+        return flux_to_mag(flux, zeropoint), mag_err
+    dtype = working_dtype(flux, flux_err, out=out, dtype=dtype)
+    mag, mag_err = _error_buffers(flux, flux_err, out, dtype)
+    # The error needs the untouched flux, so it goes first in case mag is flux
+    np.divide(flux_err, flux, out=mag_err, where=where, dtype=dtype)
+    np.abs(mag_err, out=mag_err, where=where)
+    np.multiply(mag_err, MAG_ERROR_FACTOR, out=mag_err, where=where)
+    flux_to_mag(flux, zeropoint, out=mag, where=where)
+    return mag, mag_err
+
+
+def mag_to_flux_with_error(
+    mag: float | np.ndarray,
+    mag_err: float | np.ndarray,
+    zeropoint: float,
+    out: tuple[np.ndarray, np.ndarray] | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> tuple[float | np.ndarray, float | np.ndarray]:
+    """Convert magnitude and its uncertainty to flux and its uncertainty.
+
+    The flux error is the first-order propagation ``flux * mag_err / 1.0857``;
+    it reuses the flux just computed rather than evaluating the power twice.
+
+    Parameters
+    ----------
+    mag : float or np.ndarray
+        The magnitude value(s) to convert.
+    mag_err : float or np.ndarray
+        The 1-sigma magnitude uncertainties, broadcastable against ``mag``.
+    zeropoint : float
+        The zeropoint for the magnitude system.
+    out : tuple of np.ndarray, optional
+        Buffers ``(flux, flux_err)`` to write the results into. ``flux`` may be
+        ``mag`` itself; ``flux_err`` may be ``mag_err`` itself.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    invalid : str, optional
+        How to treat nan magnitudes or errors, one of `INVALID_POLICIES`. By default
+        they simply propagate as nan.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
+
+    Returns
+    -------
+    tuple
+        The flux value(s) and their uncertainties.
+
+    See Also
+    --------
+    flux_to_mag_with_error : Convert flux and its uncertainty to magnitude.
+    """
+    if _any_duck(mag, mag_err, zeropoint):
+        dtype = _lazy_dtype(mag, mag_err, dtype=dtype)
+        flux = mag_to_flux(mag, zeropoint, dtype=dtype)
+        flux_err = np.multiply(np.divide(mag_err, MAG_ERROR_FACTOR, dtype=dtype), flux)
+        domains = (np.isnan, np.isnan)
+        return _lazy_finish((flux, flux_err), (mag, mag_err), domains, out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            mag_to_flux_with_error,
+            (mag, mag_err, zeropoint),
+            (np.isnan, np.isnan, None),
+            out,
+            where,
+            invalid,
+            fill,
+            n_out=2,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(mag) == 0 and np.ndim(mag_err) == 0:
+        mag, mag_err, zeropoint = _scalars(dtype, mag, mag_err, zeropoint)
+        flux = mag_to_flux(mag, zeropoint)
+        return flux, flux * mag_err / MAG_ERROR_FACTOR
+    dtype = working_dtype(mag, mag_err, out=out, dtype=dtype)
+    flux, flux_err = _error_buffers(mag, mag_err, out, dtype)
+    mag_to_flux(mag, zeropoint, out=flux, where=where)
+    np.divide(mag_err, MAG_ERROR_FACTOR, out=flux_err, where=where, dtype=dtype)
+    np.multiply(flux_err, flux, out=flux_err, where=where)
+    return flux, flux_err
+
+
+def distance_to_distance_modulus_with_error(
+    distance: float | np.ndarray,
+    distance_err: float | np.ndarray,
+    out: tuple[np.ndarray, np.ndarray] | None = None,
+    where: bool | np.ndarray = True,
+    dtype: np.dtype | str | None = None,
+    invalid: str | None = None,
+    fill: float = np.nan,
+) -> tuple[float | np.ndarray, float | np.ndarray]:
+    """Convert distance in parsecs and its uncertainty to distance modulus and its uncertainty.
+
+    The distance modulus error is the first-order propagation
+    ``5 / ln(10) * |distance_err / distance|``.
+
+    Parameters
+    ----------
+    distance : float or np.ndarray
+        The distance value(s) in parsecs to convert.
+    distance_err : float or np.ndarray
+        The 1-sigma distance uncertainties, broadcastable against ``distance``.
+    out : tuple of np.ndarray, optional
+        Buffers ``(distmod, distmod_err)`` to write the results into. They may
+        be ``distance`` and ``distance_err`` themselves.
+    where : bool or np.ndarray, optional
+        Only convert elements where this is True; the others are left
+        untouched in ``out`` (uninitialized if ``out`` is not given).
+    dtype : dtype, optional
+        The floating type to compute in when ``out`` is not given. By default
+        the type of the input arrays, see `working_dtype`.
+    invalid : str, optional
+        How to treat distances that are zero, negative or nan, or nan errors, one of
+        `INVALID_POLICIES`. By default they give a RuntimeWarning and nan or inf, like
+        plain NumPy.
+    fill : float
+        The value of invalid elements under ``invalid="sentinel"``.
+
+    Returns
+    -------
+    tuple
+        The distance modulus value(s) and their uncertainties.
+    """
+    if _any_duck(distance, distance_err):
+        dtype = _lazy_dtype(distance, distance_err, dtype=dtype)
+        distmod_err = np.abs(np.divide(distance_err, distance, dtype=dtype))
+        distmod_err = np.multiply(distmod_err, DISTMOD_ERROR_FACTOR)
+        result = distance_to_distance_modulus(distance, dtype=dtype), distmod_err
+        domains = (_not_positive, np.isnan)
+        return _lazy_finish(result, (distance, distance_err), domains, out, where, invalid, fill)
+    if invalid is not None:
+        return _with_invalid(
+            distance_to_distance_modulus_with_error,
+            (distance, distance_err),
+            (_not_positive, np.isnan),
+            out,
+            where,
+            invalid,
+            fill,
+            n_out=2,
+            dtype=dtype,
+        )
+    if out is None and np.ndim(distance) == 0 and np.ndim(distance_err) == 0:
+        distance, distance_err = _scalars(dtype, distance, distance_err)
+        distmod = distance_to_distance_modulus(distance)
+        return distmod, DISTMOD_ERROR_FACTOR * np.abs(np.divide(distance_err, distance))
+    dtype = working_dtype(distance, distance_err, out=out, dtype=dtype)
+    distmod, distmod_err = _error_buffers(distance, distance_err, out, dtype)
+    # The error needs the untouched distance, so it goes first in case distmod is distance
+    np.divide(distance_err, distance, out=distmod_err, where=where, dtype=dtype)
+    np.abs(distmod_err, out=distmod_err, where=where)
+    np.multiply(distmod_err, DISTMOD_ERROR_FACTOR, out=distmod_err, where=where)
+    distance_to_distance_modulus(distance, out=distmod, where=where)
+    return distmod, distmod_err
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from candiamazing.aggregate import Histogram, RunningStats, StreamingSummary, summarise
+from candiamazing.core import BrightnessConverter
+from candiamazing.utils import flux_to_mag
+
+
+@pytest.fixture
+def fluxes():
+    rng = np.random.default_rng(3)
+    return rng.lognormal(mean=5.0, sigma=1.0, size=20_000)
+
+
+def test_summary_matches_numpy(fluxes):
+    """Streaming the chunks gives the statistics of the whole converted array."""
+    mags = flux_to_mag(fluxes, 25.0)
+    converter = BrightnessConverter(zeropoint=25.0)
+
+    summary = converter.summarise(
+        "flux_to_mag", np.array_split(fluxes, 7), bins=200, range=(10, 30)
+    )
+
+    assert summary.stats.count == fluxes.size
+    assert summary.stats.mean == pytest.approx(mags.mean())
+    assert summary.stats.std() == pytest.approx(mags.std(ddof=1))
+    assert (summary.stats.min, summary.stats.max) == (mags.min(), mags.max())
+    np.testing.assert_array_equal(summary.histogram.counts, np.histogram(mags, 200, (10, 30))[0])
+    width = 20 / 200
+    np.testing.assert_allclose(
+        summary.quantile([0.1, 0.5, 0.9]), np.quantile(mags, [0.1, 0.5, 0.9]), atol=width
+    )
+
+
+def test_partial_summaries_merge(fluxes):
+    """Summaries of parts merge into the summary of the whole, on any backend."""
+    mags = flux_to_mag(fluxes, 25.0)
+    whole = StreamingSummary(50, (15.0, 25.0)).update(mags)
+    first = StreamingSummary(50, (15.0, 25.0)).update(mags[:123])
+    second = StreamingSummary(50, (15.0, 25.0)).update(mags[123:])
+    merged = first.merge(second)
+
+    assert merged.stats.mean == pytest.approx(whole.stats.mean)
+    assert merged.stats.variance() == pytest.approx(whole.stats.variance())
+    np.testing.assert_array_equal(merged.histogram.counts, whole.histogram.counts)
+    assert (merged.histogram.underflow, merged.histogram.overflow) == (
+        whole.histogram.underflow,
+        whole.histogram.overflow,
+    )
+
+    converter = BrightnessConverter(zeropoint=25.0)
+    chunks = (chunk for chunk in np.array_split(fluxes, 20))
+    threaded = summarise(converter.flux_to_mag, chunks, 50, (15.0, 25.0), backend="threads")
+    np.testing.assert_array_equal(threaded.histogram.counts, whole.histogram.counts)
+    assert threaded.stats.mean == pytest.approx(whole.stats.mean)
+
+
+def test_invalid_and_out_of_range_values():
+    """Non-finite values are counted, and quantiles outside the range are nan."""
+    stats = RunningStats().update(np.array([1.0, np.nan, np.inf, 3.0]))
+    assert (stats.count, stats.n_invalid, stats.mean) == (2, 2, 2.0)
+
+    histogram = Histogram(4, (0.0, 4.0)).update(np.array([-1.0, 0.5, 1.5, 4.0, 9.0]))
+    assert histogram.counts.tolist() == [1, 1, 0, 1]
+    assert (histogram.underflow, histogram.overflow, histogram.total) == (1, 1, 5)
+    assert np.isnan(histogram.quantile(0.05))
+    with pytest.raises(ValueError):
+        histogram.merge(Histogram(4, (0.0, 5.0)))
+    with pytest.raises(ValueError):
+        StreamingSummary(bins=10)
+
+
+@pytest.mark.parametrize("invalid", ["nan", "mask", "bitmask"])
+def test_summarise_under_flagging_policies(invalid):
+    """Flagged results are summarised like nan ones, whatever the invalid policy."""
+    chunks = [np.array([1.0, 0.0, 100.0]), np.array([-5.0, 10.0])]
+    converter = BrightnessConverter(zeropoint=25.0, invalid=invalid)
+
+    summary = converter.summarise("flux_to_mag", chunks, bins=5, range=(20.0, 25.0))
+    assert (summary.stats.count, summary.stats.n_invalid) == (3, 2)
+    assert summary.stats.mean == pytest.approx(22.5)
+    assert summary.histogram.total == 3
+
+    errors = [np.full(3, 0.1), np.full(2, 0.1)]
+    pairs = zip(chunks, errors, strict=True)
+    summary = summarise(lambda pair: converter.flux_to_mag_with_error(*pair), pairs)
+    assert (summary.stats.count, summary.stats.n_invalid) == (3, 2)
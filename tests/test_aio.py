@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from candiamazing.aio import convert_packets
+from candiamazing.core import BrightnessConverter
+from candiamazing.utils import flux_to_mag
+
+
+async def _produce(packets, delay=0.0):
+    for packet in packets:
+        await asyncio.sleep(delay)
+        yield packet
+
+
+async def _collect(stream):
+    return [result async for result in stream]
+
+
+def test_aconvert_keeps_packet_order_and_shape():
+    """Batched and offloaded packets come back one result per packet, in order."""
+    rng = np.random.default_rng(2)
+    packets = [rng.uniform(1, 1e4, size) for size in (1, 7, 5000, 3, 20_000, 2)]
+    packets.append(rng.uniform(1, 1e4, (4, 5)))
+    converter = BrightnessConverter(zeropoint=25.0)
+
+    with ThreadPoolExecutor(2) as executor:
+        stream = converter.aconvert(
+            "flux_to_mag",
+            _produce(packets),
+            batch_size=8000,
+            offload_threshold=1000,
+            executor=executor,
+        )
+        results = asyncio.run(_collect(stream))
+
+    assert len(results) == len(packets)
+    for packet, result in zip(packets, results, strict=True):
+        assert result.shape == packet.shape
+        np.testing.assert_allclose(result, flux_to_mag(packet, 25.0))
+
+
+def test_backpressure_bounds_the_read_ahead():
+    """The producer is never more than the queue plus the batches in flight ahead."""
+    produced = []
+
+    async def producer():
+        for index in range(50):
+            produced.append(index)
+            yield np.full(10, 100.0)
+
+    async def consume():
+        lags = []
+        async for _ in convert_packets(
+            lambda x: x, producer(), batch_size=10, max_pending=2, max_queued=3
+        ):
+            lags.append(len(produced))
+            await asyncio.sleep(0)
+        return lags
+
+    lags = asyncio.run(consume())
+    assert len(lags) == 50
+    # Packets produced ahead of the one being yielded: queue + batches + one being put
+    assert max(lag - index for index, lag in enumerate(lags, 1)) <= 3 + 2 + 1
+
+
+def test_errors_propagate_after_earlier_results():
+    """A failing producer raises in the consumer once earlier packets are out."""
+
+    async def failing():
+        yield np.ones(3)
+        raise RuntimeError("broker went away")
+
+    async def consume():
+        results = []
+        with pytest.raises(RuntimeError, match="broker"):
+            async for result in convert_packets(np.negative, failing()):
+                results.append(result)
+        return results
+
+    results = asyncio.run(consume())
+    np.testing.assert_array_equal(results[0], -np.ones(3))
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from candiamazing import bench
+from candiamazing.cli import main
+
+
+def test_run_benchmarks_report():
+    """A tiny run produces a JSON-serialisable report with cold and warm records."""
+    report = bench.run_benchmarks(sizes=[bench.SCALAR, 10], dtypes=["float32"], repeat=1, cli=False)
+
+    json.dumps(report, allow_nan=False)
+    assert report["meta"]["numpy"]
+    names = {record["name"] for record in report["results"]}
+    assert "utils.flux_to_mag" in names
+    assert "DistanceConverter.distance_to_distmod" in names
+    scalars = {
+        record["size"] for record in report["results"] if record["name"] == "scalar.flux_to_mag"
+    }
+    assert scalars == {bench.SCALAR}
+    assert {record["mode"] for record in report["results"]} == {"cold", "warm"}
+    assert all(record["seconds"] > 0 for record in report["results"])
+
+
+def test_unmeasurably_fast_records_stay_strict_json():
+    """A time below the timer's resolution is clamped, so throughput is never infinite."""
+    record = bench._result("utils.flux_to_mag", 10, "float64", "warm", 0.0)
+
+    assert record["seconds"] == bench.RESOLUTION > 0
+    assert json.loads(json.dumps(record, allow_nan=False)) == record
+
+
+def test_compare_flags_regressions():
+    """Only records that slowed down beyond the tolerance are reported."""
+    baseline = {
+        "results": [
+            {"name": "a", "size": 10, "dtype": "float64", "mode": "warm", "seconds": 1.0},
+            {"name": "b", "size": 10, "dtype": "float64", "mode": "warm", "seconds": 1.0},
+        ]
+    }
+    report = {
+        "results": [
+            {"name": "a", "size": 10, "dtype": "float64", "mode": "warm", "seconds": 1.1},
+            {"name": "b", "size": 10, "dtype": "float64", "mode": "warm", "seconds": 2.0},
+            {"name": "c", "size": 10, "dtype": "float64", "mode": "warm", "seconds": 9.0},
+        ]
+    }
+
+    regressions = bench.compare(report, baseline, tolerance=0.25)
+
+    assert [reg["name"] for reg in regressions] == ["b"]
+    assert regressions[0]["ratio"] == pytest.approx(2.0)
+
+
+def test_cli_bench(tmp_path, capsys):
+    """The 'bench' subcommand writes a report that it can then use as a baseline."""
+    output = tmp_path / "bench.json"
+    args = ["bench", "--sizes", "scalar", "--repeat", "1", "--no-cli"]
+
+    assert main([*args, "--output", str(output)]) == 0
+    assert bench.load_report(output)["results"]
+
+    # Nothing can be 1000x slower than itself, so comparing against itself passes
+    assert main([*args, "--baseline", str(output), "--tolerance", "1000"]) == 0
+
+
+@pytest.mark.skipif(
+    "CANDIAMAZING_BENCH_BASELINE" not in os.environ,
+    reason="set CANDIAMAZING_BENCH_BASELINE to a stored report to check for regressions",
+)
+def test_no_regressions_against_baseline():
+    """Run the full suite and compare it against the stored baseline report."""
+    baseline = bench.load_report(os.environ["CANDIAMAZING_BENCH_BASELINE"])
+
+    regressions = bench.compare(bench.run_benchmarks(), baseline)
+
+    assert not regressions, "\n".join(map(str, regressions))
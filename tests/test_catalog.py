@@ -0,0 +1,94 @@
+import io
+
+import numpy as np
+import pytest
+
+from candiamazing.catalog import column, convert_array, convert_stream, iter_column_chunks
+
+
+def test_iter_column_chunks_bounded():
+    """Chunks never hold more than `chunksize` rows, and together cover the column."""
+    stream = io.StringIO("a,b\n" + "".join(f"{i},{2 * i}\n" for i in range(10)))
+
+    chunks = list(iter_column_chunks(stream, column="b", chunksize=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert np.concatenate(chunks) == pytest.approx(2.0 * np.arange(10))
+
+
+def test_iter_column_chunks_missing_column():
+    """Asking for a column that is not in the header is an error."""
+    stream = io.StringIO("a,b\n1,2\n")
+
+    with pytest.raises(KeyError):
+        list(iter_column_chunks(stream, column="flux"))
+
+
+@pytest.mark.parametrize(
+    ("text", "reason"),
+    [
+        ("id,flux\n1,2\n2,3\n3,x\n4,5\n", "could not convert string 'x'"),
+        ("id,flux\n1,2\n2,3\n3\n4,5\n", "invalid column index 1"),
+    ],
+)
+def test_iter_column_chunks_bad_row(text, reason):
+    """A non-numeric or ragged row is a ValueError naming its line in the stream."""
+    with pytest.raises(ValueError, match=f"^line 4: {reason}"):
+        list(iter_column_chunks(io.StringIO(text), column="flux", chunksize=2))
+
+
+def test_convert_stream_headerless():
+    """Without a column name the input is a bare column and no header is written."""
+    instream = io.StringIO("1.0\n2.0\n3.0\n")
+    outstream = io.StringIO()
+
+    count = convert_stream(lambda x: 2 * x, instream, outstream, chunksize=2)
+
+    assert count == 3
+    assert outstream.getvalue() == "2.0\n4.0\n6.0\n"
+
+
+def test_convert_array_raw(tmp_path):
+    """Raw little-endian dumps are converted block by block into a raw output file."""
+    input_file = tmp_path / "values.f8"
+    output_file = tmp_path / "doubled.f8"
+    np.arange(10, dtype="<f8").tofile(input_file)
+
+    count = convert_array(lambda x: 2 * x, input_file, output_file, blocksize=3)
+
+    assert count == 10
+    assert np.fromfile(output_file, dtype="<f8") == pytest.approx(2.0 * np.arange(10))
+
+
+@pytest.mark.parametrize("pass_out", [False, True])
+def test_convert_array_fortran_order(tmp_path, pass_out):
+    """Fortran-ordered arrays are converted through views, into a Fortran-ordered output."""
+    input_file = tmp_path / "values.npy"
+    output_file = tmp_path / "doubled.npy"
+    values = np.asfortranarray(np.arange(12.0).reshape(3, 4))
+    np.save(input_file, values)
+
+    if pass_out:
+        count = convert_array(
+            lambda x, out: np.multiply(x, 2, out=out), input_file, output_file, 5, pass_out=True
+        )
+    else:
+        count = convert_array(lambda x: 2 * x, input_file, output_file, blocksize=5)
+
+    assert count == 12
+    result = np.load(output_file)
+    assert result.flags.f_contiguous and not result.flags.c_contiguous
+    np.testing.assert_array_equal(result, 2 * values)
+
+
+def test_column_is_a_view():
+    """Field views share memory with the structured array, so writes land in the table."""
+    table = np.zeros(4, dtype=[("a", "f8"), ("b", "f4")])
+
+    view = column(table, "b")
+    view[:] = 2.0
+
+    assert np.shares_memory(view, table)
+    np.testing.assert_array_equal(table["b"], 2.0)
+    with pytest.raises(TypeError):
+        column(np.zeros(4), "a")
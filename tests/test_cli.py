@@ -1,3 +1,8 @@
+import io
+import subprocess
+import sys
+
+import numpy as np
 import pytest
 
 from candiamazing.cli import main
@@ -60,3 +65,148 @@ def test_cli_help(monkeypatch, capsys):
 
     captured = capsys.readouterr()
     assert "Available commands" in captured.out
+
+
+def test_cli_batch_mode(tmp_path, capsys):
+    """
+    Test that batch mode converts a whole catalog column and writes one value per row.
+    """
+    catalog_file = tmp_path / "catalog.csv"
+    catalog_file.write_text("id,flux\n1,100.0\n2,1000.0\n3,10.0\n")
+    output_file = tmp_path / "mags.csv"
+
+    # A tiny chunksize forces the catalog through several chunks
+    exit_code = main(
+        [
+            "flux_to_mag",
+            "--input",
+            str(catalog_file),
+            "--column",
+            "flux",
+            "--output",
+            str(output_file),
+            "--chunksize",
+            "2",
+            "25.0",
+        ]
+    )
+
+    assert exit_code == 0
+    lines = output_file.read_text().splitlines()
+    assert lines[0] == "mag"
+    assert [float(line) for line in lines[1:]] == pytest.approx([20.0, 17.5, 22.5])
+
+
+@pytest.mark.parametrize("command", ["flux_to_mag", "mag_to_flux", "convert_files"])
+def test_cli_unknown_column(tmp_path, command):
+    """
+    Test that an unknown '--column' exits with an error message rather than a traceback.
+    """
+    catalog_file = tmp_path / "catalog.csv"
+    catalog_file.write_text("id,flux\n1,100.0\n")
+    if command == "convert_files":
+        argv = [command, "flux_to_mag", str(catalog_file), "--output-dir", str(tmp_path / "out")]
+        argv += ["--zeropoint", "25.0", "--column", "fluxx"]
+    else:
+        argv = [command, "--input", str(catalog_file), "--column", "fluxx", "25.0"]
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(argv)
+
+    assert excinfo.value.code == "error: Column 'fluxx' not found in header ['id', 'flux']"
+
+
+def test_cli_bad_row(tmp_path):
+    """
+    Test that a non-numeric row exits with an error naming its line rather than a traceback.
+    """
+    catalog_file = tmp_path / "catalog.csv"
+    catalog_file.write_text("id,flux\n1,100.0\n2,n/a\n")
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(["flux_to_mag", "--input", str(catalog_file), "--column", "flux", "25.0"])
+
+    assert excinfo.value.code.startswith(f"error: {catalog_file}: line 3: could not convert")
+
+
+def test_cli_batch_mode_stdin(monkeypatch, capsys):
+    """
+    Test that '--input -' reads a headerless column from stdin and writes to stdout.
+    """
+    monkeypatch.setattr("sys.stdin", io.StringIO("20.0\n22.5\n"))
+
+    main(["mag_to_flux", "--input", "-", "25.0"])
+
+    captured = capsys.readouterr()
+    assert [float(line) for line in captured.out.split()] == pytest.approx([100.0, 10.0])
+
+
+def test_cli_convert_array(tmp_path):
+    """
+    Test that 'convert_array' converts a .npy file into a new .npy file.
+    """
+    input_file = tmp_path / "distances.npy"
+    output_file = tmp_path / "distmods.npy"
+    np.save(input_file, np.array([10.0, 100.0, 1e6]))
+
+    exit_code = main(
+        [
+            "convert_array",
+            "distance_to_distmod",
+            str(input_file),
+            str(output_file),
+            "--blocksize",
+            "2",
+        ]
+    )
+
+    assert exit_code == 0
+    assert np.load(output_file) == pytest.approx([0.0, 5.0, 25.0])
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["--help"], ["flux_to_mag", "100.0", "25.0"], ["mag_to_flux", "20.0", "25.0"]],
+)
+def test_cli_startup_does_not_import_numpy(argv):
+    """
+    Guard the fast start-up path: help and scalar conversions must not import NumPy.
+    """
+    # A fresh interpreter is needed, since this one has long since imported NumPy
+    code = (
+        "import sys\n"
+        "from candiamazing.cli import main\n"
+        "try:\n"
+        f"    main({argv!r})\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "assert 'numpy' not in sys.modules, 'numpy was imported'\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+
+
+def test_cli_convert_files(tmp_path, capsys):
+    """convert_files converts a glob of catalogs and reports up-to-date files on a rerun."""
+    for index in range(2):
+        (tmp_path / f"field_{index}.csv").write_text("flux\n100.0\n1000.0\n")
+    argv = [
+        "convert_files",
+        "flux_to_mag",
+        str(tmp_path / "*.csv"),
+        "--output-dir",
+        str(tmp_path / "out"),
+        "--zeropoint",
+        "25.0",
+        "--column",
+        "flux",
+    ]
+
+    assert main(argv) == 0
+    assert "converted 2 file(s), 4 values" in capsys.readouterr().out
+    assert (tmp_path / "out" / "field_0.csv").read_text() == "mag\n20.0\n17.5\n"
+
+    assert main(argv) == 0
+    captured = capsys.readouterr()
+    assert "converted 0 file(s)" in captured.out and "up to date" in captured.err
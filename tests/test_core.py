@@ -1,7 +1,11 @@
+import json
+
 import numpy as np
 import pytest
 
-from candiamazing.core import BrightnessConverter, DistanceConverter
+import candiamazing.core as core
+from candiamazing.core import AbsoluteMagnitudeConverter, BrightnessConverter, DistanceConverter
+from candiamazing.utils import flux_to_mag
 
 
 # Fixtures allow you to setup data or objects once and reuse them in multiple tests.
@@ -71,3 +75,324 @@ def test_invalid_input_raises_error(standard_converter):
     # The test passes ONLY if the code inside the 'with' block raises TypeError
     with pytest.raises(TypeError):
         standard_converter.flux_to_mag(bad_input)
+
+
+def test_convert_file(standard_converter, tmp_path):
+    """Ensure a converter method can be applied to a memory-mapped .npy file."""
+    input_file = tmp_path / "fluxes.npy"
+    output_file = tmp_path / "mags.npy"
+    np.save(input_file, np.array([10.0, 100.0, 1000.0]))
+
+    count = standard_converter.convert_file("flux_to_mag", input_file, output_file, blocksize=2)
+
+    assert count == 3
+    assert np.load(output_file) == pytest.approx([22.5, 20.0, 17.5])
+
+    # Only conversion methods may be named
+    with pytest.raises(ValueError):
+        standard_converter.convert_file("convert_file", input_file, output_file)
+
+
+@pytest.mark.parametrize("backend", ["serial", "threads"])
+def test_execution_backend_inherited(backend):
+    """Subclasses accept the execution options of BaseConverter."""
+    distances = np.logspace(1, 7, 50_000)
+    with DistanceConverter(backend=backend, n_workers=2, chunksize=4096) as dist_tool:
+        distmods = dist_tool.distance_to_distmod(distances)
+
+    assert distmods == pytest.approx(5 * np.log10(distances) - 5)
+
+
+def test_scalar_fast_path(standard_converter):
+    """Python scalars are converted without NumPy and come back as plain floats."""
+    mag = standard_converter.flux_to_mag(100.0)
+    assert type(mag) is float
+    assert mag == pytest.approx(float(standard_converter.flux_to_mag(np.float64(100.0))))
+    assert type(standard_converter.mag_to_flux(20)) is float
+
+    dist_tool = DistanceConverter()
+    assert type(dist_tool.distmod_to_distance(5.0)) is float
+    assert dist_tool.distance_to_distmod(1e6) == pytest.approx(25.0)
+
+    # Non-positive fluxes follow NumPy: -inf/nan rather than an exception
+    assert standard_converter.flux_to_mag(0.0) == np.inf
+    assert np.isnan(standard_converter.flux_to_mag(-1.0))
+
+    # Changing the zeropoint is picked up by the fast path
+    standard_converter.zeropoint = 30.0
+    assert standard_converter.flux_to_mag(100.0) == pytest.approx(25.0)
+
+
+def test_scalar_memo():
+    """With memo_size set, repeated scalar inputs are served from the memo."""
+    converter = BrightnessConverter(zeropoint=25.0, memo_size=2)
+    for flux in [100.0, 100.0, 1000.0, 100.0]:
+        converter.flux_to_mag(flux)
+
+    info = converter.memo_info()["flux_to_mag"]
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 2)
+
+    converter.memo_clear()
+    assert converter.memo_info()["flux_to_mag"].currsize == 0
+
+    # Memoisation is off by default
+    assert BrightnessConverter(zeropoint=25.0).memo_info() == {}
+
+
+def test_absolute_magnitude_converter():
+    """The combined converter matches BrightnessConverter minus DistanceConverter."""
+    rng = np.random.default_rng(1)
+    flux = rng.uniform(1.0, 1e4, 10_000)
+    distance = rng.uniform(10.0, 1e8, 10_000)
+    converter = AbsoluteMagnitudeConverter(zeropoint=25.0, chunksize=1024)
+
+    mags = BrightnessConverter(zeropoint=25.0).flux_to_mag(flux)
+    expected = mags - DistanceConverter().distance_to_distmod(distance)
+    assert converter.absolute_magnitude(flux, distance) == pytest.approx(expected)
+    assert converter.luminosity(flux, distance) == pytest.approx(4 * np.pi * distance**2 * flux)
+
+    absmag = converter.absolute_magnitude(100.0, 10.0)
+    assert type(absmag) is float
+    assert absmag == pytest.approx(20.0)
+
+
+def test_converters_with_error():
+    """Value-and-error methods match utils for arrays, chunked or not, and for floats."""
+    converter = BrightnessConverter(zeropoint=25.0, chunksize=100)
+    flux = np.linspace(10.0, 1000.0, 1000)
+    flux_err = np.sqrt(flux)
+
+    mag, mag_err = converter.flux_to_mag_with_error(flux, flux_err)
+    assert mag == pytest.approx(converter.flux_to_mag(flux))
+    assert mag_err == pytest.approx(1.0857362047581294 * flux_err / flux)
+
+    out = (np.empty_like(flux), np.empty_like(flux))
+    result = converter.mag_to_flux_with_error(mag, mag_err, out=out)
+    assert result[0] is out[0] and result[1] is out[1]
+    assert out[0] == pytest.approx(flux)
+    assert out[1] == pytest.approx(flux_err)
+
+    mag, mag_err = converter.flux_to_mag_with_error(100.0, 10.0)
+    assert type(mag) is float and type(mag_err) is float
+    assert (mag, mag_err) == pytest.approx((20.0, 0.10857362047581294))
+
+    distmod, distmod_err = DistanceConverter().distance_to_distmod_with_error(1000.0, 0.0)
+    assert (distmod, distmod_err) == (10.0, 0.0)
+
+
+@pytest.mark.parametrize("policy, expected", [("preserve", np.float32), ("float64", np.float64)])
+def test_dtype_policy(policy, expected):
+    """The converter's precision policy decides the result type, chunked or not."""
+    converter = BrightnessConverter(zeropoint=np.float64(25.0), dtype=policy, chunksize=10)
+    flux = np.full(100, 100.0, dtype=np.float32)
+
+    assert converter.flux_to_mag(flux).dtype == expected
+    assert converter.mag_to_flux(flux[:5]).dtype == expected
+    assert isinstance(converter.flux_to_mag(100.0), float)
+
+    converter = DistanceConverter(dtype="float32")
+    assert converter.distance_to_distmod(np.array([10, 100])).dtype == np.float32
+
+    with pytest.raises(ValueError):
+        DistanceConverter(dtype="float16")
+
+
+def test_brightness_converter_approx():
+    converter = BrightnessConverter(zeropoint=25.0, approx=1e-4, chunksize=100)
+    flux = np.geomspace(1e-3, 1e6, 1000)
+
+    mag = converter.flux_to_mag(flux)
+    np.testing.assert_allclose(mag, flux_to_mag(flux, 25.0), rtol=0, atol=1e-4)
+    np.testing.assert_allclose(converter.mag_to_flux(mag), flux, rtol=1e-4)
+
+    with pytest.raises(ValueError):
+        BrightnessConverter(zeropoint=25.0, approx=0.0)
+
+
+@pytest.mark.filterwarnings("error")
+def test_invalid_policy_converter():
+    """The converter policy applies to chunked arrays, error pairs and plain floats."""
+    flux = np.tile([100.0, 0.0, -1.0, 1000.0], 250)
+    bad = flux <= 0
+
+    masked = BrightnessConverter(zeropoint=25.0, invalid="mask", chunksize=64).flux_to_mag(flux)
+    np.testing.assert_array_equal(masked.mask, bad)
+    np.testing.assert_allclose(masked.compressed(), flux_to_mag(flux[~bad], 25.0))
+
+    converter = BrightnessConverter(zeropoint=25.0, invalid="bitmask", chunksize=64)
+    (mag, mag_err), bits = converter.flux_to_mag_with_error(flux, np.ones_like(flux))
+    np.testing.assert_array_equal(np.unpackbits(bits, count=flux.size), bad)
+    assert np.isnan(mag_err[bad]).all()
+
+    converter = BrightnessConverter(zeropoint=25.0, invalid="raise", chunksize=64)
+    with pytest.raises(ValueError):
+        converter.flux_to_mag(flux)
+    with pytest.raises(ValueError):
+        converter.flux_to_mag(0.0)
+    assert converter.flux_to_mag(100.0) == pytest.approx(20.0)
+
+    assert DistanceConverter(invalid="sentinel", fill=-99.0).distance_to_distmod(0.0) == -99.0
+    with pytest.raises(ValueError):
+        DistanceConverter(invalid="skip")
+
+
+def test_convert_columns_structured_array():
+    """Columns of a structured array are converted in place or into new fields."""
+    table = np.zeros(5, dtype=[("flux", "f8"), ("flux_err", "f8"), ("dist", "f4")])
+    table["flux"] = [1.0, 10.0, 100.0, 1000.0, 3631.0]
+    table["flux_err"] = 0.1 * table["flux"]
+    table["dist"] = [10.0, 100.0, 1e3, 1e4, 1e5]
+    expected = flux_to_mag(table["flux"], 25.0)
+    converter = BrightnessConverter(zeropoint=25.0)
+
+    # Existing fields are written in place, through the field view
+    result = converter.convert_columns("flux_to_mag", table, {"flux": "flux"})
+    assert result is table
+    np.testing.assert_allclose(table["flux"], expected)
+
+    result = DistanceConverter().convert_columns(
+        "distance_to_distmod_with_error", table, {("dist", "flux_err"): ("dm", "dm_err")}
+    )
+    assert result is not table and result.dtype.names[-2:] == ("dm", "dm_err")
+    assert result["dm"].dtype == np.float32
+    np.testing.assert_allclose(result["dm"], [0.0, 5.0, 10.0, 15.0, 20.0], atol=1e-5)
+    np.testing.assert_array_equal(result["flux"], table["flux"])
+
+    with pytest.raises(KeyError):
+        converter.convert_columns("flux_to_mag", table, {"mag": "flux"})
+
+
+def test_convert_columns_mapping():
+    """Mappings of columns are updated in place, replacing read-only outputs."""
+    flux = np.array([1.0, 10.0, 100.0])
+    frozen = np.zeros(3)
+    frozen.flags.writeable = False
+    batch = {"flux": flux, "mag": frozen}
+    converter = BrightnessConverter(zeropoint=25.0)
+
+    result = converter.convert_columns("flux_to_mag", batch, {"flux": "mag"})
+    assert result is batch and batch["mag"] is not frozen
+    np.testing.assert_allclose(batch["mag"], [25.0, 22.5, 20.0])
+
+    # Outputs written earlier can feed later conversions
+    converter.convert_columns("mag_to_flux", batch, {"mag": "back", "back": "back"})
+    np.testing.assert_allclose(batch["back"], converter.mag_to_flux(flux))
+
+
+@pytest.mark.parametrize(
+    "make",
+    [
+        lambda values: np.frombuffer(np.array(values, dtype=float).tobytes()),
+        lambda values: np.array(values, dtype=np.int64),
+        list,
+    ],
+    ids=["read-only", "integer", "list"],
+)
+def test_convert_columns_mapping_in_place(make):
+    """A column that must be replaced can still be converted in place."""
+    batch = {"flux": make([1, 10, 100])}
+    BrightnessConverter(zeropoint=25.0).convert_columns("flux_to_mag", batch, {"flux": "flux"})
+    assert isinstance(batch["flux"], np.ndarray) and batch["flux"].flags.writeable
+    np.testing.assert_allclose(batch["flux"], [25.0, 22.5, 20.0])
+
+
+@pytest.mark.parametrize("dtype", [np.uint16, np.int32, np.uint64])
+def test_integer_fluxes_by_table_lookup(dtype):
+    """Detector counts are looked up in a cached table, with exactly the exact results."""
+    counts = np.random.default_rng(6).integers(1, 60_000, (64, 50)).astype(dtype)
+    converter = BrightnessConverter(zeropoint=27.5, chunksize=1000)
+    exact = BrightnessConverter(zeropoint=27.5, lookup_max=0)
+
+    result = converter.flux_to_mag(counts)
+    assert result.dtype == np.float64 and result.shape == counts.shape
+    np.testing.assert_array_equal(result, exact.flux_to_mag(counts))
+    table = core.magnitude_table(27.5, 1 << 16)
+    assert table.size == 1 << 16 and not table.flags.writeable
+    assert core.magnitude_table(27.5, 100) is table  # Smaller requests reuse the table
+
+    out = np.empty(counts.shape)
+    assert converter.flux_to_mag(counts, out=out) is out
+    np.testing.assert_array_equal(out, result)
+
+
+@pytest.mark.filterwarnings("ignore:.*encountered in log10:RuntimeWarning")
+def test_table_lookup_falls_back_to_exact():
+    """Counts outside the table, masks and float32 results take the exact path."""
+    converter = BrightnessConverter(zeropoint=25.0, lookup_max=1000)
+    exact = BrightnessConverter(zeropoint=25.0, lookup_max=0)
+    for counts in (np.array([0, 10, 100]), np.array([-5, 10]), np.array([10, 1000])):
+        np.testing.assert_array_equal(converter.flux_to_mag(counts), exact.flux_to_mag(counts))
+    where = np.array([True, False, True])
+    out = np.full(3, -1.0)
+    converter.flux_to_mag(np.array([10, 100, 1]), out=out, where=where)
+    np.testing.assert_array_equal(out, [22.5, -1.0, 25.0])
+    assert (
+        BrightnessConverter(zeropoint=25.0, dtype="float32").flux_to_mag(np.array([10, 100])).dtype
+        == np.float32
+    )
+    masked = BrightnessConverter(zeropoint=25.0, invalid="mask").flux_to_mag(np.array([0, 100]))
+    assert masked.mask.tolist() == [True, False]
+    with pytest.raises(ValueError, match="lookup_max"):
+        BrightnessConverter(zeropoint=25.0, lookup_max=-1)
+
+
+def test_magnitude_tables_are_bounded(monkeypatch):
+    """The least recently used tables are dropped once the cache is full."""
+    monkeypatch.setattr(core, "_tables", core.OrderedDict())
+    monkeypatch.setattr(core, "LOOKUP_CACHE_BYTES", 3 * 1024 * 8)
+    for zeropoint in (20.0, 21.0, 22.0):
+        core.magnitude_table(zeropoint, 1024)
+    core.magnitude_table(20.0, 1024)  # Now the most recently used
+    core.magnitude_table(23.0, 1024)
+    assert list(core._tables) == [(22.0, "<f8"), (20.0, "<f8"), (23.0, "<f8")]
+
+    # A table larger than the whole cache is neither cached nor used for lookups
+    assert core.magnitude_table(24.0, 4096).size == 4096
+    assert (24.0, "<f8") not in core._tables
+    converter = BrightnessConverter(zeropoint=24.0, lookup_max=1 << 20)
+    assert converter._lookup_table(np.array([1, 4000]), None, True) is None
+
+
+@pytest.mark.filterwarnings("ignore:.*encountered in log10:RuntimeWarning")
+@pytest.mark.parametrize("invalid", [None, "nan", "sentinel"])
+def test_table_lookup_converts_only_the_outliers_exactly(monkeypatch, invalid):
+    """Counts outside the table are converted exactly, the rest is still looked up."""
+    counts = np.random.default_rng(7).integers(1, 60_000, 5000)
+    counts[[17, 4000]] = [0, -3]
+    counts[2500] = 70_000  # Past lookup_max
+    converter = BrightnessConverter(zeropoint=25.0, invalid=invalid, fill=-1.0, chunksize=1000)
+    expected = BrightnessConverter(zeropoint=25.0, invalid=invalid, fill=-1.0, lookup_max=0)
+    expected = expected.flux_to_mag(counts)
+
+    converter.flux_to_mag(counts)  # Builds the table outside the spy
+    converted = set()
+    flux_to_mag = core.utils.flux_to_mag
+
+    def spy(flux, *args, **kwargs):
+        converted.update(np.ravel(flux).tolist())
+        return flux_to_mag(flux, *args, **kwargs)
+
+    monkeypatch.setattr(core.utils, "flux_to_mag", spy)
+    np.testing.assert_array_equal(converter.flux_to_mag(counts), expected)
+    assert converted == {-3, 0, 70_000}  # Not the chunks around them
+
+    where = np.arange(counts.size) % 3 != 0
+    out = np.full(counts.size, 99.0)
+    converter.flux_to_mag(counts, out=out, where=where)
+    np.testing.assert_array_equal(out, np.where(where, expected, 99.0))
+
+
+def test_settings_survive_json():
+    """Converter settings are strict JSON and compare equal after a round trip."""
+    for converter in (
+        BrightnessConverter(zeropoint=25.0),
+        DistanceConverter(invalid="sentinel", fill=-np.inf),
+    ):
+        settings = converter.settings()
+        assert json.loads(json.dumps(settings, allow_nan=False)) == settings
+    assert BrightnessConverter(zeropoint=25.0, chunksize=10).settings() == (
+        BrightnessConverter(zeropoint=25.0).settings()
+    )
+    assert BrightnessConverter(zeropoint=25.0, dtype="float32").settings() != (
+        BrightnessConverter(zeropoint=25.0).settings()
+    )
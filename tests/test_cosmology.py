@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+import candiamazing.cosmology as cosmology
+from candiamazing.core import DistanceConverter
+from candiamazing.cosmology import SPEED_OF_LIGHT_KMS, FlatLambdaCDM, distance_table
+
+
+def direct_distmod(z, H0=70.0, Om0=0.3):
+    """Distance modulus by direct numerical integration, one redshift at a time."""
+    integral = quad(lambda x: 1 / np.sqrt(Om0 * (1 + x) ** 3 + (1 - Om0)), 0, z, epsrel=1e-12)[0]
+    return 5 * np.log10((1 + z) * SPEED_OF_LIGHT_KMS / H0 * integral) + 25
+
+
+@pytest.mark.parametrize("H0, Om0", [(70.0, 0.3), (67.7, 0.31), (100.0, 1.0)])
+def test_distmod_matches_direct_integration(H0, Om0):
+    """The interpolated table agrees with quad to far better than a millimagnitude."""
+    cosmo = FlatLambdaCDM(H0=H0, Om0=Om0)
+    z = np.array([1e-4, 0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0])
+
+    expected = [direct_distmod(zz, H0, Om0) for zz in z]
+
+    np.testing.assert_allclose(cosmo.distmod(z), expected, rtol=0, atol=1e-7)
+
+
+def test_distmod_edges():
+    """z = 0 is infinitely close; redshifts outside the table give nan."""
+    cosmo = FlatLambdaCDM(z_max=5.0)
+
+    distmod = cosmo.distmod(np.array([0.0, -0.1, 5.5]))
+
+    assert distmod[0] == -np.inf
+    assert np.isnan(distmod[1:]).all()
+
+
+def test_low_redshift_follows_hubble_law():
+    """At low redshift the distance is c z / H0."""
+    cosmo = FlatLambdaCDM(H0=70.0)
+
+    assert cosmo.luminosity_distance(1e-6) == pytest.approx(SPEED_OF_LIGHT_KMS / 70.0 * 1e-6)
+
+
+def test_distmod_to_redshift_round_trip():
+    """Inverting the distance modulus recovers the redshift."""
+    cosmo = FlatLambdaCDM()
+    z = np.geomspace(1e-6, 20.0, 1000)
+
+    np.testing.assert_allclose(cosmo.redshift_from_distmod(cosmo.distmod(z)), z, rtol=1e-10)
+
+
+def test_distmod_to_redshift_out_of_range():
+    """Distance moduli beyond the table give nan, -inf gives z = 0."""
+    cosmo = FlatLambdaCDM(z_max=2.0)
+
+    z = cosmo.redshift_from_distmod(np.array([-np.inf, np.nan, cosmo.distmod(3.0) + 1]))
+
+    assert z[0] == 0.0
+    assert np.isnan(z[1:]).all()
+
+
+def test_tables_are_cached_by_parameters():
+    """Cosmologies with equal parameters share one table; others get their own."""
+    assert FlatLambdaCDM(H0=70.0).table is FlatLambdaCDM(H0=70.0).table
+    assert FlatLambdaCDM(H0=70.0).table is not FlatLambdaCDM(H0=71.0).table
+    assert distance_table.cache_info().currsize >= 2
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        FlatLambdaCDM(H0=-70.0)
+    with pytest.raises(ValueError):
+        FlatLambdaCDM(Om0=1.5)
+    with pytest.raises(ValueError):
+        FlatLambdaCDM(rtol=0.0)
+
+
+def test_unreachable_rtol_raises(monkeypatch):
+    """A table that cannot meet rtol within the size cap raises instead of being used."""
+    monkeypatch.setattr(cosmology, "_MAX_INTERVALS", 256)
+    with pytest.raises(ValueError, match="cannot be met"):
+        FlatLambdaCDM(H0=68.1, rtol=1e-15).distmod(1.0)
+    assert FlatLambdaCDM(H0=68.1, rtol=1e-6).distmod(1.0) > 0
+
+    # Tolerances below the float64 precision stop as soon as refining stops helping
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="cannot be met"):
+        FlatLambdaCDM(H0=68.1, z_max=1.0, rtol=1e-17).distmod(0.5)
+
+
+def test_distance_converter_redshift_methods():
+    """The converter uses its configured cosmology and returns floats for floats."""
+    converter = DistanceConverter(cosmology=FlatLambdaCDM(H0=67.7, Om0=0.31))
+
+    distmod = converter.redshift_to_distmod(0.5)
+
+    assert type(distmod) is float
+    assert distmod == pytest.approx(direct_distmod(0.5, 67.7, 0.31), abs=1e-7)
+    assert converter.distmod_to_redshift(distmod) == pytest.approx(0.5, rel=1e-10)
+
+    z = np.array([0.1, 1.0, 3.0])
+    np.testing.assert_allclose(converter.distmod_to_redshift(converter.redshift_to_distmod(z)), z)
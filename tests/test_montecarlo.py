@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from candiamazing.core import BrightnessConverter, DistanceConverter
+from candiamazing.montecarlo import sample
+
+
+def test_sample_matches_linear_propagation():
+    """For small errors the Monte Carlo spread matches first-order propagation."""
+    converter = BrightnessConverter(zeropoint=25.0)
+    mag = np.array([18.0, 20.0, 22.0])
+    mag_err = np.array([0.01, 0.02, 0.05])
+
+    summary = converter.sample("mag_to_flux", mag, mag_err, n_samples=20_000, seed=1)
+
+    flux, flux_err = converter.mag_to_flux_with_error(mag, mag_err)
+    assert summary.mean == pytest.approx(flux, rel=2e-3)
+    assert summary.std == pytest.approx(flux_err, rel=3e-2)
+    assert summary.percentiles.shape == (3, 3)
+    assert summary.percentiles[1] == pytest.approx(flux, rel=2e-3)
+
+
+def test_sample_is_reproducible_across_block_sizes_and_backends():
+    """The seed fixes the result, however the sources are split and run."""
+    converter = DistanceConverter()
+    distmod = np.linspace(20.0, 40.0, 50)
+
+    reference = sample(converter.distmod_to_distance, distmod, 0.1, n_samples=100, seed=7)
+    for backend in ("serial", "threads", "processes"):
+        summary = sample(
+            converter.distmod_to_distance,
+            distmod,
+            0.1,
+            n_samples=100,
+            seed=7,
+            max_elements=1000,
+            backend=backend,
+            n_workers=2,
+        )
+        again = sample(
+            converter.distmod_to_distance,
+            distmod,
+            0.1,
+            n_samples=100,
+            seed=7,
+            max_elements=1000,
+        )
+        np.testing.assert_array_equal(summary.mean, again.mean)
+        np.testing.assert_array_equal(summary.percentiles, again.percentiles)
+    # Different blocking draws different numbers, but the statistics agree
+    assert summary.mean == pytest.approx(reference.mean, rel=2e-2)
+
+
+def identity(x, out=None):
+    return x
+
+
+def test_sample_asymmetric_errors():
+    """A (lower, upper) error pair skews the draws."""
+    summary = sample(identity, 0.0, (1.0, 3.0), n_samples=200_000, seed=3)
+
+    assert summary.mean.shape == ()
+    low, median, high = summary.percentiles
+    assert median == pytest.approx(0.0, abs=0.05)
+    assert (high - median) / (median - low) == pytest.approx(3.0, rel=0.05)
+
+
+def test_sample_validation():
+    converter = BrightnessConverter(zeropoint=25.0)
+    with pytest.raises(ValueError):
+        converter.sample("close", 20.0, 0.1)
+    with pytest.raises(ValueError):
+        sample(converter.mag_to_flux, 20.0, 0.1, backend="gpu")
+
+
+@pytest.mark.parametrize("shape", [(0,), (3, 0)])
+def test_sample_empty_input_keeps_its_shape(shape):
+    """No sources give empty results shaped like ``value``, as for any other input."""
+    summary = sample(identity, np.empty(shape), 0.1, q=(16, 50, 84))
+
+    assert summary.mean.shape == summary.std.shape == shape
+    assert summary.percentiles.shape == (3, *shape)
@@ -0,0 +1,58 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from candiamazing.parallel import ChunkedExecutor
+from candiamazing.utils import flux_to_mag, flux_to_mag_with_error, mag_to_flux
+
+
+@pytest.mark.parametrize("backend", ["serial", "threads", "processes"])
+def test_backends_match_direct_call(backend):
+    """Every backend gives exactly the same numbers as calling the function directly."""
+    fluxes = np.linspace(1.0, 1000.0, 10_000)
+    executor = ChunkedExecutor(backend=backend, n_workers=2, chunksize=1000, threshold=0)
+    try:
+        mags = executor.run(flux_to_mag, fluxes, 25.0)
+        assert np.array_equal(mags, flux_to_mag(fluxes, 25.0))
+
+        # A `where` mask leaves the masked elements of `out` untouched
+        mask = np.arange(fluxes.size) % 3 == 0
+        out = np.full_like(fluxes, -1.0)
+        executor.run(mag_to_flux, mags, 25.0, out=out, where=mask)
+        assert out[mask] == pytest.approx(fluxes[mask])
+        assert np.all(out[~mask] == -1.0)
+
+        # Conversions with two results fill a pair of outputs
+        errors = fluxes / 100
+        mag, mag_err = executor.run(flux_to_mag_with_error, fluxes, errors, 25.0)
+        expected = flux_to_mag_with_error(fluxes, errors, 25.0)
+        assert np.array_equal(mag, expected[0])
+        assert np.array_equal(mag_err, expected[1])
+    finally:
+        executor.close()
+
+
+def test_passthrough_for_unsplittable_inputs():
+    """Scalars and array-valued arguments skip the chunking and are passed straight through."""
+    executor = ChunkedExecutor(chunksize=2, threshold=0)
+
+    assert executor.run(flux_to_mag, 100.0, 25.0) == pytest.approx(20.0)
+
+    zeropoints = np.array([25.0, 30.0, 25.0, 30.0])
+    fluxes = np.full(4, 100.0)
+    assert executor.run(flux_to_mag, fluxes, zeropoints) == pytest.approx([20.0, 25.0, 20.0, 25.0])
+
+
+def test_executor_validation_and_pickling():
+    with pytest.raises(ValueError):
+        ChunkedExecutor(backend="gpu")
+
+    executor = ChunkedExecutor(backend="threads", n_workers=2, chunksize=10, threshold=0)
+    executor.run(flux_to_mag, np.ones(100), 0.0)  # starts the pool
+    copy = pickle.loads(pickle.dumps(executor))
+    executor.close()
+
+    assert copy.backend == "threads"
+    assert copy.run(flux_to_mag, np.ones(100), 0.0) == pytest.approx(np.zeros(100))
+    copy.close()
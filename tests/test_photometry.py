@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from candiamazing.core import BrightnessConverter, MultiBandConverter
+from candiamazing.photometry import Band, PhotometricSystem
+
+
+@pytest.fixture
+def system():
+    """Three bands: two with instrument zeropoints, one calibrated to Vega."""
+    return PhotometricSystem([("g", 27.0), ("r", 26.5, 0.2), Band("i", 26.0, 0.4)])
+
+
+def test_registry(system):
+    assert len(system) == 3
+    assert "r" in system
+    assert system["r"] == Band("r", 26.5, 0.2)
+    assert system.index(np.array(["i", "g", "i"])).tolist() == [2, 0, 2]
+    assert system.add("z", 25.5) == 3
+    np.testing.assert_allclose(system.zeropoints("Vega"), [27.0, 26.3, 25.6, 25.5])
+
+    with pytest.raises(ValueError):
+        system.add("g", 1.0)
+    with pytest.raises(KeyError):
+        system.index("y")
+
+
+def test_multi_band_matches_one_converter_per_band(system):
+    """One pass over a mixed table equals masking it once per band."""
+    rng = np.random.default_rng(1)
+    flux = rng.uniform(1, 1e4, 10_000)
+    band = rng.integers(0, len(system), flux.size)
+    converter = MultiBandConverter(system, chunksize=1000)
+
+    mag = converter.flux_to_mag(flux, band)
+
+    for index, entry in enumerate(system):
+        rows = band == index
+        expected = BrightnessConverter(zeropoint=entry.zeropoint).flux_to_mag(flux[rows])
+        np.testing.assert_allclose(mag[rows], expected)
+    np.testing.assert_allclose(converter.mag_to_flux(mag, band), flux)
+
+
+def test_multi_band_names_vega_and_scalars(system):
+    """Band names work like indices, Vega shifts the zeropoints, scalars stay floats."""
+    converter = MultiBandConverter(system, magsys="Vega")
+
+    mags = converter.flux_to_mag(np.array([100.0, 100.0]), np.array(["g", "r"]))
+    assert mags.tolist() == pytest.approx([22.0, 21.3])
+
+    mag = converter.flux_to_mag(100.0, "i")
+    assert type(mag) is float
+    assert mag == pytest.approx(20.6)
+    assert converter.mag_to_flux(mag, 2) == pytest.approx(100.0)
+
+
+def test_multi_band_preserves_float32(system):
+    converter = MultiBandConverter(system)
+    flux = np.full(4, 100.0, dtype=np.float32)
+
+    assert converter.flux_to_mag(flux, np.zeros(4, dtype=np.int8)).dtype == np.float32
+
+
+def test_multi_band_invalid(system):
+    with pytest.raises(ValueError):
+        MultiBandConverter(system, magsys="ST")
+    with pytest.raises(IndexError):
+        MultiBandConverter(system).flux_to_mag(np.ones(2), np.array([0, 7]))
+    with pytest.raises(IndexError):
+        MultiBandConverter(system).flux_to_mag(np.ones(2), np.array([0, -1]))
+    with pytest.raises(IndexError):
+        MultiBandConverter(system).mag_to_flux(20.0, -1)
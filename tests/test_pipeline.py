@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from candiamazing.core import BrightnessConverter, DistanceConverter, MultiBandConverter
+from candiamazing.photometry import PhotometricSystem
+from candiamazing.pipeline import Pipeline
+
+
+def test_zeropoint_change_is_one_offset():
+    """mag -> flux -> mag between two systems folds into a single added offset."""
+    hsc, sdss = BrightnessConverter(zeropoint=27.0), BrightnessConverter(zeropoint=25.0)
+    pipeline = Pipeline([(hsc, "mag_to_flux"), (sdss, "flux_to_mag")], chunksize=100)
+    mag = np.linspace(15, 30, 1000)
+
+    assert pipeline.plan.expression == "x - 2"
+    assert "folded" in pipeline.plan.notes[0]
+    np.testing.assert_allclose(pipeline(mag), sdss.flux_to_mag(hsc.mag_to_flux(mag)))
+    assert pipeline(20.0) == pytest.approx(18.0)
+
+
+def test_inverse_pairs_cancel():
+    """Inverse pairs disappear, leaving only the steps that do something."""
+    bright, distance = BrightnessConverter(zeropoint=25.0), DistanceConverter()
+    pipeline = (
+        Pipeline()
+        .then(bright, "flux_to_mag")
+        .then(bright, "mag_to_flux")
+        .then(BrightnessConverter(zeropoint=30.0), "flux_to_mag")
+    )
+    assert pipeline.plan.expression == "-2.5 * log10(x) + 30"
+    assert pipeline.plan.notes[0].startswith("cancelled")
+    assert "3 step(s) fused into 1 pass" in str(pipeline.plan)
+
+    round_trip = Pipeline([(distance, "distmod_to_distance"), (distance, "distance_to_distmod")])
+    assert round_trip.plan.expression == "x"
+    distmod = np.array([0.0, 5.0, 25.0])
+    out = np.empty(3)
+    assert round_trip(distmod, out=out) is out
+    np.testing.assert_array_equal(out, distmod)
+
+
+def test_invalid_chains():
+    """Steps must connect, and only single-zeropoint converters are supported."""
+    bright = BrightnessConverter(zeropoint=25.0)
+    with pytest.raises(ValueError):
+        Pipeline([(bright, "flux_to_mag"), (DistanceConverter(), "distance_to_distmod")])
+    with pytest.raises(ValueError):
+        Pipeline([(MultiBandConverter(PhotometricSystem([("g", 27.0)])), "flux_to_mag")])
+    with pytest.raises(ValueError):
+        Pipeline([(bright, "distance_to_distmod")])
+    # A mismatch must not hide behind an inverse pair that cancels
+    distance = DistanceConverter()
+    with pytest.raises(ValueError, match="takes distance but"):
+        Pipeline(
+            [(bright, "flux_to_mag"), (bright, "mag_to_flux"), (distance, "distance_to_distmod")]
+        )
+    with pytest.raises(ValueError):
+        Pipeline([(bright, "flux_to_mag"), (bright, "mag_to_flux")]).then(
+            distance, "distance_to_distmod"
+        )
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from candiamazing import profiling, scalar, utils
+from candiamazing.cli import main
+from candiamazing.core import BrightnessConverter
+
+
+def test_profile_counts_calls_elements_and_new_arrays():
+    """Converter methods and the utils functions they call are counted separately."""
+    converter = BrightnessConverter(zeropoint=25.0, chunksize=100)
+    flux = np.full(250, 100.0)
+    out = np.empty_like(flux)
+
+    with profiling.profile() as stats:
+        converter.flux_to_mag(flux)
+        converter.flux_to_mag(flux, out=out)
+        converter.flux_to_mag(100.0)
+
+    method = stats["BrightnessConverter.flux_to_mag"]
+    assert (method.calls, method.elements) == (3, 501)
+    assert method.new_arrays == 1  # Only the call without ``out`` returned a new array
+    assert method.bytes == 4 * flux.nbytes
+    # The chunked engine calls the utils function at least once per chunk of 100
+    assert stats["utils.flux_to_mag"].calls >= 6
+    assert stats["utils.flux_to_mag"].elements >= 500
+    assert method.seconds > 0 and method.throughput > 0
+
+
+def test_disabled_profiling_leaves_the_functions_alone():
+    """Outside a profile the original functions run, and counts stay as they were."""
+    original = utils.flux_to_mag
+    with profiling.profile():
+        assert utils.flux_to_mag is not original
+        assert profiling.is_enabled()
+    assert utils.flux_to_mag is original
+    assert BrightnessConverter.flux_to_mag.__qualname__ == "BrightnessConverter.flux_to_mag"
+    assert not profiling.is_enabled()
+
+    before = profiling.snapshot()
+    utils.flux_to_mag(np.ones(10), 25.0)
+    assert profiling.snapshot() == before
+    profiling.reset()
+    assert profiling.snapshot() == {}
+
+
+@pytest.mark.parametrize("invalid", ["nan", "clip", "sentinel"])
+def test_invalid_policy_counts_one_call(invalid):
+    """Re-entering a function through its module under a policy is not counted again."""
+    with profiling.profile() as stats:
+        utils.flux_to_mag(np.array([100.0, -1.0, 10.0]), 25.0, invalid=invalid)
+
+    total = stats["utils.flux_to_mag"]
+    assert (total.calls, total.elements, total.new_arrays) == (1, 3, 1)
+
+
+def test_hooks_receive_events():
+    events = []
+    profiling.add_hook(events.append)
+    try:
+        with profiling.profile():
+            utils.mag_to_flux(np.ones(4), 25.0)
+            scalar.mag_to_flux(20.0, 25.0)
+    finally:
+        profiling.remove_hook(events.append)
+    assert [event.name for event in events] == ["utils.mag_to_flux", "scalar.mag_to_flux"]
+    assert events[0].elements == 4 and events[0].new_arrays == 1
+
+
+def test_cli_profile_flag(tmp_path, capsys):
+    catalog = tmp_path / "catalog.csv"
+    catalog.write_text("flux\n100.0\n1000.0\n")
+
+    assert (
+        main(["--profile", "flux_to_mag", "--input", str(catalog), "--column", "flux", "25"]) == 0
+    )
+
+    captured = capsys.readouterr()
+    assert captured.out == "mag\n20.0\n17.5\n"
+    assert "utils.flux_to_mag" in captured.err
+
+
+@pytest.fixture(autouse=True)
+def _clean_profile():
+    yield
+    profiling.reset()
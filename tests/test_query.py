@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from candiamazing import query
+from candiamazing.core import BrightnessConverter, DistanceConverter, MultiBandConverter
+from candiamazing.photometry import PhotometricSystem
+
+
+def _with_edges(values, converter, method, low, high):
+    """Random values plus the native bounds of a query and their neighbours."""
+    lower, upper = query.native_range(converter, method, low, high, dtype=values.dtype)
+    edges = np.array([lower, upper], dtype=values.dtype)
+    return np.concatenate(
+        [values, edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)]
+    )
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("inclusive", query.INCLUSIVE)
+def test_select_matches_converting_first(dtype, inclusive):
+    """The selection equals filtering the converted values, even on the edges."""
+    rng = np.random.default_rng(3)
+    bright = BrightnessConverter(zeropoint=25.0, chunksize=1000)
+    flux = _with_edges(rng.lognormal(3, 3, 20_000).astype(dtype), bright, "flux_to_mag", 18.0, 22.0)
+    flux = np.concatenate([flux, np.array([0.0, -1.0, np.nan, np.inf], dtype=dtype)])
+    mask = bright.select("flux_to_mag", flux, low=18.0, high=22.0, inclusive=inclusive)
+
+    with np.errstate(all="ignore"):
+        mag = bright.flux_to_mag(flux)
+    lower_ok = mag >= 18.0 if inclusive in ("both", "left") else mag > 18.0
+    upper_ok = mag <= 22.0 if inclusive in ("both", "right") else mag < 22.0
+    np.testing.assert_array_equal(mask, lower_ok & upper_ok & (flux > 0))
+
+    distance = DistanceConverter()
+    distmod = _with_edges(
+        rng.uniform(20, 50, 20_000).astype(dtype), distance, "distmod_to_distance", 1e6, None
+    )
+    mask = distance.select("distmod_to_distance", distmod, low=1e6, inclusive=inclusive)
+    with np.errstate(over="ignore"):
+        parsecs = distance.distmod_to_distance(distmod)
+    np.testing.assert_array_equal(
+        mask, parsecs >= 1e6 if inclusive in ("both", "left") else parsecs > 1e6
+    )
+
+
+def test_native_range_directions():
+    """Magnitude bounds become flux bounds the other way round; fluxes stay positive."""
+    bright = BrightnessConverter(zeropoint=25.0)
+    lower, upper = query.native_range(bright, "flux_to_mag", low=20.0, high=22.5)
+    assert lower == pytest.approx(10.0) and upper == pytest.approx(100.0)
+    lower, upper = query.native_range(bright, "flux_to_mag", high=22.5)
+    assert lower == pytest.approx(10.0) and upper == np.inf
+    lower, upper = query.native_range(bright, "flux_to_mag", low=22.5)
+    assert 0.0 < lower < 1e-300 and upper == pytest.approx(10.0)
+
+    lower, upper = query.native_range(DistanceConverter(), "distance_to_distmod", 25.0, 35.0)
+    assert lower == pytest.approx(1e6) and upper == pytest.approx(1e8)
+
+    lower, upper = query.native_range(bright, "flux_to_mag", low=22.0, high=20.0)
+    assert lower > upper
+
+    with pytest.raises(ValueError, match="inclusive"):
+        query.native_range(bright, "flux_to_mag", high=22.0, inclusive="open")
+    with pytest.raises(ValueError, match="nan"):
+        query.native_range(bright, "flux_to_mag", high=np.nan)
+    with pytest.raises(ValueError, match="pipeline"):
+        query.native_range(MultiBandConverter(PhotometricSystem()), "flux_to_mag", high=22.0)
+
+
+def test_sorted_index():
+    """The index finds the same rows as a selection, with two binary searches."""
+    rng = np.random.default_rng(4)
+    bright, distance = BrightnessConverter(zeropoint=25.0), DistanceConverter()
+    flux = rng.lognormal(3, 2, 5000)
+    flux[::97] = np.nan
+    index = query.SortedIndex(flux)
+    assert len(index) == 5000
+
+    rows = index.rows(bright, "flux_to_mag", high=22.0)
+    np.testing.assert_array_equal(
+        rows, np.flatnonzero(bright.select("flux_to_mag", flux, high=22.0))
+    )
+    assert index.count(bright, "flux_to_mag", high=22.0) == rows.size
+    assert index.count(bright, "flux_to_mag", low=22.0, high=20.0) == 0
+
+    # "Brighter than m = 22 and closer than distmod 35", combining two columns
+    parsecs = rng.uniform(1e6, 1e9, 5000)
+    both = bright.select("flux_to_mag", flux, high=22.0) & distance.select(
+        "distance_to_distmod", parsecs, high=35.0
+    )
+    close = query.SortedIndex(parsecs).rows(distance, "distance_to_distmod", high=35.0)
+    np.testing.assert_array_equal(np.flatnonzero(both), np.intersect1d(rows, close))
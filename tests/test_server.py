@@ -0,0 +1,65 @@
+import io
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from candiamazing.server import Client, make_socket_server, serve_stream, write_message
+
+
+def test_serve_stream_json_and_binary():
+    """JSON-line and binary requests on one stream are answered in order."""
+    requests = io.BytesIO()
+    write_message(requests, {"id": 0, "op": "flux_to_mag", "values": [100.0], "zeropoint": 25.0})
+    write_message(
+        requests,
+        {"id": 1, "op": "distance_to_distmod"},
+        np.array([10.0, 100.0]),
+        binary=True,
+    )
+    write_message(requests, {"id": 2, "op": "mag_to_flux", "values": 20.0})
+    requests.seek(0)
+
+    responses = io.BytesIO()
+    assert serve_stream(requests, responses) == 3
+    responses.seek(0)
+
+    client = Client(responses, io.BytesIO())
+    assert client.receive() == (0, [20.0])
+    request_id, distmods = client.receive()
+    assert request_id == 1
+    assert distmods == pytest.approx([0.0, 5.0])
+    # The missing zeropoint is reported, and did not stop the server
+    with pytest.raises(RuntimeError, match="zeropoint"):
+        client.receive()
+
+
+def test_spawned_server_pipelining():
+    """A client can send several requests before reading the answers."""
+    with Client.spawn() as client:
+        ids = [client.send("flux_to_mag", [10.0**i], zeropoint=25.0) for i in range(5)]
+        ids.append(client.send("mag_to_flux", np.array([20.0, 22.5]), zeropoint=25.0))
+
+        answers = [client.receive() for _ in ids]
+
+        assert [request_id for request_id, _ in answers] == ids
+        assert [mags[0] for _, mags in answers[:5]] == pytest.approx([25.0, 22.5, 20.0, 17.5, 15.0])
+        assert answers[-1][1] == pytest.approx([100.0, 10.0])
+        assert client.distmod_to_distance(5.0) == pytest.approx(100.0)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_unix_socket_server(tmp_path):
+    path = str(tmp_path / "candiamazing.sock")
+    server = make_socket_server(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with Client.connect(path) as client:
+            assert client.flux_to_mag(np.array([100.0, 1000.0]), 25.0) == pytest.approx(
+                [20.0, 17.5]
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
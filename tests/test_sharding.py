@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pytest
+
+from candiamazing.core import BrightnessConverter, DistanceConverter
+from candiamazing.cosmology import FlatLambdaCDM
+from candiamazing.sharding import MANIFEST_NAME, convert_files, shard_path
+
+
+@pytest.fixture
+def fields(tmp_path):
+    """Three text catalogs and one .npy array of fluxes."""
+    directory = tmp_path / "fields"
+    directory.mkdir()
+    for index in range(3):
+        rows = "".join(f"{i},{10.0 ** (i % 4)}\n" for i in range(5))
+        (directory / f"field_{index}.csv").write_text("id,flux\n" + rows)
+    np.save(directory / "field_3.npy", np.array([1.0, 100.0]))
+    return directory
+
+
+def test_convert_files_is_incremental(fields, tmp_path):
+    """A rerun skips unchanged inputs and converts touched ones again."""
+    converter = BrightnessConverter(zeropoint=25.0)
+    output_dir = str(tmp_path / "out")
+    options = {"column": "flux", "output_column": "mag"}
+
+    results = convert_files(converter, "flux_to_mag", [str(fields / "*")], output_dir, **options)
+    assert sorted(result.elements for result in results) == [2, 5, 5, 5]
+    assert not any(result.skipped for result in results)
+    assert os.path.exists(os.path.join(output_dir, MANIFEST_NAME))
+    with open(os.path.join(output_dir, "field_0.csv")) as f:
+        assert f.read().splitlines()[:3] == ["mag", "25.0", "22.5"]
+    np.testing.assert_allclose(np.load(os.path.join(output_dir, "field_3.npy")), [25.0, 20.0])
+
+    (fields / "field_1.csv").write_text("id,flux\n0,1000.0\n")
+    rerun = convert_files(converter, "flux_to_mag", [str(fields / "*")], output_dir, **options)
+    assert sorted(result.input for result in rerun if not result.skipped) == [
+        str(fields / "field_1.csv")
+    ]
+
+    # Other settings make every output stale
+    other = BrightnessConverter(zeropoint=20.0)
+    rerun = convert_files(other, "flux_to_mag", [str(fields / "*")], output_dir, **options)
+    assert not any(result.skipped for result in rerun)
+
+
+def test_convert_files_with_workers_and_shards(fields, tmp_path):
+    """Workers and shards give the same files, spread over shard directories."""
+    output_dir = str(tmp_path / "out")
+    inputs = [str(fields / "*.csv")]
+    progress = []
+
+    results = convert_files(
+        DistanceConverter(),
+        "distance_to_distmod",
+        inputs,
+        output_dir,
+        workers=2,
+        shards=4,
+        use_hash=True,
+        progress=lambda result, done, total: progress.append((done, total)),
+        column="flux",
+    )
+
+    assert len(results) == 3 and progress[-1] == (3, 3)
+    for result in results:
+        assert result.output == shard_path(result.input, output_dir, 4)
+        assert os.path.exists(result.output)
+
+    with pytest.raises(FileNotFoundError):
+        convert_files(DistanceConverter(), "distance_to_distmod", ["missing.csv"], output_dir)
+
+
+def test_convert_files_refuses_duplicate_outputs(fields, tmp_path):
+    """Inputs of the same name in different directories are refused before any work."""
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "field_0.csv").write_text("id,flux\n0,1.0\n")
+    output_dir = tmp_path / "out"
+
+    for shards in (1, 4):
+        with pytest.raises(ValueError, match="would both be written"):
+            convert_files(
+                BrightnessConverter(zeropoint=25.0),
+                "flux_to_mag",
+                [str(fields / "field_0.csv"), str(other / "field_0.csv")],
+                str(output_dir),
+                shards=shards,
+                column="flux",
+            )
+        assert not list(output_dir.rglob("*.csv"))
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        BrightnessConverter(zeropoint=25.0, dtype="float32"),
+        BrightnessConverter(zeropoint=25.0, invalid="sentinel", fill=-99.0),
+        BrightnessConverter(zeropoint=25.0, approx=1e-4),
+    ],
+    ids=["dtype", "invalid", "approx"],
+)
+def test_convert_files_reruns_on_any_converter_setting(fields, tmp_path, changed):
+    """Every setting that can change a result makes the outputs stale."""
+    output_dir = str(tmp_path / "out")
+    inputs = [str(fields / "*.csv")]
+    convert_files(
+        BrightnessConverter(zeropoint=25.0), "flux_to_mag", inputs, output_dir, column="flux"
+    )
+
+    # Execution options never change a result
+    same = BrightnessConverter(zeropoint=25.0, chunksize=7, memo_size=8)
+    rerun = convert_files(same, "flux_to_mag", inputs, output_dir, column="flux")
+    assert all(result.skipped for result in rerun)
+
+    rerun = convert_files(changed, "flux_to_mag", inputs, output_dir, column="flux")
+    assert not any(result.skipped for result in rerun)
+
+
+def test_convert_files_reruns_on_another_cosmology(fields, tmp_path):
+    output_dir = str(tmp_path / "out")
+    inputs = [str(fields / "*.csv")]
+    convert_files(DistanceConverter(), "distance_to_distmod", inputs, output_dir, column="flux")
+
+    other = DistanceConverter(cosmology=FlatLambdaCDM(H0=67.7))
+    rerun = convert_files(other, "distance_to_distmod", inputs, output_dir, column="flux")
+    assert not any(result.skipped for result in rerun)
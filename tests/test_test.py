@@ -1,3 +1,14 @@
 from candiamazing import test
 
 __all__ = ("test",)  # Since its name is "test" pytest will pick it up just from importing
+
+
+def test_lazy_imports():
+    """Names listed in __all__ resolve lazily to the real objects."""
+    import candiamazing
+    from candiamazing.core import BrightnessConverter
+
+    assert candiamazing.BrightnessConverter is BrightnessConverter
+    assert callable(candiamazing.test)
+    assert candiamazing.utils.flux_to_mag(100.0, 25.0) == 20.0
+    assert set(candiamazing.__all__) <= set(dir(candiamazing))
@@ -1,11 +1,20 @@
+import tracemalloc
+
 import numpy as np
 import pytest
 
+from candiamazing.core import AbsoluteMagnitudeConverter, BrightnessConverter
 from candiamazing.utils import (
+    INVALID_POLICIES,
+    absolute_magnitude,
     distance_modulus_to_distance,
     distance_to_distance_modulus,
+    distance_to_distance_modulus_with_error,
     flux_to_mag,
+    flux_to_mag_with_error,
+    luminosity,
     mag_to_flux,
+    mag_to_flux_with_error,
 )
 
 
@@ -50,3 +59,366 @@ def test_distance_modulus_distance(distmod, distance):
     assert distmod_calculated == pytest.approx(distmod), (
         "Distance to distance modulus calculation incorrect"
     )
+
+
+@pytest.mark.parametrize(
+    "func, args, values",
+    [
+        (flux_to_mag, (25.0,), np.logspace(0, 4, 5)),
+        (mag_to_flux, (25.0,), np.linspace(15.0, 25.0, 5)),
+        (distance_modulus_to_distance, (), np.linspace(0.0, 30.0, 5)),
+        (distance_to_distance_modulus, (), np.logspace(1, 7, 5)),
+    ],
+)
+def test_out_and_where(func, args, values):
+    # Writing into a caller supplied buffer gives the same numbers and returns that buffer
+    out = np.empty_like(values)
+    result = func(values, *args, out=out)
+    assert result is out
+    assert out == pytest.approx(func(values, *args))
+
+    # Elements excluded by `where` are left untouched
+    out = np.full_like(values, -99.0)
+    mask = np.array([True, False, True, False, True])
+    func(values, *args, out=out, where=mask)
+    assert out[mask] == pytest.approx(func(values[mask], *args))
+    assert np.all(out[~mask] == -99.0)
+
+
+@pytest.mark.parametrize(
+    "func, args",
+    [
+        (flux_to_mag, (25.0,)),
+        (mag_to_flux, (25.0,)),
+        (distance_modulus_to_distance, ()),
+        (distance_to_distance_modulus, ()),
+    ],
+)
+def test_out_does_not_allocate(func, args):
+    # NumPy reports its array allocations to tracemalloc, so any temporary the
+    # size of the input would show up in the peak traced memory
+    values = np.linspace(1.0, 20.0, 1_000_000)
+    out = np.empty_like(values)
+    func(values, *args, out=out)  # warm up any lazily created ufunc state
+
+    tracemalloc.start()
+    try:
+        func(values, *args, out=out)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < values.nbytes // 100
+
+
+def test_absolute_magnitude_and_luminosity():
+    flux = np.array([100.0, 10.0, 3631.0])
+    distance = np.array([10.0, 1e6, 250.0])
+
+    # The fused kernel agrees with the two separate conversions
+    expected = flux_to_mag(flux, 25.0) - distance_to_distance_modulus(distance)
+    assert absolute_magnitude(flux, distance, 25.0) == pytest.approx(expected)
+    # Scalars and broadcasting work too
+    assert absolute_magnitude(100.0, 10.0, 25.0) == pytest.approx(20.0)
+    assert absolute_magnitude(flux, 10.0, 25.0) == pytest.approx(flux_to_mag(flux, 25.0))
+
+    assert luminosity(flux, distance) == pytest.approx(4 * np.pi * distance**2 * flux)
+
+
+@pytest.mark.parametrize("target", ["flux", "distance"])
+def test_absolute_magnitude_and_luminosity_in_place(target):
+    """Both fused kernels can overwrite either of their inputs."""
+    flux = np.array([100.0, 1000.0])
+    distance = np.array([10.0, 100.0])
+    expected_mag = absolute_magnitude(flux, distance, 25.0)
+    expected_lum = luminosity(flux, distance)
+
+    inputs = {"flux": flux.copy(), "distance": distance.copy()}
+    mag = absolute_magnitude(inputs["flux"], inputs["distance"], 25.0, out=inputs[target])
+    assert mag is inputs[target]
+    np.testing.assert_allclose(mag, [20.0, 12.5])
+    np.testing.assert_allclose(mag, expected_mag, rtol=1e-15)
+
+    inputs = {"flux": flux.copy(), "distance": distance.copy()}
+    lum = luminosity(inputs["flux"], inputs["distance"], out=inputs[target])
+    assert lum is inputs[target]
+    np.testing.assert_allclose(lum, expected_lum, rtol=1e-15)
+
+    # Also through a converter, which splits the arrays into chunks
+    converter = AbsoluteMagnitudeConverter(zeropoint=25.0, chunksize=1)
+    inputs = {"flux": flux.copy(), "distance": distance.copy()}
+    converter.absolute_magnitude(inputs["flux"], inputs["distance"], out=inputs[target])
+    np.testing.assert_allclose(inputs[target], expected_mag, rtol=1e-15)
+
+
+def test_error_propagation():
+    flux = np.array([100.0, 10.0, -50.0])
+    flux_err = np.array([1.0, 2.0, 5.0])
+
+    with np.errstate(invalid="ignore"):
+        mag, mag_err = flux_to_mag_with_error(flux, flux_err, 25.0)
+        np.testing.assert_array_equal(mag, flux_to_mag(flux, 25.0))
+    assert mag_err == pytest.approx(2.5 / np.log(10) * np.abs(flux_err / flux))
+
+    # The reverse recovers the flux errors of the valid rows
+    flux_back, err_back = mag_to_flux_with_error(mag[:2], mag_err[:2], 25.0)
+    assert flux_back == pytest.approx(flux[:2])
+    assert err_back == pytest.approx(flux_err[:2])
+
+    distmod, distmod_err = distance_to_distance_modulus_with_error(100.0, 10.0)
+    assert distmod == pytest.approx(5.0)
+    assert distmod_err == pytest.approx(5 / np.log(10) * 0.1)
+
+
+def test_error_propagation_in_place():
+    """Results can overwrite the inputs, since the error is computed before the value."""
+    flux = np.array([100.0, 1000.0])
+    flux_err = np.array([1.0, 1.0])
+    expected = flux_to_mag_with_error(flux, flux_err, 25.0)
+
+    mag, mag_err = flux_to_mag_with_error(flux, flux_err, 25.0, out=(flux, flux_err))
+
+    assert mag is flux and mag_err is flux_err
+    np.testing.assert_array_equal(mag, expected[0])
+    np.testing.assert_array_equal(mag_err, expected[1])
+
+
+def test_float32_is_preserved_and_accurate():
+    """float32 input stays float32, even with a float64 zeropoint, within the documented bounds."""
+    zeropoint = np.float64(25.0)
+    flux = np.geomspace(1e-30, 1e30, 100_001).astype(np.float32)
+    mag = np.linspace(-25.0, 75.0, 100_001).astype(np.float32)
+
+    mag32 = flux_to_mag(flux, zeropoint)
+    flux32 = mag_to_flux(mag, zeropoint)
+    distance32 = distance_modulus_to_distance(mag - 25)
+    distance = np.geomspace(1e-15, 1e20, 100_001).astype(np.float32)
+    distmod32 = distance_to_distance_modulus(distance)
+
+    for result in (mag32, flux32, distance32, distmod32):
+        assert result.dtype == np.float32
+    np.testing.assert_allclose(mag32, flux_to_mag(flux.astype(float), 25.0), rtol=0, atol=2e-5)
+    np.testing.assert_allclose(flux32, mag_to_flux(mag.astype(float), 25.0), rtol=1e-5)
+    np.testing.assert_allclose(
+        distance32, distance_modulus_to_distance(mag.astype(float) - 25), rtol=1e-5
+    )
+    np.testing.assert_allclose(
+        distmod32, distance_to_distance_modulus(distance.astype(float)), rtol=0, atol=2e-5
+    )
+
+
+def test_dtype_argument():
+    """``dtype`` forces the working type, in both directions."""
+    assert flux_to_mag(np.array([100.0]), 25.0, dtype=np.float32).dtype == np.float32
+    assert mag_to_flux(np.array([20], dtype=np.int32), 25.0, dtype="float32").dtype == np.float32
+    assert flux_to_mag(np.float32(100.0), 25.0, dtype=np.float64).dtype == np.float64
+    mag, mag_err = flux_to_mag_with_error(np.ones(2), np.ones(2), 25.0, dtype=np.float32)
+    assert mag.dtype == mag_err.dtype == np.float32
+
+
+def test_approx_mode_meets_its_bound_over_the_float_range():
+    """The approximate kernel stays within the tolerance everywhere, with matching nan/inf."""
+    flux = np.concatenate(
+        [np.geomspace(5e-324, 1.7e308, 200_001), [0.0, np.inf, np.nan, -1.0, 1e-40, 3.5e38]]
+    )
+    mag = np.linspace(-700.0, 750.0, 200_001)
+
+    with np.errstate(all="ignore"):
+        for zeropoint in (8.9, 25.0, 48.6):
+            # flux_to_mag has no approximate kernel
+            exact = flux_to_mag(flux, zeropoint)
+            np.testing.assert_array_equal(flux_to_mag(flux, zeropoint, approx=1e-4), exact)
+
+            exact = mag_to_flux(mag, zeropoint)
+            approx = mag_to_flux(mag, zeropoint, approx=1e-4)
+            normal = exact > np.finfo(np.float64).tiny
+            np.testing.assert_allclose(approx[normal], exact[normal], rtol=1e-12)
+            assert np.array_equal(approx[~normal] == 0, exact[~normal] == 0)
+
+    # A tolerance tighter than the kernel's bound keeps the exact path
+    values = np.array([10.0, 20.0, 25.5])
+    np.testing.assert_array_equal(mag_to_flux(values, 8.9, approx=1e-14), mag_to_flux(values, 8.9))
+
+
+@pytest.mark.filterwarnings("error")
+def test_invalid_policies():
+    """Each policy handles zero, negative and nan fluxes without a warning."""
+    flux = np.array([100.0, 0.0, -5.0, np.nan, 1000.0])
+    bad = np.array([False, True, True, True, False])
+    expected = flux_to_mag(flux[~bad], 25.0)
+
+    for invalid in ("nan", "mask", "bitmask", "clip", "sentinel"):
+        result = flux_to_mag(flux, 25.0, invalid=invalid, fill=99.0)
+        if invalid == "mask":
+            np.testing.assert_array_equal(result.mask, bad)
+        if invalid == "bitmask":
+            result, bits = result
+            np.testing.assert_array_equal(np.unpackbits(bits, count=flux.size), bad)
+        np.testing.assert_array_equal(np.asarray(result)[~bad], expected)
+
+    np.testing.assert_array_equal(flux_to_mag(flux, 25.0, invalid="nan")[bad], np.nan)
+    np.testing.assert_array_equal(flux_to_mag(flux, 25.0, invalid="sentinel", fill=99)[bad], 99)
+    clipped = flux_to_mag(flux, 25.0, invalid="clip")
+    assert np.all(np.isfinite(clipped[1:3])) and np.all(clipped[1:3] > 700)
+    assert np.isnan(clipped[3])
+    with pytest.raises(ValueError, match="3 input value"):
+        flux_to_mag(flux, 25.0, invalid="raise")
+    with pytest.raises(ValueError):
+        flux_to_mag(flux, 25.0, invalid="ignore")
+    assert "raise" in INVALID_POLICIES
+
+
+@pytest.mark.filterwarnings("error")
+def test_invalid_policy_with_out_where_and_scalars():
+    """Policies write into ``out`` (even in place), respect ``where`` and accept scalars."""
+    flux = np.array([100.0, 0.0, -5.0, 1000.0])
+    result = flux_to_mag(flux, 25.0, out=flux, invalid="clip")
+    assert result is flux
+    assert flux[0] == 20.0 and flux[1] == flux[2] > 700
+
+    out = np.full(4, -1.0)
+    where = np.array([True, True, False, False])
+    flux_to_mag(np.array([100.0, 0.0, 0.0, 10.0]), 25.0, out=out, where=where, invalid="nan")
+    np.testing.assert_array_equal(out, [20.0, np.nan, -1.0, -1.0])
+
+    assert np.isnan(flux_to_mag(0.0, 25.0, invalid="nan"))
+    assert distance_to_distance_modulus(-1.0, invalid="sentinel", fill=-99.0) == -99.0
+    assert absolute_magnitude(100.0, 10.0, 25.0, invalid="raise") == pytest.approx(20.0)
+
+    mag, mag_err = flux_to_mag_with_error(
+        np.array([100.0, 0.0]), np.array([1.0, 1.0]), 25.0, invalid="sentinel", fill=99.0
+    )
+    np.testing.assert_array_equal(mag_err[1:], 99.0)
+    assert mag[1] == 99.0 and mag_err[0] == pytest.approx(0.010857362047581294)
+
+
+class LazyChunks:
+    """A stand-in for a chunked, lazy array such as a dask array.
+
+    Ufuncs and `np.where` only record per-chunk work (NEP 13 and NEP 18); nothing
+    runs until `compute`. Any attempt to turn it into a NumPy array fails.
+    """
+
+    computed = 0  # The number of `compute` calls, over all instances
+
+    def __init__(self, chunks, dtype):
+        self.chunks = list(chunks)  # Zero-argument callables, one per chunk
+        self.dtype = np.dtype(dtype)
+
+    @classmethod
+    def from_array(cls, array, chunksize):
+        array = np.asarray(array)
+        parts = [array[i : i + chunksize] for i in range(0, array.size, chunksize)]
+        return cls([lambda part=part: part for part in parts], array.dtype)
+
+    @staticmethod
+    def _lazy_map(func, inputs, kwargs):
+        lazy = [value for value in inputs if isinstance(value, LazyChunks)]
+        n_chunks = len(lazy[0].chunks)
+        assert all(len(value.chunks) == n_chunks for value in lazy)
+        empty = [
+            np.empty(0, value.dtype) if isinstance(value, LazyChunks) else value for value in inputs
+        ]
+        dtype = np.asarray(func(*empty, **kwargs)).dtype
+
+        def chunk(i):
+            args = [
+                value.chunks[i]() if isinstance(value, LazyChunks) else value for value in inputs
+            ]
+            return func(*args, **kwargs)
+
+        return LazyChunks([lambda i=i: chunk(i) for i in range(n_chunks)], dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or "out" in kwargs or "where" in kwargs:
+            return NotImplemented
+        return self._lazy_map(ufunc, inputs, kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is not np.where:
+            return NotImplemented
+        return self._lazy_map(np.where, args, kwargs)
+
+    def __array__(self, dtype=None, copy=None):
+        raise AssertionError("a lazy array was materialised")
+
+    def __invert__(self):
+        return np.invert(self)
+
+    def compute(self) -> np.ndarray:
+        LazyChunks.computed += 1
+        return np.concatenate([chunk() for chunk in self.chunks])
+
+
+DUCK_CASES = [
+    (flux_to_mag, ("flux", 25.0)),
+    (mag_to_flux, ("mag", 25.0)),
+    (distance_modulus_to_distance, ("distmod",)),
+    (distance_to_distance_modulus, ("distance",)),
+    (absolute_magnitude, ("flux", "distance", 25.0)),
+    (luminosity, ("flux", "distance")),
+    (flux_to_mag_with_error, ("flux", "error", 25.0)),
+    (mag_to_flux_with_error, ("mag", "error", 25.0)),
+    (distance_to_distance_modulus_with_error, ("distance", "error")),
+]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("func, arguments", DUCK_CASES)
+def test_duck_arrays_stay_lazy_and_chunked(func, arguments, dtype):
+    """Every conversion maps over the chunks of a duck array without computing it."""
+    rng = np.random.default_rng(5)
+    data = {
+        "flux": rng.uniform(1, 1e4, 10),
+        "mag": rng.uniform(10, 30, 10),
+        "distmod": rng.uniform(20, 40, 10),
+        "distance": rng.uniform(1e5, 1e8, 10),
+        "error": rng.uniform(0, 1, 10),
+    }
+    eager = [data[name].astype(dtype) if isinstance(name, str) else name for name in arguments]
+    lazy = [
+        LazyChunks.from_array(value, 4) if isinstance(value, np.ndarray) else value
+        for value in eager
+    ]
+
+    computed = LazyChunks.computed
+    result = func(*lazy)
+    expected = func(*eager)
+    results = result if isinstance(result, tuple) else (result,)
+    expected = expected if isinstance(expected, tuple) else (expected,)
+    assert LazyChunks.computed == computed
+    for array, reference in zip(results, expected, strict=True):
+        assert isinstance(array, LazyChunks) and len(array.chunks) == 3
+        assert array.dtype == dtype
+        np.testing.assert_array_equal(array.compute(), reference)
+
+
+@pytest.mark.filterwarnings("ignore:.*encountered in log10:RuntimeWarning")
+def test_duck_arrays_with_policies_and_converters():
+    """``where``, the lazy invalid policies and converter methods keep duck arrays lazy."""
+    flux = np.array([100.0, 0.0, -5.0, 1000.0, 10.0])
+    lazy = LazyChunks.from_array(flux, 2)
+
+    result = flux_to_mag(lazy, 25.0, invalid="sentinel", fill=99.0)
+    np.testing.assert_array_equal(result.compute(), [20.0, 99.0, 99.0, 17.5, 22.5])
+    where = LazyChunks.from_array(flux > 50, 2)
+    result = flux_to_mag(lazy, 25.0, where=where, invalid="nan")
+    np.testing.assert_array_equal(result.compute(), [20.0, np.nan, np.nan, 17.5, np.nan])
+    with pytest.raises(TypeError, match="mask"):
+        flux_to_mag(lazy, 25.0, invalid="mask")
+    with pytest.raises(TypeError, match="out"):
+        flux_to_mag(lazy, 25.0, out=np.empty(5))
+
+    # A chunksize far below the array size would make the converter split NumPy arrays
+    converter = BrightnessConverter(zeropoint=25.0, chunksize=2, dtype="float32", invalid="nan")
+    result = converter.flux_to_mag(lazy)
+    assert isinstance(result, LazyChunks) and result.dtype == np.float32
+    np.testing.assert_allclose(result.compute(), [20.0, np.nan, np.nan, 17.5, 22.5])
+    with pytest.raises(TypeError, match="mask"):
+        BrightnessConverter(zeropoint=25.0, invalid="mask").flux_to_mag(lazy)
+
+    absolute = AbsoluteMagnitudeConverter(zeropoint=25.0, chunksize=2)
+    result = absolute.absolute_magnitude(lazy, LazyChunks.from_array(np.full(5, 10.0), 2))
+    np.testing.assert_array_equal(
+        result.compute(), absolute.absolute_magnitude(flux, np.full(5, 10.0))
+    )